@@ -1,21 +1,35 @@
-"""FastAPI dependencies: current user, admin check."""
-from typing import Annotated
+"""FastAPI dependencies: current user, admin check, auth rate limits."""
+import hashlib
+import math
+from collections.abc import AsyncIterator
+from functools import lru_cache
+from typing import Annotated, Any
 
-from fastapi import Depends, Header
+from fastapi import Depends, Header, Request
 from sqlalchemy.orm import Session
 
+from app.core.config import get_settings
 from app.core.jwt_handler import decode_access_token
-from app.database.connection import get_db
+from app.database.connection import get_session, run_db
 from app.database.models import User, UserRole
-from app.services.user_service import get_user_by_id
-from app.utils.exceptions import UnauthorizedException, ForbiddenException
+from app.database.schemas import LoginRequest, Principal
+from app.services.user_service import changed_since, get_cached_principal, get_principal, get_user_by_id
+from app.utils.exceptions import TooManyRequestsException, UnauthorizedException, ForbiddenException
+from app.utils.metrics import REGISTRY
+from app.utils.rate_limit import build_limiter
 
+RATE_LIMITED = REGISTRY.counter("rate_limited_total", "Requests rejected with 429 by a rate limit.", ("limit",))
 
-def get_current_user(
+
+async def get_current_user(
     authorization: Annotated[str | None, Header()] = None,
-    db: Session = Depends(get_db),
-) -> User:
-    """Extract and validate JWT, return current user."""
+    db: Session = Depends(get_session),
+) -> User | Principal:
+    """Extract and validate JWT, return current user.
+
+    With AUTH_STATELESS the principal comes from the verified claims; only
+    users changed after the token was issued cost a (cached) DB lookup.
+    """
     if not authorization or not authorization.startswith("Bearer "):
         raise UnauthorizedException("Missing or invalid authorization header")
     token = authorization.removeprefix("Bearer ").strip()
@@ -23,11 +37,85 @@ def get_current_user(
     if not payload or "sub" not in payload:
         raise UnauthorizedException("Invalid or expired token")
     user_id = int(payload["sub"])
-    return get_user_by_id(db, user_id)
+    if get_settings().AUTH_STATELESS:
+        principal = get_cached_principal(user_id)
+        if principal is not None:
+            return principal
+        if "role" in payload and not changed_since(user_id, payload.get("iat", 0)):
+            return Principal(id=user_id, role=payload["role"], email=payload.get("email"))
+        return await run_db(db, get_principal, user_id)
+    return await run_db(db, get_user_by_id, user_id)
 
 
-def require_admin(current_user: User = Depends(get_current_user)) -> User:
+async def require_admin(current_user: User | Principal = Depends(get_current_user)) -> User | Principal:
     """Require current user to have admin role."""
     if current_user.role != UserRole.admin:
         raise ForbiddenException("Admin access required")
     return current_user
+
+
+@lru_cache
+def get_rate_limiter() -> Any:
+    """Rate limiter from Settings (None when RATE_LIMIT_BACKEND=none)."""
+    settings = get_settings()
+    return build_limiter(settings.RATE_LIMIT_BACKEND, settings.REDIS_URL)
+
+
+def clear_rate_limits() -> None:
+    """Reset every rate-limit counter."""
+    limiter = get_rate_limiter()
+    if limiter is not None:
+        limiter.clear()
+
+
+def _enforce(name: str, key: str, limit: int, count: bool = True) -> None:
+    """Raise 429 when `key` is over `limit`; `count=False` only checks (hits recorded by _record)."""
+    limiter = get_rate_limiter()
+    if limiter is None or limit <= 0:
+        return
+    window = get_settings().RATE_LIMIT_WINDOW_SECONDS
+    retry_after = (limiter.hit if count else limiter.check)(f"{name}:{key}", limit, window)
+    if retry_after:
+        RATE_LIMITED.inc(name)
+        raise TooManyRequestsException("Too many attempts, retry later", retry_after=max(math.ceil(retry_after), 1))
+
+
+def _record(name: str, key: str, limit: int) -> None:
+    limiter = get_rate_limiter()
+    if limiter is not None and limit > 0:
+        limiter.hit(f"{name}:{key}", limit, get_settings().RATE_LIMIT_WINDOW_SECONDS)
+
+
+def _client_ip(request: Request) -> str:
+    # Behind a proxy, run uvicorn with --proxy-headers so this is the real client address
+    return request.client.host if request.client else "unknown"
+
+
+async def limit_login(request: Request, data: LoginRequest) -> AsyncIterator[None]:
+    """Per-IP login limit and failed-login limits per (account, IP) and per account; raises 429
+    before any password is verified.
+
+    Only failures count against an account. The (account, IP) limit is tight and only
+    blocks the client that failed, so nobody can lock a user out with wrong passwords
+    from one address. The per-account limit is much higher and catches guessing spread
+    over many addresses.
+    """
+    settings = get_settings()
+    ip = _client_ip(request)
+    _enforce("login_ip", ip, settings.RATE_LIMIT_LOGIN_PER_IP)
+    email = data.email.lower()
+    account = hashlib.blake2b(f"{email}\0{ip}".encode(), digest_size=16).hexdigest()
+    _enforce("login_account", account, settings.RATE_LIMIT_LOGIN_PER_ACCOUNT, count=False)
+    email_key = hashlib.blake2b(email.encode(), digest_size=16).hexdigest()
+    _enforce("login_email", email_key, settings.RATE_LIMIT_LOGIN_PER_EMAIL, count=False)
+    try:
+        yield
+    except UnauthorizedException:
+        _record("login_account", account, settings.RATE_LIMIT_LOGIN_PER_ACCOUNT)
+        _record("login_email", email_key, settings.RATE_LIMIT_LOGIN_PER_EMAIL)
+        raise
+
+
+async def limit_register(request: Request) -> None:
+    """Per-IP registration limit; raises 429 before the password is hashed."""
+    _enforce("register_ip", _client_ip(request), get_settings().RATE_LIMIT_REGISTER_PER_IP)
@@ -1,21 +1,44 @@
-"""Auth API: register, login."""
-from fastapi import APIRouter, Depends
+"""Auth API: register, login, refresh, logout."""
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header
 from sqlalchemy.orm import Session
 
-from app.database.connection import get_db
-from app.database.schemas import LoginRequest, TokenResponse, UserCreate, UserResponse
-from app.services.auth_service import login_user, register_user
+from app.api.deps import limit_login, limit_register
+from app.core.jwt_handler import decode_access_token
+from app.database.connection import get_session, run_db
+from app.database.schemas import LoginRequest, RefreshRequest, TokenResponse, UserCreate, UserResponse
+from app.services.auth_service import login_user_async, logout, refresh_session, register_user_async
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-@router.post("/register", response_model=UserResponse)
-def register(data: UserCreate, db: Session = Depends(get_db)):
+@router.post("/register", response_model=UserResponse, dependencies=[Depends(limit_register)])
+async def register(data: UserCreate, db: Session = Depends(get_session)):
     """Register a new user."""
-    return register_user(db, data)
+    return await register_user_async(db, data)
+
+
+@router.post("/login", response_model=TokenResponse, dependencies=[Depends(limit_login)])
+async def login(data: LoginRequest, db: Session = Depends(get_session)):
+    """Login and get a JWT access token plus a refresh token."""
+    return await login_user_async(db, data)
+
+
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh(data: RefreshRequest, db: Session = Depends(get_session)):
+    """Exchange a refresh token for a new access/refresh pair (the old refresh token is spent)."""
+    return await run_db(db, refresh_session, data.refresh_token)
 
 
-@router.post("/login", response_model=TokenResponse)
-def login(data: LoginRequest, db: Session = Depends(get_db)):
-    """Login and get JWT access token."""
-    return login_user(db, data)
+@router.post("/logout", status_code=204)
+async def logout_route(
+    data: RefreshRequest,
+    authorization: Annotated[str | None, Header()] = None,
+    db: Session = Depends(get_session),
+):
+    """Revoke the refresh token family and, if sent, the current access token (on every worker)."""
+    claims = None
+    if authorization and authorization.startswith("Bearer "):
+        claims = decode_access_token(authorization.removeprefix("Bearer ").strip())
+    await run_db(db, logout, data.refresh_token, claims)
@@ -1,66 +1,221 @@
 """Products API: CRUD. Create/Update/Delete admin only; List/Get public."""
-from typing import Annotated
+from decimal import Decimal
+from typing import Annotated, Any, Literal
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Body, Depends, Header, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, require_admin
-from app.database.connection import get_db
+from app.database.connection import get_read_session, get_session, run_db, run_db_in_thread
 from app.database.models import User
-from app.database.schemas import ProductCreate, ProductResponse, ProductUpdate
+from app.database.schemas import (
+    ProductBulkDelete,
+    ProductBulkDeleteResponse,
+    ProductBulkResponse,
+    ProductCreate,
+    ProductImportSummary,
+    ProductPage,
+    ProductResponse,
+    ProductUpdate,
+)
+from app.services.catalog_snapshot import get_catalog
+from app.services.idempotency_service import idempotent, request_fingerprint
 from app.services.product_service import (
+    aiter_products_export,
+    bulk_create_products,
+    bulk_delete_products,
+    bulk_update_products,
     create_product,
     delete_product,
-    get_product_by_id,
-    list_products,
+    get_product,
+    import_products,
+    iter_products_export,
+    list_products_json,
+    list_products_page_json,
+    products_validator,
+    read_shared,
     update_product,
 )
+from app.utils.exceptions import BadRequestException
+from app.utils.http_cache import is_not_modified, make_etag, not_modified, validator_headers
 from sqlalchemy.orm import Session
 
 router = APIRouter(prefix="/products", tags=["products"])
 
+# Retries with the same key (per admin) get the first response instead of running the write again
+IdempotencyKeyHeader = Annotated[
+    str | None, Header(alias="Idempotency-Key", min_length=1, max_length=255, description="Makes retries safe")
+]
+
 
-@router.get("", response_model=list[ProductResponse])
-def list_products_route(
+@router.get("", response_model=list[ProductResponse] | ProductPage)
+async def list_products_route(
+    request: Request,
     skip: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(ge=1, le=100)] = 20,
-    db: Session = Depends(get_db),
+    cursor: Annotated[str | None, Query(description="Keyset mode: empty for the first page, then next_cursor")] = None,
+    q: Annotated[str | None, Query(min_length=1, max_length=200, description="Search name/description")] = None,
+    min_price: Annotated[Decimal | None, Query(ge=0)] = None,
+    max_price: Annotated[Decimal | None, Query(ge=0)] = None,
+    sort: Annotated[Literal["id", "created_at", "price", "-price", "relevance"], Query()] = "id",
+    db: Session = Depends(get_read_session),
+):
+    """List products (public). Passing `cursor` switches to keyset pagination.
+
+    The ETag covers (max(updated_at), count) plus the query, so an unchanged
+    page answers If-None-Match with 304 without loading any rows. With the
+    catalog snapshot, pages without `q` are byte slices of it (no DB at all).
+    """
+    catalog = get_catalog()
+    if catalog is not None:
+        last_modified, count = catalog.validator
+    else:
+        last_modified, count = await read_shared(db, products_validator)
+    etag = make_etag("products", last_modified, count, skip, limit, cursor, q, min_price, max_price, sort)
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request, headers["ETag"], last_modified):
+        return not_modified(headers)
+    filters = {"q": q, "min_price": min_price, "max_price": max_price, "sort": sort}
+    if catalog is not None:
+        if cursor is not None:
+            body = catalog.page_json(cursor, limit, **filters)
+        else:
+            body = catalog.list_json(skip, limit, **filters)
+        if body is not None:
+            return Response(body, media_type="application/json", headers=headers)
+    # Pre-encoded JSON: rows are encoded once in the service, not re-validated by response_model
+    if cursor is not None:
+        body = await read_shared(db, list_products_page_json, cursor=cursor, limit=limit, **filters)
+    else:
+        body = await read_shared(db, list_products_json, skip=skip, limit=limit, **filters)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+# Static paths (/export, /bulk) are declared before /{product_id} so they are not parsed as ids
+@router.get("/export")
+async def export_products_route(
+    format: Annotated[Literal["ndjson", "csv"], Query()] = "ndjson",
+    db: Session = Depends(get_read_session),
+    current_user: User = Depends(require_admin),
+):
+    """Stream the whole catalog as NDJSON or CSV (admin only). Memory stays flat."""
+    if isinstance(db, AsyncSession):
+        body = aiter_products_export(db.bind, format)
+    else:
+        body = iter_products_export(db.get_bind(), format)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'},
+    )
+
+
+@router.post("/import", response_model=ProductImportSummary)
+async def import_products_route(
+    file: UploadFile,
+    format: Annotated[Literal["ndjson", "csv"] | None, Query(description="Defaults to the file extension")] = None,
+    upsert: Annotated[bool, Query(description="Update existing products with the same name")] = False,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(require_admin),
+):
+    """Import products from a CSV/NDJSON upload (admin only), streamed in chunks."""
+    fmt = format or (file.filename or "").rsplit(".", 1)[-1].lower()
+    if fmt == "jsonl":
+        fmt = "ndjson"
+    if fmt not in ("ndjson", "csv"):
+        raise BadRequestException("Pass format=ndjson|csv or upload a .csv/.ndjson file")
+    # Parsing and validating a large upload is CPU-bound: keep it off the event loop in async mode too
+    return await run_db_in_thread(db, import_products, file.file, fmt, upsert=upsert)
+
+
+@router.post("/bulk", response_model=ProductBulkResponse)
+async def bulk_create_products_route(
+    items: Annotated[list[dict[str, Any]], Body(description="ProductCreate objects")],
+    db: Session = Depends(get_session),
+    current_user: User = Depends(require_admin),
 ):
-    """List products (public)."""
-    return list_products(db, skip=skip, limit=limit)
+    """Create many products in one transaction (admin only). Invalid items are reported, not fatal."""
+    return await run_db(db, bulk_create_products, items)
+
+
+@router.patch("/bulk", response_model=ProductBulkResponse)
+async def bulk_update_products_route(
+    items: Annotated[list[dict[str, Any]], Body(description="ProductUpdate objects with an id")],
+    db: Session = Depends(get_session),
+    current_user: User = Depends(require_admin),
+):
+    """Partially update many products in one transaction (admin only)."""
+    return await run_db(db, bulk_update_products, items)
+
+
+@router.delete("/bulk", response_model=ProductBulkDeleteResponse)
+async def bulk_delete_products_route(
+    data: ProductBulkDelete,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(require_admin),
+):
+    """Delete many products by id in one statement (admin only)."""
+    return await run_db(db, bulk_delete_products, data.ids)
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product_route(product_id: int, db: Session = Depends(get_db)):
-    """Get product by ID (public)."""
-    return ProductResponse.model_validate(get_product_by_id(db, product_id))
+async def get_product_route(product_id: int, request: Request, db: Session = Depends(get_read_session)):
+    """Get product by ID (public). Honors If-None-Match / If-Modified-Since."""
+    product = await read_shared(db, get_product, product_id)
+    headers = validator_headers(make_etag("product", product.id, product.updated_at.isoformat()), product.updated_at)
+    if is_not_modified(request, headers["ETag"], product.updated_at):
+        return not_modified(headers)
+    return Response(product.model_dump_json(), media_type="application/json", headers=headers)
 
 
 @router.post("", response_model=ProductResponse, status_code=201)
-def create_product_route(
+async def create_product_route(
     data: ProductCreate,
-    db: Session = Depends(get_db),
+    request: Request,
+    idempotency_key: IdempotencyKeyHeader = None,
+    db: Session = Depends(get_session),
     current_user: User = Depends(require_admin),
 ):
-    """Create product (admin only)."""
-    return create_product(db, data)
+    """Create product (admin only). Honors Idempotency-Key."""
+    async def execute() -> bytes:
+        return (await run_db(db, create_product, data)).model_dump_json().encode()
+
+    fingerprint = request_fingerprint("POST", request.url.path, data.model_dump_json().encode())
+    return await idempotent(db, idempotency_key, current_user.id, fingerprint, 201, execute)
 
 
 @router.put("/{product_id}", response_model=ProductResponse)
-def update_product_route(
+async def update_product_route(
     product_id: int,
     data: ProductUpdate,
-    db: Session = Depends(get_db),
+    request: Request,
+    idempotency_key: IdempotencyKeyHeader = None,
+    db: Session = Depends(get_session),
     current_user: User = Depends(require_admin),
 ):
-    """Update product (admin only)."""
-    return update_product(db, product_id, data)
+    """Update product (admin only). Honors Idempotency-Key."""
+    async def execute() -> bytes:
+        return (await run_db(db, update_product, product_id, data)).model_dump_json().encode()
+
+    payload = data.model_dump_json(exclude_unset=True).encode()
+    fingerprint = request_fingerprint("PUT", request.url.path, payload)
+    return await idempotent(db, idempotency_key, current_user.id, fingerprint, 200, execute)
 
 
 @router.delete("/{product_id}", status_code=204)
-def delete_product_route(
+async def delete_product_route(
     product_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    idempotency_key: IdempotencyKeyHeader = None,
+    db: Session = Depends(get_session),
     current_user: User = Depends(require_admin),
 ):
-    """Delete product (admin only)."""
-    delete_product(db, product_id)
+    """Delete product (admin only). Honors Idempotency-Key: a retried delete is a 204, not a 404."""
+    async def execute() -> bytes:
+        await run_db(db, delete_product, product_id)
+        return b""
+
+    fingerprint = request_fingerprint("DELETE", request.url.path)
+    return await idempotent(db, idempotency_key, current_user.id, fingerprint, 204, execute)
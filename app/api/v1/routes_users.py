@@ -1,24 +1,49 @@
-"""Users API: list users (admin)."""
-from typing import Annotated
+"""Users API: list, update, delete users (admin)."""
+from typing import Annotated, Literal
 
 from fastapi import APIRouter, Depends, Query
 
 from app.api.deps import require_admin
-from app.database.connection import get_db
+from app.database.connection import get_read_session, get_session, run_db
 from app.database.models import User
-from app.database.schemas import UserResponse
-from app.services.user_service import list_users
+from app.database.schemas import UserPage, UserResponse, UserUpdate
+from app.services.user_service import delete_user, list_users, list_users_page, update_user
 from sqlalchemy.orm import Session
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
-@router.get("", response_model=list[UserResponse])
-def list_users_route(
+@router.get("", response_model=list[UserResponse] | UserPage)
+async def list_users_route(
     skip: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(ge=1, le=100)] = 20,
-    db: Session = Depends(get_db),
+    cursor: Annotated[str | None, Query(description="Keyset mode: empty for the first page, then next_cursor")] = None,
+    sort: Annotated[Literal["id", "created_at"], Query()] = "id",
+    db: Session = Depends(get_read_session),
     current_user: User = Depends(require_admin),
 ):
-    """List all users (admin only)."""
-    return list_users(db, skip=skip, limit=limit)
+    """List all users (admin only). Passing `cursor` switches to keyset pagination."""
+    if cursor is not None:
+        return await run_db(db, list_users_page, cursor=cursor, limit=limit, sort=sort)
+    return await run_db(db, list_users, skip=skip, limit=limit)
+
+
+@router.put("/{user_id}", response_model=UserResponse)
+async def update_user_route(
+    user_id: int,
+    data: UserUpdate,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(require_admin),
+):
+    """Update user name/email/role (admin only)."""
+    return await run_db(db, update_user, user_id, data)
+
+
+@router.delete("/{user_id}", status_code=204)
+async def delete_user_route(
+    user_id: int,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(require_admin),
+):
+    """Delete user (admin only)."""
+    await run_db(db, delete_user, user_id)
@@ -18,18 +18,126 @@ class Settings(BaseSettings):
 
     # Database – must be set via DATABASE_URL env (no hardcoded localhost for production)
     DATABASE_URL: str = ""
+    # Serve requests through an AsyncEngine (asyncpg / aiosqlite) instead of the sync threadpool path
+    DATABASE_ASYNC: bool = False
+
+    # Optional read replica; read-only routes (product/user lists, product by id, export) use it
+    DATABASE_READ_URL: Optional[str] = None
+
+    # Connection pool (applied to every engine). pool_recycle=-1 disables recycling; with
+    # pre-ping off, recycle below the server/proxy idle timeout to avoid stale connections.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
 
     # JWT
     JWT_SECRET_KEY: str = "your-super-secret-key-change-in-production"
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Rotating refresh tokens (POST /auth/refresh): renew without a password check
+    JWT_REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    # Asymmetric algorithms (RS256, ES256, EdDSA): PEM key files. Verify-only services
+    # need just the public key. HS* algorithms use JWT_SECRET_KEY.
+    JWT_PRIVATE_KEY_FILE: Optional[str] = None
+    JWT_PUBLIC_KEY_FILE: Optional[str] = None
+    # Verified claims cached per token until exp (0 disables)
+    JWT_VERIFY_CACHE_SIZE: int = 10000
+
+    # Stateless auth: build the current user from verified JWT claims (no per-request DB lookup).
+    # Users changed/deleted after a token was issued fall back to a cached DB lookup.
+    AUTH_STATELESS: bool = False
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+
+    # Password hashing: "bcrypt" or "argon2id" (needs argon2-cffi). The cost sets login latency;
+    # pick it with `python -m app.core.password_calibration --target-ms 250`. Hashes made with
+    # another scheme/cost are verified as before and upgraded on the next successful login.
+    PASSWORD_SCHEME: str = "bcrypt"
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 2
+    ARGON2_MEMORY_KIB: int = 19456
+    ARGON2_PARALLELISM: int = 1
+
+    # Password hashing pool: bcrypt runs in worker processes (0 = threadpool).
+    # Calls beyond workers + queue size are rejected with 503 instead of queuing.
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_SIZE: int = 32
+
+    # Rate limits on login/register (sliding window of RATE_LIMIT_WINDOW_SECONDS), checked
+    # before any password hashing; 0 disables a limit. "memory" counts per worker, "redis"
+    # shares counters via REDIS_URL, "none" disables rate limiting.
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    RATE_LIMIT_LOGIN_PER_IP: int = 20
+    # Failed logins per account email from one client IP (successful logins do not count)
+    RATE_LIMIT_LOGIN_PER_ACCOUNT: int = 5
+    # Failed logins per account email from all client IPs together
+    RATE_LIMIT_LOGIN_PER_EMAIL: int = 50
+    RATE_LIMIT_REGISTER_PER_IP: int = 5
+
+    # Idempotency-Key on admin product writes: responses are replayed for IDEMPOTENCY_TTL_SECONDS.
+    # A claim whose request never finished is taken over after IDEMPOTENCY_LOCK_SECONDS;
+    # concurrent duplicates wait up to IDEMPOTENCY_WAIT_SECONDS for the first one, then get 409.
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_LOCK_SECONDS: int = 60
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+
+    # Max items per bulk product request (POST/PATCH/DELETE /products/bulk)
+    BULK_MAX_ITEMS: int = 1000
+    # Rows validated and written per transaction by POST /products/import
+    IMPORT_CHUNK_SIZE: int = 1000
+
+    # Metrics: with several uvicorn workers, point this at a shared empty directory so
+    # /metrics on any worker reports the sum over all workers
+    METRICS_MULTIPROC_DIR: Optional[str] = None
+    METRICS_FLUSH_SECONDS: float = 5.0
+
+    # SQL profiling: per-request query count/time in Server-Timing headers and request logs.
+    # SQL_DEBUG also warns about statements repeated SQL_REPEAT_THRESHOLD+ times in one
+    # request (N+1) and logs queries slower than SQL_SLOW_QUERY_MS with their plan.
+    SQL_PROFILING: bool = True
+    SQL_DEBUG: bool = False
+    SQL_SLOW_QUERY_MS: float = 200.0
+    SQL_REPEAT_THRESHOLD: int = 5
+
+    # Logging: records are queued and written by a background thread (LOG_ASYNC) as text or
+    # json. A full queue drops records instead of blocking; LOG_SAMPLE_RATE < 1 samples
+    # successful request logs (4xx/5xx are always kept).
+    LOG_FORMAT: str = "text"
+    LOG_ASYNC: bool = True
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_SAMPLE_RATE: float = 1.0
+
+    # Response compression: bodies of at least COMPRESSION_MINIMUM_SIZE bytes are gzip'ed,
+    # or brotli-encoded (quality 0-11) when the client accepts br and brotli is installed.
+    # COMPRESSION_BROTLI_QUALITY unset disables br.
+    COMPRESSION_MINIMUM_SIZE: int = 1000
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: Optional[int] = 4
 
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000,http://localhost:5173"
 
-    # Redis (optional stub)
+    # Redis (optional; used by cache and rate-limit backends set to "redis")
     REDIS_URL: Optional[str] = None
 
+    # Product read cache: "memory" (per-process LRU/TTL), "redis" (shared via REDIS_URL) or "none"
+    PRODUCT_CACHE_BACKEND: str = "memory"
+    PRODUCT_CACHE_TTL_SECONDS: int = 60
+    PRODUCT_CACHE_MAX_ENTRIES: int = 10000
+    # Catalog snapshot: every worker keeps all products pre-encoded in memory and serves
+    # GET /products (without q) from it; writes update it, other workers follow via
+    # the invalidation bus. For catalogs that fit comfortably in each worker's memory.
+    CATALOG_SNAPSHOT: bool = False
+    # Single-flight product reads: concurrent identical reads in a worker share one query
+    PRODUCT_READ_COALESCING: bool = True
+    # Cross-worker invalidation bus for in-process caches: "auto" (redis when REDIS_URL is
+    # set, else postgres on a PostgreSQL database), "redis", "postgres" or "none"
+    INVALIDATION_BUS: str = "auto"
+    INVALIDATION_CHANNEL: str = "cache_invalidation"
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
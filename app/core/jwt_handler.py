@@ -1,9 +1,74 @@
-"""JWT token creation and validation."""
+"""JWT token creation and validation.
+
+Verified claims are cached by token digest until the token's `exp`, so repeated
+requests with the same bearer token skip the signature check and JSON parse.
+Revocation checks (the in-process jti denylist and any registered hooks) run on
+every decode, cached or not.
+
+JWT_ALGORITHM may be HMAC (HS256, shared JWT_SECRET_KEY) or asymmetric (RS256,
+ES256, EdDSA with PEM key files); asymmetric keys are parsed once at first use.
+A service that only verifies tokens needs just JWT_PUBLIC_KEY_FILE.
+"""
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+import uuid
+from collections.abc import Callable
 from datetime import datetime, timedelta, timezone
-from typing import Any, Optional
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
 
 import jwt
 from app.core.config import get_settings
+from app.utils.cache import TTLCache
+
+Claims = dict[str, Any]
+
+
+class _JwtConfig(NamedTuple):
+    algorithm: str
+    signing_key: Any
+    verification_key: Any
+    expire_minutes: int
+    refresh_key: bytes
+
+
+@lru_cache
+def _config() -> _JwtConfig:
+    """Algorithm and preloaded key objects from Settings (read once)."""
+    settings = get_settings()
+    algorithm = settings.JWT_ALGORITHM
+    refresh_key = settings.JWT_SECRET_KEY.encode()
+    if algorithm.startswith("HS"):
+        key = settings.JWT_SECRET_KEY
+        return _JwtConfig(algorithm, key, key, settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES, refresh_key)
+    # Requires pyjwt[crypto]; prepare_key turns PEM text into a cryptography key object
+    algo = jwt.get_algorithm_by_name(algorithm)
+    signing_key = None
+    if settings.JWT_PRIVATE_KEY_FILE:
+        signing_key = algo.prepare_key(Path(settings.JWT_PRIVATE_KEY_FILE).read_bytes())
+    if not settings.JWT_PUBLIC_KEY_FILE:
+        raise ValueError(f"JWT_PUBLIC_KEY_FILE must be set for JWT_ALGORITHM={algorithm}")
+    verification_key = algo.prepare_key(Path(settings.JWT_PUBLIC_KEY_FILE).read_bytes())
+    return _JwtConfig(algorithm, signing_key, verification_key, settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES, refresh_key)
+
+
+@lru_cache
+def _verified() -> TTLCache:
+    """Verified claims by token digest; entries expire with the token."""
+    return TTLCache(max(get_settings().JWT_VERIFY_CACHE_SIZE, 1), ttl_seconds=0)
+
+
+# Revoked token ids (jti) -> exp. Not an LRU: evicting an entry early would make the token
+# valid again, so entries only go once past exp (tokens past exp are rejected anyway).
+_denylist: dict[str, float] = {}
+_denylist_lock = threading.Lock()
+_DENYLIST_PRUNE_SECONDS = 60
+_next_prune = 0.0
+_revocation_checks: list[Callable[[Claims], bool]] = []
 
 
 def create_access_token(
@@ -11,32 +76,93 @@ def create_access_token(
     extra_claims: Optional[dict[str, Any]] = None,
     expires_delta: Optional[timedelta] = None,
 ) -> str:
-    """Create a JWT access token."""
-    settings = get_settings()
+    """Create a JWT access token with a unique `jti`."""
+    config = _config()
+    if config.signing_key is None:
+        raise ValueError("JWT_PRIVATE_KEY_FILE must be set to issue tokens")
     now = datetime.now(timezone.utc)
-    expire = now + (expires_delta or timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES))
+    expire = now + (expires_delta or timedelta(minutes=config.expire_minutes))
     payload = {
         "sub": str(subject),
         "exp": expire,
         "iat": now,
+        "jti": uuid.uuid4().hex,
     }
     if extra_claims:
         payload.update(extra_claims)
-    return jwt.encode(
-        payload,
-        settings.JWT_SECRET_KEY,
-        algorithm=settings.JWT_ALGORITHM,
-    )
+    return jwt.encode(payload, config.signing_key, algorithm=config.algorithm)
 
 
-def decode_access_token(token: str) -> Optional[dict[str, Any]]:
-    """Decode and validate a JWT token. Returns payload or None if invalid."""
-    settings = get_settings()
-    try:
-        return jwt.decode(
-            token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM],
-        )
-    except jwt.PyJWTError:
+def decode_access_token(token: str) -> Optional[Claims]:
+    """Decode and validate a JWT token. Returns payload or None if invalid or revoked.
+
+    The returned dict is shared with the cache: treat it as read-only.
+    """
+    cache_enabled = get_settings().JWT_VERIFY_CACHE_SIZE > 0
+    digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    claims = _verified().get(digest) if cache_enabled else None
+    if claims is None:
+        config = _config()
+        try:
+            claims = jwt.decode(token, config.verification_key, algorithms=[config.algorithm])
+        except jwt.PyJWTError:
+            return None
+        ttl = claims.get("exp", 0) - time.time()
+        if cache_enabled and ttl > 0:
+            _verified().set(digest, claims, ttl_seconds=ttl)
+    elif claims.get("exp", 0) <= time.time():
         return None
+    if _is_revoked(claims):
+        return None
+    return claims
+
+
+def access_token_lifetime() -> int:
+    """Access token lifetime in seconds (TokenResponse.expires_in)."""
+    return _config().expire_minutes * 60
+
+
+def create_refresh_token() -> tuple[str, str]:
+    """New opaque refresh token and the HMAC under which it is stored."""
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token)
+
+
+def hash_refresh_token(token: str) -> str:
+    """Keyed digest of a refresh token: a leaked table cannot be replayed without the secret."""
+    return hmac.new(_config().refresh_key, token.encode(), hashlib.sha256).hexdigest()
+
+
+def revoke_token(claims: Claims) -> None:
+    """Deny a token (by jti) for the rest of its lifetime, e.g. on logout."""
+    global _next_prune
+    jti = claims.get("jti")
+    exp = claims.get("exp", 0)
+    now = time.time()
+    if not jti or exp <= now:
+        return
+    with _denylist_lock:
+        _denylist[jti] = max(exp, _denylist.get(jti, 0))
+        if now >= _next_prune:
+            for expired in [key for key, until in _denylist.items() if until <= now]:
+                del _denylist[expired]
+            _next_prune = now + _DENYLIST_PRUNE_SECONDS
+
+
+def add_revocation_check(check: Callable[[Claims], bool]) -> None:
+    """Register a hook returning True for revoked claims (e.g. a shared Redis denylist)."""
+    _revocation_checks.append(check)
+
+
+def _is_revoked(claims: Claims) -> bool:
+    jti = claims.get("jti")
+    if jti is not None and jti in _denylist:
+        return True
+    return any(check(claims) for check in _revocation_checks)
+
+
+def reset_jwt_state() -> None:
+    """Forget keys, cached verifications and revocations (tests, key rotation)."""
+    _config.cache_clear()
+    _verified.cache_clear()
+    _denylist.clear()
@@ -0,0 +1,81 @@
+"""Pick password-hash cost settings that meet a target latency on this machine.
+
+    python -m app.core.password_calibration --target-ms 250
+    python -m app.core.password_calibration --scheme argon2id --target-ms 100 --memory-kib 65536
+
+Prints the settings to put in .env. Run it on production-class hardware: one
+hash/verify per login costs about the measured time on one core, so the target
+bounds login latency and, with PASSWORD_HASH_WORKERS, login throughput.
+"""
+import argparse
+import statistics
+import time
+
+from app.core.security import HashPolicy, hash_password
+
+_SAMPLE_PASSWORD = "calibration-password"
+
+
+def measure_ms(policy: HashPolicy, samples: int) -> float:
+    """Median milliseconds of one hash with `policy`."""
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hash_password(_SAMPLE_PASSWORD, policy)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target_ms: float, samples: int, min_rounds: int = 10, max_rounds: int = 16) -> tuple[int, float]:
+    """Highest bcrypt rounds whose median hash time stays within target_ms (at least min_rounds)."""
+    best = (min_rounds, measure_ms(HashPolicy(bcrypt_rounds=min_rounds), samples))
+    for rounds in range(min_rounds + 1, max_rounds + 1):
+        elapsed = measure_ms(HashPolicy(bcrypt_rounds=rounds), samples)
+        if elapsed > target_ms:
+            break
+        best = (rounds, elapsed)
+    return best
+
+
+def calibrate_argon2(target_ms: float, samples: int, memory_kib: int, parallelism: int) -> tuple[int, float]:
+    """Highest argon2id time cost within target_ms at a fixed memory cost (at least 1)."""
+    def policy(time_cost: int) -> HashPolicy:
+        return HashPolicy("argon2id", argon2_time_cost=time_cost, argon2_memory_kib=memory_kib,
+                          argon2_parallelism=parallelism)
+
+    best = (1, measure_ms(policy(1), samples))
+    for time_cost in range(2, 11):
+        elapsed = measure_ms(policy(time_cost), samples)
+        if elapsed > target_ms:
+            break
+        best = (time_cost, elapsed)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Calibrate password hashing cost to a target latency.")
+    parser.add_argument("--scheme", choices=("bcrypt", "argon2id"), default="bcrypt")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Max median time of one hash")
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--memory-kib", type=int, default=19456, help="argon2id memory cost")
+    parser.add_argument("--parallelism", type=int, default=1, help="argon2id lanes")
+    args = parser.parse_args()
+
+    if args.scheme == "bcrypt":
+        rounds, elapsed = calibrate_bcrypt(args.target_ms, args.samples)
+        print(f"# bcrypt: {elapsed:.0f} ms per hash (target {args.target_ms:.0f} ms)")
+        print("PASSWORD_SCHEME=bcrypt")
+        print(f"BCRYPT_ROUNDS={rounds}")
+    else:
+        time_cost, elapsed = calibrate_argon2(args.target_ms, args.samples, args.memory_kib, args.parallelism)
+        print(f"# argon2id: {elapsed:.0f} ms per hash (target {args.target_ms:.0f} ms)")
+        print("PASSWORD_SCHEME=argon2id")
+        print(f"ARGON2_TIME_COST={time_cost}")
+        print(f"ARGON2_MEMORY_KIB={args.memory_kib}")
+        print(f"ARGON2_PARALLELISM={args.parallelism}")
+    if elapsed > args.target_ms:
+        print(f"# warning: even the minimum cost exceeds {args.target_ms:.0f} ms on this machine")
+
+
+if __name__ == "__main__":
+    main()
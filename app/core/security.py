@@ -1,18 +1,220 @@
-"""Password hashing and verification using bcrypt."""
+"""Password hashing and verification: bcrypt (default) or argon2id, with rehash-on-login.
+
+The cost is a setting (BCRYPT_ROUNDS / ARGON2_*) picked with
+`python -m app.core.password_calibration`, so login latency is chosen, not
+inherited. Verification accepts every supported scheme; needs_rehash() tells
+login to upgrade hashes made with another scheme or cost.
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, NamedTuple, Optional
+
 import bcrypt
 
+from app.core.config import get_settings
+from app.utils.exceptions import ServiceUnavailableException
+from app.utils.metrics import REGISTRY
+
+PASSWORD_HASH_SECONDS = REGISTRY.histogram(
+    "password_hash_seconds",
+    "CPU time of one password hash/verify in the worker.",
+    buckets=(0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0),
+)
+PASSWORD_HASH_WAIT_SECONDS = REGISTRY.histogram(
+    "password_hash_queue_wait_seconds",
+    "Time a hash/verify waited for a free worker.",
+)
+PASSWORD_HASH_REJECTED = REGISTRY.counter("password_hash_rejected_total", "Hash/verify calls rejected with 503.")
+PASSWORD_REHASHED = REGISTRY.counter("password_rehashed_total", "Stored hashes upgraded on login.")
+
+
+class HashPolicy(NamedTuple):
+    """Target scheme and cost; passed explicitly to pool workers (they do not share Settings)."""
+
+    scheme: str = "bcrypt"
+    bcrypt_rounds: int = 12
+    argon2_time_cost: int = 2
+    argon2_memory_kib: int = 19456
+    argon2_parallelism: int = 1
+
+
+def current_policy() -> HashPolicy:
+    """HashPolicy from Settings."""
+    settings = get_settings()
+    return HashPolicy(
+        settings.PASSWORD_SCHEME,
+        settings.BCRYPT_ROUNDS,
+        settings.ARGON2_TIME_COST,
+        settings.ARGON2_MEMORY_KIB,
+        settings.ARGON2_PARALLELISM,
+    )
+
+
+@lru_cache
+def _argon2_hasher(time_cost: int, memory_kib: int, parallelism: int) -> Any:
+    try:
+        from argon2 import PasswordHasher  # optional dependency: argon2-cffi
+    except ImportError as exc:
+        raise RuntimeError("PASSWORD_SCHEME=argon2id requires the argon2-cffi package") from exc
+    return PasswordHasher(time_cost=time_cost, memory_cost=memory_kib, parallelism=parallelism)
+
 
-def hash_password(plain_password: str) -> str:
-    """Hash a plain text password."""
+def hash_password(plain_password: str, policy: Optional[HashPolicy] = None) -> str:
+    """Hash a plain text password with the target scheme and cost."""
+    policy = policy or current_policy()
+    if policy.scheme == "argon2id":
+        hasher = _argon2_hasher(policy.argon2_time_cost, policy.argon2_memory_kib, policy.argon2_parallelism)
+        return hasher.hash(plain_password)
     return bcrypt.hashpw(
         plain_password.encode("utf-8"),
-        bcrypt.gensalt(rounds=12),
+        bcrypt.gensalt(rounds=policy.bcrypt_rounds),
     ).decode("utf-8")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plain password against a hash."""
+    """Verify a plain password against a bcrypt or argon2id hash."""
+    if hashed_password.startswith("$argon2"):
+        from argon2.exceptions import InvalidHashError, VerificationError
+
+        try:
+            # verify reads the cost parameters from the hash itself
+            return _argon2_hasher(*HashPolicy()[2:]).verify(hashed_password, plain_password)
+        except (VerificationError, InvalidHashError):
+            return False
     return bcrypt.checkpw(
         plain_password.encode("utf-8"),
         hashed_password.encode("utf-8"),
     )
+
+
+def needs_rehash(hashed_password: str, policy: Optional[HashPolicy] = None) -> bool:
+    """True when a stored hash uses another scheme or cost than the target policy."""
+    policy = policy or current_policy()
+    if hashed_password.startswith("$argon2"):
+        if policy.scheme != "argon2id":
+            return True
+        hasher = _argon2_hasher(policy.argon2_time_cost, policy.argon2_memory_kib, policy.argon2_parallelism)
+        return hasher.check_needs_rehash(hashed_password)
+    if policy.scheme != "bcrypt":
+        return True
+    # $2b$<rounds>$<salt+hash>
+    parts = hashed_password.split("$")
+    return len(parts) < 3 or not parts[2].isdigit() or int(parts[2]) != policy.bcrypt_rounds
+
+
+async def hash_password_async(plain_password: str) -> str:
+    """Hash a password on the bounded hashing pool."""
+    return await get_password_pool().run(hash_password, plain_password, current_policy())
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the bounded hashing pool."""
+    return await get_password_pool().run(verify_password, plain_password, hashed_password)
+
+
+def _timed(fn: Callable[..., Any], *args: Any) -> tuple[Any, float]:
+    """Run fn in the worker and report its own CPU-side duration."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordHasherPool:
+    """Bounded worker pool for password hashing with admission control and latency stats.
+
+    At most `workers + queue_size` calls are admitted; the rest fail fast with
+    503 so a login burst cannot build an unbounded backlog or starve the
+    request threadpool.
+    """
+
+    def __init__(self, workers: int, queue_size: int) -> None:
+        self.workers = workers
+        self.capacity = max(workers, 1) + queue_size
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._count = 0
+        self._hash_seconds = 0.0
+        self._hash_seconds_max = 0.0
+        self._wait_seconds = 0.0
+
+    def _get_executor(self) -> Executor | None:
+        if self.workers > 0 and self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: workers only import this module, never fork the app's threads/sockets
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(*args) on the pool, or raise 503 if the pool is saturated."""
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                PASSWORD_HASH_REJECTED.inc()
+                raise ServiceUnavailableException("Authentication is busy, retry shortly")
+            self._in_flight += 1
+        start = time.perf_counter()
+        try:
+            # workers=0 -> default loop executor (threads)
+            result, hash_seconds = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), _timed, fn, *args
+            )
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        total = time.perf_counter() - start
+        PASSWORD_HASH_SECONDS.observe(hash_seconds)
+        PASSWORD_HASH_WAIT_SECONDS.observe(max(total - hash_seconds, 0.0))
+        with self._lock:
+            self._count += 1
+            self._hash_seconds += hash_seconds
+            self._hash_seconds_max = max(self._hash_seconds_max, hash_seconds)
+            self._wait_seconds += max(total - hash_seconds, 0.0)
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        """Snapshot of pool metrics: queue depth, rejections, hash latency."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "queue_depth": max(self._in_flight - max(self.workers, 1), 0),
+                "rejected_total": self._rejected,
+                "hash_count": self._count,
+                "hash_seconds_total": self._hash_seconds,
+                "hash_seconds_max": self._hash_seconds_max,
+                "queue_wait_seconds_total": self._wait_seconds,
+            }
+
+    def shutdown(self) -> None:
+        """Stop worker processes (app shutdown)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache
+def get_password_pool() -> PasswordHasherPool:
+    """Process-wide hashing pool sized from Settings."""
+    settings = get_settings()
+    return PasswordHasherPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_SIZE)
+
+
+def _pool_gauges():
+    stats = get_password_pool().stats()
+    yield ("in_flight",), stats["in_flight"]
+    yield ("queued",), stats["queue_depth"]
+
+
+REGISTRY.gauge_callback("password_hash_pool_tasks", "Hash/verify calls in the pool by state.", ("state",), _pool_gauges)
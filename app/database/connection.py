@@ -1,12 +1,20 @@
 """Database connection and session management."""
 import os
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Callable, Generator
+from typing import Any, TypeVar
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import get_settings
+from app.database import profiling
 from app.database.models import Base  # noqa: F401 - ensure models are registered
+from app.utils.metrics import REGISTRY
+
+T = TypeVar("T")
 
 # Prefer DATABASE_URL from env (Render, Docker, etc.); fallback to Settings (.env)
 _database_url = os.getenv("DATABASE_URL") or get_settings().DATABASE_URL
@@ -15,14 +23,125 @@ if not _database_url:
         "DATABASE_URL is not set. Set it in .env for local dev or in the environment for production (e.g. Render)."
     )
 
-engine = create_engine(
-    _database_url,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-)
+if get_settings().SQL_PROFILING:
+    profiling.install()
+
+def engine_options(url: str) -> dict[str, Any]:
+    """Pool options from Settings, shared by every engine (primary/replica, sync/async)."""
+    settings = get_settings()
+    options = {"pool_recycle": settings.DB_POOL_RECYCLE, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return options  # in-memory SQLite uses a single-connection pool without size/overflow
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        **options,
+    }
+
+
+engine = create_engine(_database_url, **engine_options(_database_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional read replica for read-only routes; without one, reads share the primary engine
+_read_url = get_settings().DATABASE_READ_URL
+read_engine = create_engine(_read_url, **engine_options(_read_url)) if _read_url else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine) if _read_url else SessionLocal
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL to its async driver (asyncpg / aiosqlite)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+        # asyncpg takes ssl=..., not libpq's sslmode=...
+        if "sslmode" in parsed.query:
+            query = dict(parsed.query)
+            query["ssl"] = query.pop("sslmode")
+            parsed = parsed.set(query=query)
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+async_engine: AsyncEngine | None = None
+AsyncSessionLocal: async_sessionmaker[AsyncSession] | None = None
+async_read_engine: AsyncEngine | None = None
+AsyncReadSessionLocal: async_sessionmaker[AsyncSession] | None = None
+if get_settings().DATABASE_ASYNC:
+    async_engine = create_async_engine(to_async_url(_database_url), **engine_options(_database_url))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    async_read_engine = async_engine
+    AsyncReadSessionLocal = AsyncSessionLocal
+    if _read_url:
+        async_read_engine = create_async_engine(to_async_url(_read_url), **engine_options(_read_url))
+        AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+
+def _engines() -> dict[str, Any]:
+    """Distinct engines by label; the replica is listed only when it is a separate engine."""
+    engines = {"primary": engine, "primary_async": async_engine}
+    if read_engine is not engine:
+        engines["replica"] = read_engine
+    if async_read_engine is not async_engine:
+        engines["replica_async"] = async_read_engine
+    return {name: eng for name, eng in engines.items() if eng is not None}
+
+
+def pool_stats() -> dict[str, dict[str, Any]]:
+    """Checked-out/overflow/idle connections per engine, plus checkout counters."""
+    stats = {}
+    for name, eng in _engines().items():
+        pool = eng.pool
+        counters = _pool_counters.get(name, {})
+        stats[name] = {
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            "idle": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            "connects": counters.get("connect", 0),
+            "checkouts": counters.get("checkout", 0),
+        }
+    return stats
+
+
+_pool_counters: dict[str, dict[str, int]] = {}
+
+
+def _count_pool_events(name: str, eng: Any) -> None:
+    sync_engine = getattr(eng, "sync_engine", eng)
+    counters = _pool_counters.setdefault(name, {"connect": 0, "checkout": 0})
+
+    def on_connect(*_: Any) -> None:
+        counters["connect"] += 1
+
+    def on_checkout(*_: Any) -> None:
+        counters["checkout"] += 1
+
+    event.listen(sync_engine.pool, "connect", on_connect)
+    event.listen(sync_engine.pool, "checkout", on_checkout)
+
+
+for _name, _engine in _engines().items():
+    _count_pool_events(_name, _engine)
+
+
+def _pool_samples(stat: str):
+    """Yield (labels, value) of one pool_stats() field for each engine."""
+    for name, stats in pool_stats().items():
+        if stats[stat] is not None:
+            yield (name,), stats[stat]
+
+
+REGISTRY.gauge_callback("db_pool_checked_out", "DB connections currently checked out.", ("engine",), lambda: _pool_samples("checked_out"))
+REGISTRY.gauge_callback("db_pool_overflow", "DB connections open beyond pool_size.", ("engine",), lambda: _pool_samples("overflow"))
+REGISTRY.gauge_callback("db_pool_idle", "Idle DB connections in the pool.", ("engine",), lambda: _pool_samples("idle"))
+REGISTRY.gauge_callback("db_pool_size", "Configured DB pool size.", ("engine",), lambda: _pool_samples("size"))
+REGISTRY.gauge_callback("db_pool_connects", "DB connections opened since start.", ("engine",), lambda: _pool_samples("connects"))
+REGISTRY.gauge_callback("db_pool_checkouts", "DB pool checkouts since start.", ("engine",), lambda: _pool_samples("checkouts"))
+
 
 def get_db() -> Generator[Session, None, None]:
     """Dependency that yields a database session."""
@@ -31,3 +150,64 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency that yields an async database session (DATABASE_ASYNC=true)."""
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database is disabled; set DATABASE_ASYNC=true")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Session dependency used by routes: async engine or sync engine, picked by DATABASE_ASYNC
+get_session = get_async_db if get_settings().DATABASE_ASYNC else get_db
+
+
+def _get_replica_db() -> Generator[Session, None, None]:
+    """Dependency that yields a session on the read replica."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency that yields an async session on the read replica (or primary)."""
+    if AsyncReadSessionLocal is None:
+        raise RuntimeError("Async database is disabled; set DATABASE_ASYNC=true")
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+# Read-only routes: replica when DATABASE_READ_URL is set, else the primary dependency itself
+# (so overriding get_db / get_session also covers reads)
+get_read_db = _get_replica_db if _read_url else get_db
+get_read_session = get_async_read_db if get_settings().DATABASE_ASYNC else get_read_db
+
+
+async def run_db(db: Session | AsyncSession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a sync service function `fn(session, ...)` without blocking the event loop.
+
+    Async sessions run it via AsyncSession.run_sync (greenlet on the async driver);
+    sync sessions run it in the threadpool. Service code stays a single implementation.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+async def run_db_in_thread(db: Session | AsyncSession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Like run_db, but always in the threadpool: for long, CPU-heavy work such as imports.
+
+    AsyncSession.run_sync would hold the event loop for the whole call, so an
+    async session is replaced by a sync SessionLocal session on the same database.
+    """
+    if isinstance(db, AsyncSession):
+        def run() -> T:
+            with SessionLocal() as own:
+                return fn(own, *args, **kwargs)
+
+        return await run_in_threadpool(run)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
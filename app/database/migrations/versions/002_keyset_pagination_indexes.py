@@ -0,0 +1,28 @@
+"""Keyset pagination indexes on (created_at, id).
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # (id) keyset uses the primary key; (created_at, id) needs a composite index
+    op.create_index("ix_products_created_at_id", "products", ["created_at", "id"])
+    op.create_index("ix_users_created_at_id", "users", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_created_at_id", table_name="users")
+    op.drop_index("ix_products_created_at_id", table_name="products")
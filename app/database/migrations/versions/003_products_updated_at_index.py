@@ -0,0 +1,25 @@
+"""Index products.updated_at for cheap list validators (ETag / Last-Modified).
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f("ix_products_updated_at"), "products", ["updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_products_updated_at"), table_name="products")
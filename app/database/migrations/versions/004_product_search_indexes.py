@@ -0,0 +1,31 @@
+"""Product search indexes: full-text GIN on name/description, B-tree on (price, id).
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.database.models import PRODUCT_SEARCH_DOCUMENT
+
+
+# revision identifiers, used by Alembic.
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_products_price_id", "products", ["price", "id"])
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(f"CREATE INDEX ix_products_search ON products USING gin ({PRODUCT_SEARCH_DOCUMENT})")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX ix_products_search")
+    op.drop_index("ix_products_price_id", table_name="products")
@@ -3,10 +3,14 @@ from datetime import datetime
 from enum import Enum as PyEnum
 from decimal import Decimal
 
-from sqlalchemy import DateTime, Enum, Numeric, String, Text, func
+from sqlalchemy import DateTime, Enum, ForeignKey, Index, Integer, LargeBinary, Numeric, String, Text, UniqueConstraint, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
+# Full-text document for product search; must match the ix_products_search GIN index (migration 004)
+PRODUCT_SEARCH_DOCUMENT = "to_tsvector('simple', name || ' ' || coalesce(description, ''))"
+
+
 class Base(DeclarativeBase):
     """Declarative base for all models."""
     pass
@@ -21,6 +25,7 @@ class UserRole(str, PyEnum):
 class User(Base):
     """User model: id, name, email, password_hash, role, created_at, updated_at."""
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -34,10 +39,54 @@ class User(Base):
 class Product(Base):
     """Product model: id, name, description, price, created_at, updated_at."""
     __tablename__ = "products"
+    # The Postgres-only GIN search index lives in migration 004 (expression index, not portable)
+    __table_args__ = (
+        Index("ix_products_created_at_id", "created_at", "id"),
+        Index("ix_products_price_id", "price", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
     price: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Indexed so max(updated_at) (list validator for ETags) is an index lookup
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True
+    )
+
+
+class RefreshToken(Base):
+    """Rotating refresh token: stored as an HMAC of the opaque token, one family per login.
+
+    Each refresh revokes the presented token and issues its successor in the same
+    family; presenting an already-revoked token (reuse) revokes the whole family.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash: Mapped[str] = mapped_column(String(64), nullable=False, unique=True, index=True)
+    family_id: Mapped[str] = mapped_column(String(32), nullable=False, index=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    revoked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class IdempotencyKey(Base):
+    """Stored outcome of a write sent with an Idempotency-Key header, per user.
+
+    `status_code` is NULL while the first request is in flight; `expires_at` is then
+    the claim's lock deadline, and after completion the end of the replay window.
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_id_key"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    response_body: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
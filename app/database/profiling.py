@@ -0,0 +1,149 @@
+"""SQL query profiling: per-request query count/time, N+1 and slow-query detection.
+
+Engine-level event hooks feed whichever QueryStats are active: the current
+request's (a ContextVar, so it follows the request into the threadpool and into
+AsyncSession greenlets) and any capture_queries() blocks (used by tests).
+"""
+import threading
+import time
+from collections import Counter
+from collections.abc import Generator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import get_settings
+from app.utils.logger import get_logger
+
+logger = get_logger("sql")
+
+_EXPLAIN_PREFIX = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+
+
+@dataclass
+class QueryStats:
+    """Queries executed in one request (or capture block)."""
+
+    count: int = 0
+    seconds: float = 0.0
+    record_statements: bool = False
+    statements: list[str] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, statement: str, elapsed: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.seconds += elapsed
+            if self.record_statements:
+                self.statements.append(statement)
+
+    @property
+    def milliseconds(self) -> float:
+        return self.seconds * 1000
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements executed at least `threshold` times (likely N+1 loops)."""
+        return [(sql, n) for sql, n in Counter(self.statements).most_common() if n >= threshold]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+_captures: list[QueryStats] = []
+_captures_lock = threading.Lock()
+
+
+def start_request() -> tuple[QueryStats, Token]:
+    """Begin collecting stats for the current request."""
+    stats = QueryStats(record_statements=get_settings().SQL_DEBUG)
+    return stats, _current.set(stats)
+
+
+def finish_request(token: Token, stats: QueryStats, method: str, path: str) -> None:
+    """Stop collecting; in SQL_DEBUG mode warn about repeated identical statements."""
+    _current.reset(token)
+    settings = get_settings()
+    if not settings.SQL_DEBUG:
+        return
+    for statement, times in stats.repeated(settings.SQL_REPEAT_THRESHOLD):
+        logger.warning("Possible N+1 in %s %s: statement ran %d times: %s", method, path, times, _one_line(statement))
+
+
+def current_stats() -> Optional[QueryStats]:
+    """Stats of the request being served, if any."""
+    return _current.get()
+
+
+@contextmanager
+def capture_queries() -> Generator[QueryStats, None, None]:
+    """Record every query run on any engine/thread inside the block."""
+    stats = QueryStats(record_statements=True)
+    with _captures_lock:
+        _captures.append(stats)
+    try:
+        yield stats
+    finally:
+        with _captures_lock:
+            _captures.remove(stats)
+
+
+def server_timing(stats: QueryStats, total_seconds: float) -> str:
+    """Server-Timing header value with DB time/count and total app time."""
+    return (
+        f'db;dur={stats.milliseconds:.1f};desc="{stats.count} queries", '
+        f"app;dur={total_seconds * 1000:.1f}"
+    )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    if conn.info.get("explaining"):
+        return
+    stats = _current.get()
+    if stats is not None:
+        stats.add(statement, elapsed)
+    if _captures:
+        with _captures_lock:
+            captures = list(_captures)
+        for capture in captures:
+            capture.add(statement, elapsed)
+    settings = get_settings()
+    if settings.SQL_DEBUG and elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1fms): %s\nPlan:\n%s",
+            elapsed * 1000,
+            _one_line(statement),
+            _explain(conn, statement, parameters, executemany),
+        )
+
+
+def _explain(conn, statement: str, parameters: Any, executemany: bool) -> str:
+    """Plan of a slow SELECT, run on the same connection; other statements are not explained."""
+    prefix = _EXPLAIN_PREFIX.get(conn.dialect.name)
+    if prefix is None or executemany or not statement.lstrip().upper().startswith("SELECT"):
+        return "(not available)"
+    conn.info["explaining"] = True
+    try:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+    except Exception as exc:  # plan output is diagnostic only
+        return f"(explain failed: {exc})"
+    finally:
+        conn.info["explaining"] = False
+    return "\n".join(" ".join(str(col) for col in row) for row in rows)
+
+
+def _one_line(statement: str) -> str:
+    return " ".join(statement.split())
+
+
+def install() -> None:
+    """Attach the profiling hooks to every Engine (sync, and the sync side of async engines)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
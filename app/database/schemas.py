@@ -1,9 +1,10 @@
 """Pydantic schemas for request/response validation."""
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import Any, Optional
 
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator
+from typing_extensions import TypedDict
 
 from app.database.models import UserRole
 
@@ -32,6 +33,12 @@ class UserResponse(UserBase):
     updated_at: datetime
 
 
+class UserPage(BaseModel):
+    """Keyset-paginated users; pass next_cursor back as ?cursor= for the next page."""
+    items: list[UserResponse]
+    next_cursor: Optional[str] = None
+
+
 # ----- Auth -----
 class TokenPayload(BaseModel):
     sub: str
@@ -39,6 +46,13 @@ class TokenPayload(BaseModel):
     role: Optional[str] = None
 
 
+class Principal(BaseModel):
+    """Authenticated caller built from verified token claims (stateless auth)."""
+    id: int
+    role: UserRole
+    email: Optional[str] = None
+
+
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
@@ -47,6 +61,12 @@ class LoginRequest(BaseModel):
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    expires_in: Optional[int] = None
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str = Field(..., min_length=1, max_length=255)
 
 
 # ----- Product -----
@@ -65,9 +85,77 @@ class ProductUpdate(BaseModel):
     description: Optional[str] = None
     price: Optional[Decimal] = Field(None, ge=0, decimal_places=2)
 
+    @field_validator("name", "price")
+    @classmethod
+    def _not_null(cls, value: Any) -> Any:
+        # Omitted means unchanged; an explicit null would violate the NOT NULL column
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
 
 class ProductResponse(ProductBase):
     model_config = ConfigDict(from_attributes=True)
     id: int
     created_at: datetime
     updated_at: datetime
+
+
+class ProductPage(BaseModel):
+    """Keyset-paginated products; pass next_cursor back as ?cursor= for the next page."""
+    items: list[ProductResponse]
+    next_cursor: Optional[str] = None
+
+
+class ProductRow(TypedDict):
+    """Product as selected from the DB for pre-encoded list responses.
+
+    Same keys, order and JSON encoding as ProductResponse, without per-row model validation.
+    """
+    name: str
+    description: Optional[str]
+    price: Decimal
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class ProductRowPage(TypedDict):
+    """Pre-encoded counterpart of ProductPage."""
+    items: list[ProductRow]
+    next_cursor: Optional[str]
+
+
+# ----- Bulk product operations -----
+class ProductBulkUpdateItem(ProductUpdate):
+    id: int
+
+
+class ProductBulkDelete(BaseModel):
+    ids: list[int] = Field(..., min_length=1)
+
+
+class BulkItemError(BaseModel):
+    """Why one item of a bulk request was rejected (index into the request list)."""
+    index: int
+    id: Optional[int] = None
+    detail: Any
+
+
+class ProductBulkResponse(BaseModel):
+    items: list[ProductResponse]
+    errors: list[BulkItemError] = []
+
+
+class ProductBulkDeleteResponse(BaseModel):
+    deleted: list[int]
+    errors: list[BulkItemError] = []
+
+
+class ProductImportSummary(BaseModel):
+    """Result of POST /products/import. Error indexes are 1-based data row numbers."""
+    rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0
+    errors: list[BulkItemError] = []
@@ -1,14 +1,22 @@
-"""FastAPI application entry point with CORS, exception handling, logging."""
+"""FastAPI application entry point with CORS, compression, exception handling, logging, metrics."""
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import get_settings
+from app.core.security import get_password_pool
+from app.database.connection import engine
+from app.services.catalog_snapshot import start_catalog
 from app.utils.exceptions import AppException
-from app.utils.logger import get_logger, log_request
+from app.utils.invalidation import start_invalidation_bus
+from app.utils.logger import get_logger
+from app.utils.metrics import REGISTRY, start_flusher
+from app.utils.middleware import CompressionMiddleware, RequestContextMiddleware
 
 from app.api.v1.routes_auth import router as auth_router
 from app.api.v1.routes_users import router as users_router
@@ -21,7 +29,15 @@ settings = get_settings()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup/shutdown. Use Alembic for schema: alembic upgrade head."""
+    flusher = start_flusher()
+    invalidation = start_invalidation_bus(engine)
+    await run_in_threadpool(start_catalog, engine)
     yield
+    if invalidation is not None:
+        invalidation.stop()
+    get_password_pool().shutdown()
+    if flusher is not None:
+        flusher.stop()
 
 
 app = FastAPI(
@@ -33,7 +49,16 @@ app = FastAPI(
     openapi_url="/api/openapi.json",
 )
 
-# CORS
+# Middleware, innermost first (Starlette wraps each added middleware around the previous ones):
+# compression -> request context (IDs, timing, metrics, access log) -> CORS outermost, so
+# preflights are answered before any other work and CORS headers land on every response.
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    compresslevel=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+app.add_middleware(RequestContextMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[o.strip() for o in settings.CORS_ORIGINS.split(",")],
@@ -43,20 +68,13 @@ app.add_middleware(
 )
 
 
-@app.middleware("http")
-async def logging_middleware(request: Request, call_next):
-    """Log every request and response status."""
-    response = await call_next(request)
-    log_request(request.method, request.url.path, response.status_code)
-    return response
-
-
 @app.exception_handler(AppException)
 def app_exception_handler(request: Request, exc: AppException):
     """Centralized handler for AppException."""
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
+        headers=exc.headers,
     )
 
 
@@ -69,6 +87,17 @@ def validation_exception_handler(request: Request, exc: RequestValidationError):
     )
 
 
+@app.exception_handler(PoolTimeoutError)
+def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    """No DB connection freed up within DB_POOL_TIMEOUT: shed load instead of a 500."""
+    logger.warning("DB pool checkout timed out: %s %s", request.method, request.url.path)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database busy, retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
 # API v1
 app.include_router(auth_router, prefix="/api/v1")
 app.include_router(users_router, prefix="/api/v1")
@@ -79,3 +108,9 @@ app.include_router(products_router, prefix="/api/v1")
 def health():
     """Health check."""
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text exposition of request, DB pool and password-hash metrics."""
+    return PlainTextResponse(REGISTRY.exposition(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,21 +1,153 @@
-"""Authentication service: registration, login, token creation."""
-from app.core.jwt_handler import create_access_token
-from app.core.security import hash_password, verify_password
-from app.database.models import User, UserRole
+"""Authentication service: registration, login, token creation and refresh."""
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.core.config import get_settings
+from app.core.jwt_handler import (
+    Claims,
+    access_token_lifetime,
+    create_access_token,
+    create_refresh_token,
+    hash_refresh_token,
+    revoke_token,
+)
+from app.core.security import (
+    PASSWORD_REHASHED,
+    hash_password,
+    hash_password_async,
+    needs_rehash,
+    verify_password,
+    verify_password_async,
+)
+from app.database.connection import run_db
+from app.database.models import RefreshToken, User, UserRole
 from app.database.schemas import LoginRequest, TokenResponse, UserCreate, UserResponse
+from app.services.user_service import get_user_by_email
 from app.utils.exceptions import UnauthorizedException, ConflictException
+from app.utils.invalidation import ChangeEvent, bus, publish_change
+from app.utils.logger import get_logger
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+logger = get_logger(__name__)
+
 
 def register_user(db: Session, data: UserCreate) -> UserResponse:
     """Register a new user. Email must be unique."""
-    existing = db.query(User).filter(User.email == data.email).first()
-    if existing:
+    if get_user_by_email(db, data.email):
+        raise ConflictException("Email already registered")
+    return _create_user(db, data, hash_password(data.password))
+
+
+def login_user(db: Session, data: LoginRequest) -> TokenResponse:
+    """Authenticate user and return JWT."""
+    user = get_user_by_email(db, data.email)
+    if not user or not verify_password(data.password, user.password_hash):
+        raise UnauthorizedException("Invalid email or password")
+    if needs_rehash(user.password_hash):
+        _set_password_hash(user, hash_password(data.password))
+    return _issue_token(db, user)
+
+
+async def register_user_async(db: Session | AsyncSession, data: UserCreate) -> UserResponse:
+    """Async register: DB work via run_db, bcrypt on the hashing pool."""
+    if await run_db(db, get_user_by_email, data.email):
         raise ConflictException("Email already registered")
+    password_hash = await hash_password_async(data.password)
+    return await run_db(db, _create_user, data, password_hash)
+
+
+async def login_user_async(db: Session | AsyncSession, data: LoginRequest) -> TokenResponse:
+    """Async login: DB work via run_db, bcrypt on the hashing pool."""
+    user = await run_db(db, get_user_by_email, data.email)
+    if not user or not await verify_password_async(data.password, user.password_hash):
+        raise UnauthorizedException("Invalid email or password")
+    if needs_rehash(user.password_hash):
+        _set_password_hash(user, await hash_password_async(data.password))
+    return await run_db(db, _issue_token, user)
+
+
+def refresh_session(db: Session, refresh_token: str) -> TokenResponse:
+    """Rotate a refresh token: new access + refresh token, no password check.
+
+    One indexed lookup and an HMAC. A token that was already rotated (reuse,
+    i.e. a stolen copy or a replay) revokes its whole family.
+    """
+    row = db.execute(
+        select(RefreshToken, User)
+        .join(User, User.id == RefreshToken.user_id)
+        .where(RefreshToken.token_hash == hash_refresh_token(refresh_token))
+    ).first()
+    if row is None:
+        raise UnauthorizedException("Invalid refresh token")
+    stored, user = row
+    now = datetime.now(timezone.utc)
+    if _as_utc(stored.expires_at) <= now:
+        raise UnauthorizedException("Refresh token expired")
+    # Conditional UPDATE: of two concurrent refreshes with the same token only one wins
+    claimed = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == stored.id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    ).rowcount
+    if not claimed:
+        _revoke_family(db, stored.family_id, now)
+        db.commit()
+        logger.warning("Refresh token reuse detected for user %s; session family revoked", user.id)
+        raise UnauthorizedException("Refresh token already used; log in again")
+    return _issue_token(db, user, family_id=stored.family_id)
+
+
+def logout(db: Session, refresh_token: str, access_claims: Optional[Claims] = None) -> None:
+    """Revoke the refresh token's whole family (this login on every device it was rotated to).
+
+    With `access_claims`, that access token's jti is denied here and, through the
+    invalidation bus, on the other workers.
+    """
+    family_id = db.scalar(
+        select(RefreshToken.family_id).where(RefreshToken.token_hash == hash_refresh_token(refresh_token))
+    )
+    if family_id is not None:
+        _revoke_family(db, family_id, datetime.now(timezone.utc))
+        db.commit()
+    if access_claims is not None and access_claims.get("jti"):
+        revoke_token(access_claims)
+        publish_change(db, "access_token", [access_claims["jti"]])
+
+
+def _apply_remote_revocations(events: list[ChangeEvent]) -> None:
+    """Access tokens logged out on another worker: deny their jti here for a full token lifetime."""
+    lifetime = access_token_lifetime()
+    for event in events:
+        if event.id is not None:
+            revoke_token({"jti": event.id, "exp": event.version + lifetime})
+
+
+bus.subscribe("access_token", _apply_remote_revocations)
+
+
+def purge_refresh_tokens(db: Session) -> int:
+    """Delete expired refresh tokens and families with no live token left; returns the count.
+
+    Rotated tokens of live families are kept until they expire: replaying one must
+    still be detected as reuse and revoke the family.
+    """
+    now = datetime.now(timezone.utc)
+    live_families = select(RefreshToken.family_id).where(RefreshToken.revoked_at.is_(None), RefreshToken.expires_at > now)
+    deleted = db.execute(
+        delete(RefreshToken).where(or_(RefreshToken.expires_at <= now, RefreshToken.family_id.not_in(live_families)))
+    )
+    db.commit()
+    return deleted.rowcount
+
+
+def _create_user(db: Session, data: UserCreate, password_hash: str) -> UserResponse:
     user = User(
         name=data.name,
         email=data.email,
-        password_hash=hash_password(data.password),
+        password_hash=password_hash,
         role=UserRole.user,  # public registration always gets 'user' role
     )
     db.add(user)
@@ -24,13 +156,38 @@ def register_user(db: Session, data: UserCreate) -> UserResponse:
     return UserResponse.model_validate(user)
 
 
-def login_user(db: Session, data: LoginRequest) -> TokenResponse:
-    """Authenticate user and return JWT."""
-    user = db.query(User).filter(User.email == data.email).first()
-    if not user or not verify_password(data.password, user.password_hash):
-        raise UnauthorizedException("Invalid email or password")
+def _issue_token(db: Session, user: User, family_id: Optional[str] = None) -> TokenResponse:
+    """Access token plus a new refresh token (stored, committed) in `family_id` or a new family."""
     token = create_access_token(
         subject=user.id,
         extra_claims={"role": user.role.value, "email": user.email},
     )
-    return TokenResponse(access_token=token)
+    refresh_token, token_hash = create_refresh_token()
+    expires_at = datetime.now(timezone.utc) + timedelta(days=get_settings().JWT_REFRESH_TOKEN_EXPIRE_DAYS)
+    db.add(RefreshToken(
+        user_id=user.id,
+        token_hash=token_hash,
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=expires_at,
+    ))
+    db.commit()
+    return TokenResponse(access_token=token, expires_in=access_token_lifetime(), refresh_token=refresh_token)
+
+
+def _set_password_hash(user: User, password_hash: str) -> None:
+    """Upgrade a stored hash to the current scheme/cost; committed with the login's refresh token."""
+    user.password_hash = password_hash
+    PASSWORD_REHASHED.inc()
+
+
+def _revoke_family(db: Session, family_id: str, now: datetime) -> None:
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes even for DateTime(timezone=True)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
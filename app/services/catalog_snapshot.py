@@ -0,0 +1,283 @@
+"""In-memory catalog snapshot: every product pre-encoded, list pages served as byte slices.
+
+With CATALOG_SNAPSHOT on, each worker loads all products at startup into an
+immutable CatalogSnapshot. Rows are encoded once (same bytes as the DB list
+path) and laid out back to back per sort order, with sorted key arrays beside
+them, so `GET /products` without `q` is a bisect plus a slice: no query, no
+Pydantic. Price filters are served for price sorts (a contiguous key range);
+anything else falls back to the DB path.
+
+Writes replace the snapshot copy-on-write, re-encoding only the changed rows.
+Other workers' writes arrive through the invalidation bus (app.utils.invalidation),
+whose reconnects reload the whole snapshot.
+"""
+import json
+import math
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Collection, Iterable
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, NamedTuple, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy import Engine, select
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.database.models import Product
+from app.database.schemas import ProductRow
+from app.utils.invalidation import ChangeEvent, bus
+from app.utils.logger import get_logger
+from app.utils.metrics import REGISTRY
+from app.utils.pagination import decode_cursor_values, encode_cursor
+
+logger = get_logger(__name__)
+
+_row_adapter = TypeAdapter(ProductRow)
+_ROW_FIELDS = tuple(ProductRow.__annotations__)
+_ROW_COLUMNS = tuple(getattr(Product, field) for field in _ROW_FIELDS)
+# Per sort: key columns (cursor coercion), key fields (cursor values) and the ascending sort key
+_CURSOR_COLUMNS = {
+    "id": (Product.id,),
+    "created_at": (Product.created_at, Product.id),
+    "price": (Product.price, Product.id),
+    "-price": (Product.price, Product.id),
+}
+_CURSOR_FIELDS = {"id": ("id",), "created_at": ("created_at", "id"), "price": ("price", "id"), "-price": ("price", "id")}
+
+CATALOG_SNAPSHOT_UPDATES = REGISTRY.counter(
+    "catalog_snapshot_updates_total", "Catalog snapshot rebuilds by source.", ("source",)
+)
+
+
+def _sort_key(sort: str, values: tuple) -> tuple:
+    """Ascending key for `sort` from its cursor values (-price negates, so it also ascends)."""
+    if sort == "-price":
+        return tuple(-v for v in values)
+    return values
+
+
+class _Ordering(NamedTuple):
+    keys: list[tuple]
+    ids: array
+    buffer: bytes
+    # offsets[i] is where row i starts; offsets[n] == len(buffer) + 1 (as if a trailing comma)
+    offsets: array
+
+    def slice(self, start: int, end: int) -> bytes:
+        if start >= end:
+            return b""
+        return self.buffer[self.offsets[start]:self.offsets[end] - 1]
+
+
+class CatalogSnapshot:
+    """Immutable view of all products; build a changed copy with `with_changes`."""
+
+    def __init__(self, rows: dict[int, ProductRow], encoded: dict[int, bytes], keys: dict[str, list[tuple]]) -> None:
+        self.rows = rows
+        self._encoded = encoded
+        self._orderings = {sort: self._layout(sort_keys) for sort, sort_keys in keys.items()}
+        self.validator: tuple[Optional[datetime], int] = (
+            max((row["updated_at"] for row in rows.values()), default=None),
+            len(rows),
+        )
+
+    @classmethod
+    def build(cls, rows: Iterable[ProductRow]) -> "CatalogSnapshot":
+        by_id = {row["id"]: row for row in rows}
+        encoded = {pid: _row_adapter.dump_json(row) for pid, row in by_id.items()}
+        keys = {sort: sorted(_sort_key(sort, _cursor_values(sort, row)) for row in by_id.values())
+                for sort in _CURSOR_FIELDS}
+        return cls(by_id, encoded, keys)
+
+    def with_changes(self, upserts: Iterable[ProductRow], deleted: Iterable[int]) -> "CatalogSnapshot":
+        """New snapshot with rows replaced/added/removed; untouched rows keep their encoding."""
+        rows, encoded = dict(self.rows), dict(self._encoded)
+        keys = {sort: list(ordering.keys) for sort, ordering in self._orderings.items()}
+        changes = [(row["id"], row) for row in upserts] + [(pid, None) for pid in deleted]
+        for pid, row in changes:
+            old = rows.pop(pid, None)
+            encoded.pop(pid, None)
+            for sort, sort_keys in keys.items():
+                if old is not None:
+                    del sort_keys[bisect_left(sort_keys, _sort_key(sort, _cursor_values(sort, old)))]
+                if row is not None:
+                    insort(sort_keys, _sort_key(sort, _cursor_values(sort, row)))
+            if row is not None:
+                rows[pid] = row
+                encoded[pid] = _row_adapter.dump_json(row)
+        return CatalogSnapshot(rows, encoded, keys)
+
+    def list_json(
+        self, skip: int, limit: int, q: Optional[str], min_price: Optional[Decimal], max_price: Optional[Decimal], sort: str
+    ) -> Optional[bytes]:
+        """Offset page as JSON bytes, or None when the query needs the DB path."""
+        bounds = self._bounds(q, min_price, max_price, sort)
+        if bounds is None:
+            return None
+        lo, hi = bounds
+        start = min(lo + skip, hi)
+        return b"[" + self._orderings[sort].slice(start, min(start + limit, hi)) + b"]"
+
+    def page_json(
+        self, cursor: Optional[str], limit: int, q: Optional[str], min_price: Optional[Decimal],
+        max_price: Optional[Decimal], sort: str,
+    ) -> Optional[bytes]:
+        """Keyset page as JSON bytes (same cursors as the DB path), or None for the DB path."""
+        bounds = self._bounds(q, min_price, max_price, sort)
+        if bounds is None:
+            return None
+        lo, hi = bounds
+        ordering = self._orderings[sort]
+        start = lo
+        if cursor:
+            values = decode_cursor_values(cursor, sort, _CURSOR_COLUMNS[sort])
+            try:
+                start = max(lo, bisect_right(ordering.keys, _sort_key(sort, tuple(values))))
+            except TypeError:  # e.g. an aware datetime against naive SQLite values
+                return None
+        end = min(start + limit, hi)
+        next_cursor = None
+        if end < hi:
+            next_cursor = encode_cursor(sort, _cursor_values(sort, self.rows[ordering.ids[end - 1]]))
+        return b'{"items":[' + ordering.slice(start, end) + b'],"next_cursor":' + json.dumps(next_cursor).encode() + b"}"
+
+    def _bounds(
+        self, q: Optional[str], min_price: Optional[Decimal], max_price: Optional[Decimal], sort: str
+    ) -> Optional[tuple[int, int]]:
+        if q or sort not in self._orderings:
+            return None
+        keys = self._orderings[sort].keys
+        if min_price is None and max_price is None:
+            return 0, len(keys)
+        if sort == "price":
+            lo = 0 if min_price is None else bisect_left(keys, (min_price,))
+            hi = len(keys) if max_price is None else bisect_right(keys, (max_price, math.inf))
+        elif sort == "-price":
+            lo = 0 if max_price is None else bisect_left(keys, (-max_price,))
+            hi = len(keys) if min_price is None else bisect_right(keys, (-min_price, math.inf))
+        else:
+            return None  # price filter over another order is not a contiguous range
+        return lo, max(lo, hi)
+
+    def _layout(self, sort_keys: list[tuple]) -> _Ordering:
+        ids = array("q", (abs(key[-1]) for key in sort_keys))
+        offsets = array("q", [0])
+        for pid in ids:
+            offsets.append(offsets[-1] + len(self._encoded[pid]) + 1)
+        return _Ordering(sort_keys, ids, b",".join(self._encoded[pid] for pid in ids), offsets)
+
+
+def _cursor_values(sort: str, row: ProductRow) -> tuple:
+    return tuple(row[field] for field in _CURSOR_FIELDS[sort])
+
+
+# ----- Process-wide snapshot -----
+_snapshot: Optional[CatalogSnapshot] = None
+_lock = threading.Lock()
+# Engine for applying other workers' changes (set by start_catalog)
+_bind: Optional[Engine] = None
+
+
+def get_catalog() -> Optional[CatalogSnapshot]:
+    """The current snapshot, or None when CATALOG_SNAPSHOT is off or it is not loaded yet."""
+    return _snapshot if get_settings().CATALOG_SNAPSHOT else None
+
+
+def load_catalog(db: Session | Any, source: str = "load") -> CatalogSnapshot:
+    """(Re)build the snapshot from every product row (`db`: Session or Connection)."""
+    global _snapshot
+    while True:
+        base = _snapshot
+        rows = db.execute(select(*_ROW_COLUMNS)).all()
+        snapshot = CatalogSnapshot.build(dict(zip(_ROW_FIELDS, values)) for values in rows)
+        with _lock:  # swap only if no other update landed while querying (else read again)
+            if _snapshot is base:
+                _snapshot = snapshot
+                break
+    CATALOG_SNAPSHOT_UPDATES.inc(source)
+    return snapshot
+
+
+def refresh_catalog(db: Session | Any, product_ids: Optional[Collection[int]], source: str = "local") -> None:
+    """Re-read `product_ids` (None: all) into the snapshot; ids no longer found are dropped.
+
+    Queries run outside the lock (they may be on the event loop under run_sync);
+    if another update swapped the snapshot meanwhile, the rows are read again.
+    """
+    global _snapshot
+    if product_ids is None:
+        if _snapshot is not None:
+            load_catalog(db, source)
+        return
+    while True:
+        base = _snapshot
+        if base is None:
+            return  # not loaded yet; the initial load will see these rows
+        rows = db.execute(select(*_ROW_COLUMNS).where(Product.id.in_(product_ids))).all()
+        upserts = [dict(zip(_ROW_FIELDS, values)) for values in rows]
+        found = {row["id"] for row in upserts}
+        snapshot = base.with_changes(upserts, [pid for pid in product_ids if pid not in found])
+        with _lock:
+            if _snapshot is base:
+                _snapshot = snapshot
+                break
+    CATALOG_SNAPSHOT_UPDATES.inc(source)
+
+
+REGISTRY.gauge_callback(
+    "catalog_snapshot_products", "Products in this worker's catalog snapshot.", (),
+    lambda: [((), len(_snapshot.rows))] if _snapshot is not None else [],
+)
+
+
+def clear_catalog() -> None:
+    """Drop the snapshot (reads fall back to the DB until the next load)."""
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def products_changed(db: Session, product_ids: Optional[Collection[int]]) -> None:
+    """After a committed write in this worker: re-read the changed rows into the snapshot."""
+    if get_settings().CATALOG_SNAPSHOT:
+        refresh_catalog(db, product_ids)
+
+
+def start_catalog(bind: Engine) -> None:
+    """Load the snapshot when CATALOG_SNAPSHOT is on; `bind` also serves other workers' changes.
+
+    Call after the invalidation bus has started, so no change falls between load and listen.
+    """
+    global _bind
+    if not get_settings().CATALOG_SNAPSHOT:
+        return
+    if bus.transport is None:
+        logger.warning(
+            "CATALOG_SNAPSHOT is on without an invalidation bus (INVALIDATION_BUS=%s): with more than "
+            "one worker, snapshots do not see other workers' writes until restart",
+            get_settings().INVALIDATION_BUS,
+        )
+    _bind = bind
+    with bind.connect() as conn:
+        load_catalog(conn)
+
+
+# ----- Other workers' writes (invalidation bus) -----
+def _apply_remote_changes(events: list[ChangeEvent]) -> None:
+    if _bind is None or _snapshot is None:
+        return
+    ids = None if any(event.id is None for event in events) else {event.id for event in events}
+    with _bind.connect() as conn:
+        refresh_catalog(conn, ids, "remote")
+
+
+def _resync() -> None:
+    if _bind is not None and get_settings().CATALOG_SNAPSHOT:
+        with _bind.connect() as conn:
+            load_catalog(conn, "resync")
+
+
+bus.subscribe("product", _apply_remote_changes, _resync)
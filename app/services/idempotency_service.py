@@ -0,0 +1,162 @@
+"""Idempotency keys for admin writes: a retried request replays the stored response.
+
+The first request with a key claims it (a row with no response yet), runs, and
+stores its status and body. A retry with the same key and payload gets that
+response without running the write again; a concurrent duplicate waits for the
+first one to finish (in-process via an asyncio.Event, across workers by polling
+the row). Failed writes release the claim, so the client may retry them.
+"""
+import asyncio
+import hashlib
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+from fastapi import Response
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.database.connection import run_db
+from app.database.models import IdempotencyKey
+from app.utils.exceptions import ConflictException, UnprocessableEntityException
+from app.utils.metrics import REGISTRY
+
+IDEMPOTENT_REPLAYS = REGISTRY.counter("idempotent_replays_total", "Writes answered from a stored Idempotency-Key response.")
+
+_POLL_SECONDS = 0.05
+# Claims held by requests running in this process; duplicates wait on the event instead of polling
+_in_flight: dict[tuple[int, str], asyncio.Event] = {}
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    status_code: Optional[int]
+    body: Optional[bytes]
+
+
+def request_fingerprint(method: str, path: str, payload: bytes = b"") -> str:
+    """Digest of what makes two requests "the same": method, path and the validated body."""
+    return hashlib.sha256(b"\0".join((method.encode(), path.encode(), payload))).hexdigest()
+
+
+def claim_key(db: Session, user_id: int, key: str, fingerprint: str) -> Optional[StoredResponse]:
+    """Claim `key` for a new request (returns None) or return the existing record.
+
+    Expired records (old responses, claims abandoned by a crashed worker) are taken over.
+    """
+    now = datetime.now(timezone.utc)
+    lock_until = now + timedelta(seconds=get_settings().IDEMPOTENCY_LOCK_SECONDS)
+    db.add(IdempotencyKey(user_id=user_id, key=key, fingerprint=fingerprint, expires_at=lock_until))
+    try:
+        db.commit()
+        return None
+    except IntegrityError:
+        db.rollback()
+    record = db.execute(
+        select(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    ).scalar_one_or_none()
+    if record is None:  # deleted (released or purged) in between
+        return claim_key(db, user_id, key, fingerprint)
+    if _as_utc(record.expires_at) <= now:
+        taken = db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.id == record.id, IdempotencyKey.expires_at == record.expires_at)
+            .values(fingerprint=fingerprint, status_code=None, response_body=None, expires_at=lock_until)
+        ).rowcount
+        db.commit()
+        return None if taken else claim_key(db, user_id, key, fingerprint)
+    return StoredResponse(record.fingerprint, record.status_code, record.response_body)
+
+
+def complete_key(db: Session, user_id: int, key: str, status_code: int, body: bytes) -> None:
+    """Store the response of a claimed key for IDEMPOTENCY_TTL_SECONDS."""
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=get_settings().IDEMPOTENCY_TTL_SECONDS)
+    db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        .values(status_code=status_code, response_body=body, expires_at=expires_at)
+    )
+    db.commit()
+
+
+def release_key(db: Session, user_id: int, key: str) -> None:
+    """Drop an unfinished claim (the write failed; a retry runs it again)."""
+    db.rollback()
+    db.execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None)
+        )
+    )
+    db.commit()
+
+
+def purge_expired_keys(db: Session) -> int:
+    """Delete expired records; returns the count (run periodically: python -m app.services.purge)."""
+    deleted = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now(timezone.utc)))
+    db.commit()
+    return deleted.rowcount
+
+
+async def idempotent(
+    db: Session | AsyncSession,
+    key: Optional[str],
+    user_id: int,
+    fingerprint: str,
+    status_code: int,
+    execute: Callable[[], Awaitable[bytes]],
+) -> Response:
+    """Run `execute` at most once per (user, key) and answer retries with the stored response.
+
+    Without a key the write just runs. A key reused with a different payload is a 422;
+    a duplicate still running after IDEMPOTENCY_WAIT_SECONDS is a 409.
+    """
+    if key is None:
+        return _response(status_code, await execute())
+    deadline = time.monotonic() + get_settings().IDEMPOTENCY_WAIT_SECONDS
+    while (stored := await run_db(db, claim_key, user_id, key, fingerprint)) is not None:
+        if stored.fingerprint != fingerprint:
+            raise UnprocessableEntityException("Idempotency-Key was already used with a different request")
+        if stored.status_code is not None:
+            IDEMPOTENT_REPLAYS.inc()
+            response = _response(stored.status_code, stored.body or b"")
+            response.headers["Idempotent-Replayed"] = "true"
+            return response
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ConflictException("A request with this Idempotency-Key is still in progress")
+        event = _in_flight.get((user_id, key))
+        try:
+            if event is not None:
+                await asyncio.wait_for(event.wait(), remaining)
+            else:
+                await asyncio.sleep(min(_POLL_SECONDS, remaining))
+        except asyncio.TimeoutError:
+            pass
+
+    event = _in_flight[(user_id, key)] = asyncio.Event()
+    try:
+        try:
+            body = await execute()
+        except BaseException:
+            await run_db(db, release_key, user_id, key)
+            raise
+        await run_db(db, complete_key, user_id, key, status_code, body)
+    finally:
+        _in_flight.pop((user_id, key), None)
+        event.set()
+    return _response(status_code, body)
+
+
+def _response(status_code: int, body: bytes) -> Response:
+    if status_code == 204:
+        return Response(status_code=204)
+    return Response(body, status_code=status_code, media_type="application/json")
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes even for DateTime(timezone=True)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
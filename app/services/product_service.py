@@ -1,8 +1,81 @@
-"""Product service: CRUD for products."""
-from app.database.models import Product
-from app.database.schemas import ProductCreate, ProductResponse, ProductUpdate
-from app.utils.exceptions import NotFoundException
+"""Product service: CRUD for products, with a read-through cache.
+
+Cache misses are single-flight: concurrent identical reads share one query and
+serialization (threads in `_cached`, coroutines in `read_shared`).
+"""
+import csv
+import io
+import itertools
+import json
+from collections.abc import AsyncIterator, Collection, Iterable, Iterator, Sequence
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, BinaryIO, Callable, Optional
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from app.core.config import get_settings
+from app.database.connection import run_db
+from app.database.models import PRODUCT_SEARCH_DOCUMENT, Product
+from app.database.schemas import (
+    BulkItemError,
+    ProductBulkDeleteResponse,
+    ProductBulkResponse,
+    ProductBulkUpdateItem,
+    ProductCreate,
+    ProductImportSummary,
+    ProductPage,
+    ProductResponse,
+    ProductRow,
+    ProductRowPage,
+    ProductUpdate,
+)
+from app.services.catalog_snapshot import products_changed
+from app.utils.cache import build_cache
+from app.utils.exceptions import BadRequestException, NotFoundException, PayloadTooLargeException
+from app.utils.invalidation import ChangeEvent, bus, publish_change
+from app.utils.logger import get_logger
+from app.utils.pagination import paginate_keyset
+from app.utils.singleflight import AsyncSingleFlight, SingleFlight
+from sqlalchemy import Double, Engine, cast, delete, func, insert, literal_column, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+logger = get_logger(__name__)
+
+_item_adapter = TypeAdapter(ProductResponse)
+_list_adapter = TypeAdapter(list[ProductResponse])
+_page_adapter = TypeAdapter(ProductPage)
+_validator_adapter = TypeAdapter(tuple[Optional[datetime], int])
+# Pre-encoded list responses: plain column rows dumped straight to JSON bytes
+_rows_adapter = TypeAdapter(list[ProductRow])
+_row_page_adapter = TypeAdapter(ProductRowPage)
+_ROW_FIELDS = tuple(ProductRow.__annotations__)
+_ROW_COLUMNS = tuple(getattr(Product, field) for field in _ROW_FIELDS)
+# Bumped on every write; list/page keys embed it so one INCR invalidates all pages
+_LIST_GENERATION = "products:gen"
+# Bumped by _invalidate_all; each item also has its own version counter (see _item_key)
+_ITEM_GENERATION = "products:item-gen"
+# Flight keys embed this process's write count, so reads that start after a local write
+# never join a fetch that began before it
+_writes = 0
+_cache_flight = SingleFlight("product_cache")
+_read_flight = AsyncSingleFlight("product_reads")
+
+
+@lru_cache
+def get_product_cache() -> Any:
+    """Product cache backend from Settings (None when PRODUCT_CACHE_BACKEND=none)."""
+    settings = get_settings()
+    return build_cache(
+        settings.PRODUCT_CACHE_BACKEND,
+        settings.PRODUCT_CACHE_MAX_ENTRIES,
+        settings.PRODUCT_CACHE_TTL_SECONDS,
+        settings.REDIS_URL,
+        prefix="primetrade:",
+    )
 
 
 def create_product(db: Session, data: ProductCreate) -> ProductResponse:
@@ -11,7 +84,10 @@ def create_product(db: Session, data: ProductCreate) -> ProductResponse:
     db.add(product)
     db.commit()
     db.refresh(product)
-    return ProductResponse.model_validate(product)
+    response = ProductResponse.model_validate(product)
+    _invalidate()
+    _changed(db, [response.id])
+    return response
 
 
 def get_product_by_id(db: Session, product_id: int) -> Product:
@@ -22,10 +98,140 @@ def get_product_by_id(db: Session, product_id: int) -> Product:
     return product
 
 
-def list_products(db: Session, skip: int = 0, limit: int = 100) -> list[ProductResponse]:
-    """List products with pagination."""
-    products = db.query(Product).offset(skip).limit(limit).all()
-    return [ProductResponse.model_validate(p) for p in products]
+def get_product(db: Session, product_id: int) -> ProductResponse:
+    """Get product by ID (cached) or raise 404."""
+    return _cached(
+        _item_key(product_id),
+        _item_adapter,
+        lambda: ProductResponse.model_validate(get_product_by_id(db, product_id)),
+    )
+
+
+def list_products(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    q: Optional[str] = None,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+    sort: str = "id",
+) -> list[ProductResponse]:
+    """List products with offset pagination, optional search/price filters and sort."""
+    return _list_adapter.validate_json(list_products_json(db, skip, limit, q, min_price, max_price, sort))
+
+
+def list_products_json(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    q: Optional[str] = None,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+    sort: str = "id",
+) -> bytes:
+    """list_products as JSON bytes: column rows encoded once, cached pre-encoded."""
+    def load() -> bytes:
+        query, keys, descending = _search_query(db, q, min_price, max_price, sort)
+        order = [key.desc() if descending else key.asc() for key in keys]
+        rows = query.with_entities(*_ROW_COLUMNS).order_by(*order).offset(skip).limit(limit).all()
+        return _rows_adapter.dump_json([_row(values) for values in rows])
+
+    return _cached(_list_key("list", skip, limit, q, min_price, max_price, sort), None, load)
+
+
+def list_products_page(
+    db: Session,
+    cursor: str | None = None,
+    limit: int = 100,
+    q: Optional[str] = None,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+    sort: str = "id",
+) -> ProductPage:
+    """List products with keyset pagination; cost is independent of page depth."""
+    return _page_adapter.validate_json(list_products_page_json(db, cursor, limit, q, min_price, max_price, sort))
+
+
+def list_products_page_json(
+    db: Session,
+    cursor: str | None = None,
+    limit: int = 100,
+    q: Optional[str] = None,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+    sort: str = "id",
+) -> bytes:
+    """list_products_page as JSON bytes (see list_products_json)."""
+    def load() -> bytes:
+        query, keys, descending = _search_query(db, q, min_price, max_price, sort)
+        rows, next_cursor = paginate_keyset(query.with_entities(*_ROW_COLUMNS), sort, keys, cursor, limit, descending)
+        return _row_page_adapter.dump_json({"items": [_row(values) for values in rows], "next_cursor": next_cursor})
+
+    return _cached(_list_key("page", cursor, limit, q, min_price, max_price, sort), None, load)
+
+
+def _row(values: Sequence[Any]) -> ProductRow:
+    return dict(zip(_ROW_FIELDS, values))  # type: ignore[return-value]
+
+
+# Same expression as the ix_products_search GIN index (migration 004) so Postgres can use it
+_SEARCH_DOCUMENT = literal_column(PRODUCT_SEARCH_DOCUMENT)
+_SORT_KEYS = {
+    "id": (Product.id,),
+    "created_at": (Product.created_at, Product.id),
+    "price": (Product.price, Product.id),
+    "-price": (Product.price, Product.id),
+}
+
+
+def _search_query(
+    db: Session,
+    q: Optional[str],
+    min_price: Optional[Decimal],
+    max_price: Optional[Decimal],
+    sort: str,
+) -> tuple[Any, tuple[Any, ...], bool]:
+    """Filtered product query plus its sort keys and direction.
+
+    Postgres matches `q` with full-text search (GIN index) and can rank by
+    ts_rank; other databases (SQLite tests) fall back to a case-insensitive
+    substring match and rank by id.
+    """
+    query = db.query(Product)
+    rank = None
+    if q:
+        if db.get_bind().dialect.name == "postgresql":
+            tsquery = func.websearch_to_tsquery(literal_column("'simple'"), q)
+            query = query.filter(_SEARCH_DOCUMENT.op("@@")(tsquery))
+            # float4 -> float8 is exact, so the rank round-trips through the cursor (a Python float)
+            # and the (rank, id) comparison sees the same value as the ORDER BY
+            rank = cast(func.ts_rank(_SEARCH_DOCUMENT, tsquery), Double)
+        else:
+            pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            query = query.filter(or_(
+                Product.name.ilike(pattern, escape="\\"),
+                Product.description.ilike(pattern, escape="\\"),
+            ))
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    if sort == "relevance":
+        if not q:
+            raise BadRequestException("sort=relevance requires q")
+        if rank is None:
+            return query, (Product.id,), False
+        return query, (rank, Product.id), True
+    return query, _SORT_KEYS[sort], sort == "-price"
+
+
+def products_validator(db: Session) -> tuple[Optional[datetime], int]:
+    """(max(updated_at), count) over all products: changes whenever any page could change."""
+    def load() -> tuple[Optional[datetime], int]:
+        last_modified, count = db.query(func.max(Product.updated_at), func.count(Product.id)).one()
+        return last_modified, count
+
+    return _cached(_list_key("validator"), _validator_adapter, load)
 
 
 def update_product(db: Session, product_id: int, data: ProductUpdate) -> ProductResponse:
@@ -36,7 +242,10 @@ def update_product(db: Session, product_id: int, data: ProductUpdate) -> Product
         setattr(product, key, value)
     db.commit()
     db.refresh(product)
-    return ProductResponse.model_validate(product)
+    response = ProductResponse.model_validate(product)
+    _invalidate(product_id)
+    _changed(db, [product_id])
+    return response
 
 
 def delete_product(db: Session, product_id: int) -> None:
@@ -44,3 +253,385 @@ def delete_product(db: Session, product_id: int) -> None:
     product = get_product_by_id(db, product_id)
     db.delete(product)
     db.commit()
+    _invalidate(product_id)
+    _changed(db, [product_id])
+
+
+# ----- Bulk operations (one transaction each) -----
+def bulk_create_products(db: Session, items: list[dict[str, Any]]) -> ProductBulkResponse:
+    """Validate each item, insert the valid ones with one multi-row INSERT ... RETURNING."""
+    valid, errors = _validate_batch(items, ProductCreate)
+    created: list[ProductResponse] = []
+    if valid:
+        rows = db.scalars(
+            insert(Product).returning(Product, sort_by_parameter_order=True),
+            [item.model_dump() for _, item in valid],
+        )
+        # Serialize before commit: commit expires the objects and would reload each one
+        created = [ProductResponse.model_validate(p) for p in rows]
+        db.commit()
+        _invalidate()
+        _changed(db, [p.id for p in created])
+    return ProductBulkResponse(items=created, errors=errors)
+
+
+def bulk_update_products(db: Session, items: list[dict[str, Any]]) -> ProductBulkResponse:
+    """Partial updates by id as one executemany UPDATE; unknown ids are reported per item."""
+    valid, errors = _validate_batch(items, ProductBulkUpdateItem)
+    ids = {item.id for _, item in valid}
+    existing = set(db.scalars(select(Product.id).where(Product.id.in_(ids)))) if ids else set()
+    params = []
+    for index, item in valid:
+        if item.id not in existing:
+            errors.append(BulkItemError(index=index, id=item.id, detail="Product not found"))
+            continue
+        params.append(item.model_dump(exclude_unset=True))
+    updated: list[ProductResponse] = []
+    if params:
+        # ORM bulk UPDATE by primary key: rows grouped by column set, sent as executemany
+        db.execute(update(Product), params)
+        updated_ids = [p["id"] for p in params]
+        rows = db.scalars(
+            select(Product).where(Product.id.in_(updated_ids)).order_by(Product.id).execution_options(populate_existing=True)
+        )
+        updated = [ProductResponse.model_validate(p) for p in rows]
+        db.commit()
+        _invalidate(*updated_ids)
+        _changed(db, updated_ids)
+    return ProductBulkResponse(items=updated, errors=errors)
+
+
+def bulk_delete_products(db: Session, ids: list[int]) -> ProductBulkDeleteResponse:
+    """DELETE ... WHERE id IN (...) RETURNING id; ids that did not exist are reported."""
+    _check_batch_size(ids)
+    unique_ids = list(dict.fromkeys(ids))
+    deleted = set(db.scalars(delete(Product).where(Product.id.in_(unique_ids)).returning(Product.id)))
+    db.commit()
+    if deleted:
+        _invalidate(*deleted)
+        _changed(db, deleted)
+    errors = [
+        BulkItemError(index=index, id=pid, detail="Product not found")
+        for index, pid in enumerate(unique_ids)
+        if pid not in deleted
+    ]
+    return ProductBulkDeleteResponse(deleted=[pid for pid in unique_ids if pid in deleted], errors=errors)
+
+
+# ----- Streaming export -----
+EXPORT_COLUMNS = ("id", "name", "description", "price", "created_at", "updated_at")
+EXPORT_BATCH_SIZE = 1000
+_export_query = (
+    select(*(getattr(Product, c) for c in EXPORT_COLUMNS))
+    .order_by(Product.id)
+    .execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+)
+
+
+def iter_products_export(bind: Engine, fmt: str) -> Iterator[bytes]:
+    """Yield the whole catalog as NDJSON/CSV chunks from a server-side cursor.
+
+    Uses its own session so the cursor outlives the request's dependency
+    scope; memory is bounded by one batch of plain column tuples.
+    """
+    with Session(bind) as db:
+        if fmt == "csv":
+            yield _encode_csv([EXPORT_COLUMNS])
+        for batch in db.execute(_export_query).partitions():
+            yield _encode_export_batch(batch, fmt)
+
+
+async def aiter_products_export(bind: AsyncEngine, fmt: str) -> AsyncIterator[bytes]:
+    """Async variant of iter_products_export (AsyncSession.stream)."""
+    async with AsyncSession(bind) as db:
+        if fmt == "csv":
+            yield _encode_csv([EXPORT_COLUMNS])
+        result = await db.stream(_export_query)
+        async for batch in result.partitions():
+            yield _encode_export_batch(batch, fmt)
+
+
+def _encode_export_batch(rows: Sequence[Any], fmt: str) -> bytes:
+    if fmt == "csv":
+        return _encode_csv(rows)
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=_export_default, separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode("utf-8")
+
+
+def _encode_csv(rows: Sequence[Sequence[Any]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        [v.isoformat() if isinstance(v, datetime) else v for v in row] for row in rows
+    )
+    return buffer.getvalue().encode("utf-8")
+
+
+def _export_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+
+# ----- Streaming import -----
+IMPORT_MAX_REPORTED_ERRORS = 100
+
+
+def import_products(
+    db: Session,
+    stream: BinaryIO,
+    fmt: str,
+    upsert: bool = False,
+    chunk_size: Optional[int] = None,
+) -> ProductImportSummary:
+    """Import CSV/NDJSON rows from a binary stream in fixed-size chunks.
+
+    Only one chunk is held in memory; each chunk is validated against
+    ProductCreate and written in its own transaction. With `upsert`, rows
+    whose name matches an existing product update it instead of inserting.
+    Only the first IMPORT_MAX_REPORTED_ERRORS rejections are returned.
+    """
+    chunk_size = chunk_size or get_settings().IMPORT_CHUNK_SIZE
+    summary = ProductImportSummary()
+    rows = enumerate(_iter_import_rows(stream, fmt), start=1)
+    try:
+        while chunk := list(itertools.islice(rows, chunk_size)):
+            valid = []
+            for row_number, raw in chunk:
+                try:
+                    if isinstance(raw, Exception):
+                        raise raw
+                    valid.append(ProductCreate.model_validate(raw))
+                except (ValidationError, ValueError) as exc:
+                    summary.rejected += 1
+                    if len(summary.errors) < IMPORT_MAX_REPORTED_ERRORS:
+                        detail = exc.errors(include_url=False, include_context=False) if isinstance(exc, ValidationError) else str(exc)
+                        summary.errors.append(BulkItemError(index=row_number, detail=detail))
+            inserted, updated = _write_import_chunk(db, valid, upsert)
+            summary.rows += len(chunk)
+            summary.inserted += inserted
+            summary.updated += updated
+            logger.info(
+                "Product import progress: rows=%d inserted=%d updated=%d rejected=%d",
+                summary.rows, summary.inserted, summary.updated, summary.rejected,
+            )
+    finally:
+        if summary.inserted or summary.updated:
+            _invalidate_all()
+            db.rollback()  # a failed chunk may have left the transaction aborted
+            _changed(db, None)
+    return summary
+
+
+def _iter_import_rows(stream: BinaryIO, fmt: str) -> Iterator[Any]:
+    """Yield one dict per data row, or a ValueError for a line that is not UTF-8 or valid JSON.
+
+    Lines are decoded one at a time: earlier chunks are already committed, so a bad
+    byte rejects its own line and the rest of the file is still imported.
+    """
+    undecodable: list[int] = []
+
+    def lines() -> Iterator[str]:
+        for line_number, raw in enumerate(stream, start=1):
+            try:
+                yield raw.decode("utf-8-sig" if line_number == 1 else "utf-8")
+            except UnicodeDecodeError:
+                undecodable.append(line_number)
+
+    def rejected() -> Iterator[ValueError]:
+        while undecodable:
+            yield ValueError(f"Line {undecodable.pop(0)} is not valid UTF-8")
+
+    if fmt == "csv":
+        for row in csv.DictReader(lines()):
+            yield from rejected()
+            # Empty CSV cells mean "not provided" (e.g. no description)
+            yield {k: v for k, v in row.items() if k is not None and v != ""}
+    else:
+        for line in lines():
+            yield from rejected()
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield ValueError(f"Invalid JSON: {exc.msg}")
+    yield from rejected()
+
+
+def _write_import_chunk(db: Session, items: Iterable[ProductCreate], upsert: bool) -> tuple[int, int]:
+    """Insert (or upsert on name) one validated chunk as executemany statements, then commit."""
+    values = [item.model_dump() for item in items]
+    if not values:
+        return 0, 0
+    updates: list[dict[str, Any]] = []
+    if upsert:
+        # Last row wins for duplicate names within the chunk
+        by_name = {v["name"]: v for v in values}
+        existing = dict(db.execute(select(Product.name, Product.id).where(Product.name.in_(by_name))).all())
+        updates = [{**v, "id": existing[name]} for name, v in by_name.items() if name in existing]
+        values = [v for name, v in by_name.items() if name not in existing]
+    if values:
+        db.execute(insert(Product), values)
+    if updates:
+        db.execute(update(Product), updates)
+    db.commit()
+    return len(values), len(updates)
+
+
+def _check_batch_size(items: list[Any]) -> None:
+    limit = get_settings().BULK_MAX_ITEMS
+    if len(items) > limit:
+        raise PayloadTooLargeException(f"Batch of {len(items)} items exceeds the limit of {limit}")
+
+
+def _validate_batch(items: list[dict[str, Any]], schema: type[BaseModel]) -> tuple[list[tuple[int, Any]], list[BulkItemError]]:
+    """Split raw items into (index, model) pairs and per-item validation errors."""
+    _check_batch_size(items)
+    valid, errors = [], []
+    for index, raw in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(raw)))
+        except ValidationError as exc:
+            errors.append(BulkItemError(
+                index=index,
+                # Only a well-formed id is echoed back; the bad value itself is in `detail`
+                id=raw["id"] if isinstance(raw, dict) and type(raw.get("id")) is int else None,
+                detail=exc.errors(include_url=False, include_context=False),
+            ))
+    return valid, errors
+
+
+def product_cache_stats() -> dict[str, int]:
+    """Hit/miss/eviction counters of the product cache (empty when disabled)."""
+    cache = get_product_cache()
+    return cache.stats() if cache is not None else {}
+
+
+def clear_product_cache() -> None:
+    """Drop every cached product entry (generation and version counters are kept)."""
+    cache = get_product_cache()
+    if cache is not None:
+        cache.clear()
+
+
+async def read_shared(db: Session | AsyncSession, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """`run_db(db, fn, ...)` for a read, shared by identical concurrent calls in this worker.
+
+    Coalesces before the threadpool / async session is even used: N concurrent
+    requests for the same product or page cost one cache lookup or query. The
+    shared fetch runs on its own session on `db`'s engine, since the leader's
+    session is closed if that client disconnects while the others still wait.
+    """
+    if not get_settings().PRODUCT_READ_COALESCING:
+        return await run_db(db, fn, *args, **kwargs)
+    key = (fn.__name__, args, tuple(sorted(kwargs.items())), _writes)
+    return await _read_flight.do(key, lambda: _run_on_own_session(db, fn, *args, **kwargs))
+
+
+async def _run_on_own_session(db: Session | AsyncSession, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    if isinstance(db, AsyncSession):
+        async with AsyncSession(db.bind, autoflush=False, expire_on_commit=False) as own:
+            return await run_db(own, fn, *args, **kwargs)
+    bind = db.get_bind()
+
+    def run() -> Any:
+        # Opened and closed in the worker, so the pool reset on close never runs on the loop
+        with Session(bind, autoflush=False) as own:
+            return fn(own, *args, **kwargs)
+
+    return await run_in_threadpool(run)
+
+
+# ----- Cache helpers -----
+def _cached(key: str, adapter: Optional[TypeAdapter], load: Callable[[], Any]) -> Any:
+    """Read-through: return the cached value or load, store and return it (adapter None: bytes).
+
+    Concurrent misses for the same key (threads) share one load.
+    """
+    cache = get_product_cache()
+    if cache is not None:
+        value = cache.get(key, adapter)
+        if value is not None:
+            return value
+
+    def load_and_store() -> Any:
+        value = load()
+        if cache is not None:
+            cache.set(key, value, adapter)
+        return value
+
+    if not get_settings().PRODUCT_READ_COALESCING:
+        return load_and_store()
+    return _cache_flight.do((key, _writes), load_and_store)
+
+
+def _list_key(kind: str, *params: Any) -> str:
+    cache = get_product_cache()
+    generation = cache.counter(_LIST_GENERATION) if cache is not None else 0
+    return f"products:{kind}:{generation}:" + ":".join(str(p) for p in params)
+
+
+def _item_key(product_id: int) -> str:
+    """Item key carrying the item's version, like list keys carry the generation.
+
+    A read that loaded the row before a write commits stores it under the old
+    version's key, which nobody asks for afterwards (instead of re-caching it).
+    """
+    cache = get_product_cache()
+    if cache is None:
+        return f"products:item:{product_id}"
+    generation, version = cache.counters(_ITEM_GENERATION, f"products:item-version:{product_id}")
+    return f"products:item:{product_id}:{generation}.{version}"
+
+
+def _invalidate_all() -> None:
+    """Drop every cached product (after imports touching unknown ids)."""
+    global _writes
+    _writes += 1
+    clear_product_cache()
+    cache = get_product_cache()
+    if cache is not None:
+        cache.incr(_ITEM_GENERATION)
+        cache.incr(_LIST_GENERATION)
+
+
+def _invalidate(*product_ids: int) -> None:
+    """Drop changed items and every cached list page (after commit)."""
+    global _writes
+    _writes += 1
+    cache = get_product_cache()
+    if cache is None:
+        return
+    stale = [_item_key(pid) for pid in product_ids]
+    for pid in product_ids:
+        cache.incr(f"products:item-version:{pid}")
+    cache.delete(*stale)
+    cache.incr(_LIST_GENERATION)
+
+
+def _changed(db: Session, product_ids: Optional[Collection[int]]) -> None:
+    """After commit: refresh this worker's snapshot and tell the other workers (None: all products)."""
+    products_changed(db, product_ids)
+    publish_change(db, "product", product_ids)
+
+
+def _apply_remote_changes(events: list[ChangeEvent]) -> None:
+    """Another worker's writes: drop what this worker's memory cache holds for them."""
+    if get_settings().PRODUCT_CACHE_BACKEND == "redis":
+        return  # shared cache, already invalidated by the writer
+    if any(event.id is None for event in events):
+        _invalidate_all()
+    else:
+        _invalidate(*{event.id for event in events})
+
+
+def _resync_cache() -> None:
+    if get_settings().PRODUCT_CACHE_BACKEND != "redis":
+        _invalidate_all()
+
+
+bus.subscribe("product", _apply_remote_changes, _resync_cache)
@@ -0,0 +1,30 @@
+"""Delete rows that only accumulate: expired idempotency keys and dead refresh tokens.
+
+    python -m app.services.purge
+
+Run it periodically against DATABASE_URL (e.g. an hourly cron job); each table
+is cleaned with one DELETE, so it is safe while the API is serving.
+"""
+from sqlalchemy.orm import Session
+
+from app.database.connection import SessionLocal
+from app.services.auth_service import purge_refresh_tokens
+from app.services.idempotency_service import purge_expired_keys
+
+
+def purge(db: Session) -> dict[str, int]:
+    """Deleted row counts per table."""
+    return {
+        "idempotency_keys": purge_expired_keys(db),
+        "refresh_tokens": purge_refresh_tokens(db),
+    }
+
+
+def main() -> None:
+    with SessionLocal() as db:
+        for table, count in purge(db).items():
+            print(f"{table}: {count} deleted")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,29 @@
-"""User service: get user by id, list users (admin)."""
+"""User service: get user by id, list users, update/delete users (admin)."""
+import threading
+import time
+from typing import Optional
+
+from app.core.config import get_settings
 from app.database.models import User
-from app.database.schemas import UserResponse
-from app.utils.exceptions import NotFoundException
+from app.database.schemas import Principal, UserPage, UserResponse, UserUpdate
+from app.utils.cache import TTLCache
+from app.utils.exceptions import ConflictException, NotFoundException
+from app.utils.invalidation import ChangeEvent, bus, publish_change
+from app.utils.pagination import paginate_keyset
 from sqlalchemy.orm import Session
 
+_settings = get_settings()
+# user_id -> Principal loaded from the DB (authoritative after a change)
+_principal_cache = TTLCache(_settings.AUTH_CACHE_MAX_ENTRIES, _settings.AUTH_CACHE_TTL_SECONDS)
+# user_id -> wall-clock time of the last change. Not an LRU: evicting a marker early would make
+# stale token claims trusted again, so markers only go once every token issued before them has expired.
+_changed_at: dict[int, float] = {}
+_changed_at_lock = threading.Lock()
+_CHANGED_AT_PRUNE_SECONDS = 60
+_next_prune = 0.0
+# Last invalidation bus resync: changes missed before it are unknown, so older tokens are all suspect
+_resynced_at = 0.0
+
 
 def get_user_by_id(db: Session, user_id: int) -> User:
     """Get user by ID or raise 404."""
@@ -20,5 +40,109 @@ def get_user_by_email(db: Session, email: str) -> User | None:
 
 def list_users(db: Session, skip: int = 0, limit: int = 100) -> list[UserResponse]:
     """List users with pagination."""
-    users = db.query(User).offset(skip).limit(limit).all()
+    users = db.query(User).order_by(User.id).offset(skip).limit(limit).all()
     return [UserResponse.model_validate(u) for u in users]
+
+
+_SORT_KEYS = {
+    "id": (User.id,),
+    "created_at": (User.created_at, User.id),
+}
+
+
+def list_users_page(db: Session, cursor: str | None = None, limit: int = 100, sort: str = "id") -> UserPage:
+    """List users with keyset pagination; cost is independent of page depth."""
+    users, next_cursor = paginate_keyset(db.query(User), sort, _SORT_KEYS[sort], cursor, limit)
+    return UserPage(items=[UserResponse.model_validate(u) for u in users], next_cursor=next_cursor)
+
+
+def update_user(db: Session, user_id: int, data: UserUpdate) -> UserResponse:
+    """Update a user (name, email, role) and invalidate cached auth state."""
+    user = get_user_by_id(db, user_id)
+    update_data = data.model_dump(exclude_unset=True)
+    if "email" in update_data and update_data["email"] != user.email and get_user_by_email(db, update_data["email"]):
+        raise ConflictException("Email already registered")
+    for key, value in update_data.items():
+        setattr(user, key, value)
+    db.commit()
+    db.refresh(user)
+    response = UserResponse.model_validate(user)
+    publish_change(db, "user", [user_id], invalidate_user(user_id))
+    return response
+
+
+def delete_user(db: Session, user_id: int) -> None:
+    """Delete a user and invalidate cached auth state."""
+    user = get_user_by_id(db, user_id)
+    db.delete(user)
+    db.commit()
+    publish_change(db, "user", [user_id], invalidate_user(user_id))
+
+
+# ----- Auth principal cache -----
+def get_principal(db: Session, user_id: int) -> Principal:
+    """Current role/email for a user, from cache or one DB lookup."""
+    principal = _principal_cache.get(user_id)
+    if principal is None:
+        user = get_user_by_id(db, user_id)
+        principal = Principal(id=user.id, role=user.role, email=user.email)
+        _principal_cache.set(user_id, principal)
+    return principal
+
+
+def get_cached_principal(user_id: int) -> Principal | None:
+    """Cached principal without touching the DB (None on miss)."""
+    return _principal_cache.get(user_id)
+
+
+def changed_since(user_id: int, issued_at: float) -> bool:
+    """True if the user changed at or after `issued_at` (token claims may be stale)."""
+    if issued_at <= _resynced_at:
+        return True
+    changed = _changed_at.get(user_id)
+    return changed is not None and issued_at <= changed
+
+
+def invalidate_user(user_id: int, changed_at: Optional[float] = None) -> float:
+    """Drop cached auth state after a user changes or is deleted; returns the change time."""
+    global _next_prune
+    now = time.time()
+    changed_at = now if changed_at is None else changed_at
+    _principal_cache.delete(user_id)
+    with _changed_at_lock:
+        _changed_at[user_id] = max(changed_at, _changed_at.get(user_id, 0))
+        if now >= _next_prune:
+            horizon = now - _settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            for expired in [key for key, at in _changed_at.items() if at <= horizon]:
+                del _changed_at[expired]
+            _next_prune = now + _CHANGED_AT_PRUNE_SECONDS
+    return changed_at
+
+
+def clear_auth_cache() -> None:
+    """Drop all cached principals and change markers (tests)."""
+    global _resynced_at, _next_prune
+    _principal_cache.clear()
+    with _changed_at_lock:
+        _changed_at.clear()
+        _next_prune = 0.0
+    _resynced_at = 0.0
+
+
+def _apply_remote_changes(events: list[ChangeEvent]) -> None:
+    """Another worker changed these users: same as a local change, at the writer's time."""
+    for event in events:
+        if event.id is None:
+            _resync_auth_cache()
+        else:
+            invalidate_user(event.id, event.version)
+
+
+def _resync_auth_cache() -> None:
+    """After missed events: tokens issued before now are checked against the DB (covers deletions too)."""
+    global _resynced_at
+    _principal_cache.clear()
+    _resynced_at = time.time()
+
+
+bus.subscribe("user", _apply_remote_changes, _resync_auth_cache)
@@ -0,0 +1,224 @@
+"""In-process caching primitives."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache with per-entry TTL.
+
+    Expired entries are dropped lazily on access; when full, the least
+    recently used entry is evicted. Hit/miss/eviction counters are kept for
+    monitoring.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value or `default` if missing/expired."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value, evicting the LRU entry if the cache is full."""
+        expires_at = time.monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        """Drop one entry if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss/eviction counters and current size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._data)}
+
+
+def _counter_seed() -> int:
+    """First value of a new (or expired) counter: wall-clock microseconds.
+
+    Counters only go once the entries keyed on them have expired, but one cached
+    under the last value may still be around; starting past every value an older
+    counter could have reached means it is never asked for again.
+    """
+    return time.time_ns() // 1000
+
+
+class MemoryBackend:
+    """Cache backend over an in-process TTLCache. Values are stored as-is.
+
+    Counters (generations/versions embedded in keys) go once they have not been
+    bumped for an entry TTL, or oldest first beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self._cache = TTLCache(max_entries, ttl_seconds)
+        # key -> (value, last bumped), least recently bumped first
+        self._counters: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        # Value of a missing counter: raised past every evicted counter's value, since
+        # entries keyed on an evicted (still recent) counter may not have expired yet
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, adapter: Any = None) -> Any:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: Any, adapter: Any = None) -> None:
+        self._cache.set(key, value)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.delete(key)
+
+    def incr(self, key: str) -> int:
+        now = time.monotonic()
+        with self._lock:
+            current = self._counters.pop(key, None)
+            value = current[0] + 1 if current else max(_counter_seed(), self._floor + 1)
+            self._counters[key] = (value, now)
+            self._prune_counters(now)
+            return value
+
+    def counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, (self._floor,))[0]
+
+    def counters(self, *keys: str) -> list[int]:
+        with self._lock:
+            return [self._counters.get(key, (self._floor,))[0] for key in keys]
+
+    def _prune_counters(self, now: float) -> None:
+        # Not bumped for an entry TTL: every entry keyed on an older value has expired
+        horizon = now - self._cache.ttl_seconds
+        while self._counters and next(iter(self._counters.values()))[1] <= horizon:
+            self._counters.popitem(last=False)
+        while len(self._counters) > self._cache.max_entries:
+            _, (value, _) = self._counters.popitem(last=False)
+            self._floor = max(self._floor, value + 1, _counter_seed())
+
+    def clear(self) -> None:
+        """Drop all entries; counters are kept, so keys never go back to an older value."""
+        self._cache.clear()
+
+    def stats(self) -> dict[str, int]:
+        return self._cache.stats()
+
+
+class RedisBackend:
+    """Cache backend over a Redis client (redis-py API: get/set/delete/incr).
+
+    Values are JSON-encoded with the pydantic TypeAdapter passed per call (or
+    stored as-is when it is None, for pre-encoded bytes), so cached entries are
+    shared by every worker and instance. Counters live under their own prefix and
+    expire after twice the entry TTL without a bump.
+    """
+
+    def __init__(self, client: Any, ttl_seconds: int, prefix: str = "") -> None:
+        self._client = client
+        self._ttl = ttl_seconds
+        self._prefix = prefix
+        self._counter_prefix = prefix + "counter:"
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, adapter: Any = None) -> Any:
+        raw = self._client.get(self._prefix + key)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if raw is None or adapter is None:
+            return raw
+        return adapter.validate_json(raw)
+
+    def set(self, key: str, value: Any, adapter: Any = None) -> None:
+        payload = value if adapter is None else adapter.dump_json(value)
+        self._client.set(self._prefix + key, payload, ex=self._ttl)
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self._client.delete(*(self._prefix + k for k in keys))
+
+    def incr(self, key: str) -> int:
+        name = self._counter_prefix + key
+        value = int(self._client.incr(name))
+        if value == 1:
+            # New or expired counter; a concurrent INCR in between is overwritten, the key still moves on
+            value = _counter_seed()
+            self._client.set(name, value, ex=self._ttl * 2)
+        else:
+            self._client.expire(name, self._ttl * 2)
+        return value
+
+    def counter(self, key: str) -> int:
+        return int(self._client.get(self._counter_prefix + key) or 0)
+
+    def counters(self, *keys: str) -> list[int]:
+        """Several counters in one round trip (MGET)."""
+        return [int(value or 0) for value in self._client.mget([self._counter_prefix + k for k in keys])]
+
+    def clear(self) -> None:
+        """Delete every entry under this backend's prefix (SCAN, not for the hot path).
+
+        Counters are kept: restarting them would bring back keys of entries cached
+        before the clear by other workers.
+        """
+        keys = [
+            k for k in self._client.scan_iter(match=self._prefix + "*")
+            if not (k.decode() if isinstance(k, bytes) else k).startswith(self._counter_prefix)
+        ]
+        if keys:
+            self._client.delete(*keys)
+
+    def stats(self) -> dict[str, int]:
+        try:
+            evictions = int(self._client.info("stats").get("evicted_keys", 0))
+        except Exception:
+            evictions = 0
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": evictions}
+
+
+def build_cache(backend: str, max_entries: int, ttl_seconds: int, redis_url: Optional[str], prefix: str) -> Any:
+    """Build a cache backend from settings: 'memory', 'redis' or 'none' (returns None)."""
+    if backend == "memory":
+        return MemoryBackend(max_entries, ttl_seconds)
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("REDIS_URL must be set when a cache backend is 'redis'")
+        import redis  # optional dependency, only needed for the redis backend
+
+        return RedisBackend(redis.Redis.from_url(redis_url), ttl_seconds, prefix)
+    return None
@@ -42,3 +42,46 @@ class ConflictException(AppException):
 
     def __init__(self, detail: str = "Resource conflict") -> None:
         super().__init__(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+
+class BadRequestException(AppException):
+    """400 Bad Request."""
+
+    def __init__(self, detail: str = "Bad request") -> None:
+        super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+class UnprocessableEntityException(AppException):
+    """422 Unprocessable Entity."""
+
+    def __init__(self, detail: str = "Unprocessable request") -> None:
+        super().__init__(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail)
+
+
+class PayloadTooLargeException(AppException):
+    """413 Payload Too Large."""
+
+    def __init__(self, detail: str = "Request too large") -> None:
+        super().__init__(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+
+class TooManyRequestsException(AppException):
+    """429 Too Many Requests (rate limited; client should retry after Retry-After seconds)."""
+
+    def __init__(self, detail: str = "Too many requests", retry_after: int = 1) -> None:
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class ServiceUnavailableException(AppException):
+    """503 Service Unavailable (overloaded; client should retry later)."""
+
+    def __init__(self, detail: str = "Service temporarily overloaded", retry_after: int = 1) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
@@ -0,0 +1,57 @@
+"""HTTP conditional request helpers (ETag / Last-Modified / 304)."""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from the parts that identify a representation's version."""
+    digest = hashlib.blake2b("|".join(str(p) for p in parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def http_date(value: datetime) -> str:
+    """Format a datetime as an HTTP-date (naive values are treated as UTC)."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict[str, str]:
+    """ETag, Last-Modified and Cache-Control (clients must revalidate every time)."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since per RFC 9110."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison is allowed for GET/HEAD
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:  # "-0000" offsets parse as naive; HTTP-dates are UTC
+            since = since.replace(tzinfo=timezone.utc)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # HTTP-dates have one-second resolution
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def not_modified(headers: dict[str, str]) -> Response:
+    """Body-less 304 carrying the validators."""
+    return Response(status_code=304, headers=headers)
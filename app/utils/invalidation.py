@@ -0,0 +1,254 @@
+"""Cross-worker cache invalidation bus.
+
+Write paths publish change events (entity, id, version) after commit; every
+other worker's listener thread hands them to the handlers subscribed for that
+entity, which drop or refresh their in-process caches. The writer applies its
+own change locally, so a worker ignores events it published itself.
+
+Transport: Redis pub/sub when REDIS_URL is set, else Postgres LISTEN/NOTIFY
+(INVALIDATION_BUS=auto), or none for a single worker. Each (re)connect of the
+listener calls every subscriber's resync hook, since events sent while it was
+disconnected are lost. Propagation latency (send to apply, wall clock, so it
+includes clock skew between hosts) is recorded per entity.
+"""
+import json
+import select as select_module
+import threading
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Callable, Collection, Iterable
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy import Engine, func, select
+
+from app.core.config import get_settings
+from app.utils.logger import get_logger
+from app.utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+# Postgres caps NOTIFY payloads at 8000 bytes; larger batches collapse to "all" events
+_MAX_PAYLOAD = 7900
+
+INVALIDATION_PUBLISHED = REGISTRY.counter(
+    "invalidation_events_published_total", "Change events sent to other workers.", ("entity",)
+)
+INVALIDATION_RECEIVED = REGISTRY.counter(
+    "invalidation_events_received_total", "Change events received from other workers.", ("entity",)
+)
+INVALIDATION_LATENCY = REGISTRY.histogram(
+    "invalidation_propagation_seconds",
+    "Time from publish in one worker to applied in another.",
+    ("entity",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+INVALIDATION_RESYNCS = REGISTRY.counter("invalidation_resyncs_total", "Listener (re)connects followed by a resync.")
+
+
+class ChangeEvent(NamedTuple):
+    entity: str
+    id: Optional[int | str]  # None: every entity of this kind changed; str for keys such as a jti
+    version: float  # the writer's change time (epoch seconds)
+
+
+ChangeHandler = Callable[[list[ChangeEvent]], None]
+
+
+class PostgresTransport:
+    """NOTIFY from the writer's transaction scope; LISTEN on a dedicated autocommit connection."""
+
+    def __init__(self, bind: Engine, channel: str) -> None:
+        self.bind = bind
+        self.channel = channel
+
+    def publish(self, payload: str, db: Any = None) -> None:
+        statement = select(func.pg_notify(self.channel, payload))
+        if db is not None:
+            db.execute(statement)
+            db.commit()
+            return
+        with self.bind.begin() as conn:
+            conn.execute(statement)
+
+    def listen(self, on_connect: Callable[[], None], on_message: Callable[[str], None],
+               stop: threading.Event, poll_seconds: float) -> None:
+        raw = self.bind.raw_connection()
+        raw.detach()  # kept out of the pool: it stays in autocommit mode with a LISTEN
+        try:
+            driver = raw.driver_connection
+            driver.autocommit = True
+            driver.cursor().execute(f'LISTEN "{self.channel}"')
+            on_connect()
+            while not stop.is_set():
+                if not select_module.select([driver], [], [], poll_seconds)[0]:
+                    continue
+                driver.poll()
+                while driver.notifies:
+                    on_message(driver.notifies.pop(0).payload)
+        finally:
+            raw.close()
+
+
+class RedisTransport:
+    """Redis pub/sub (redis-py API: publish/pubsub)."""
+
+    def __init__(self, client: Any, channel: str) -> None:
+        self.client = client
+        self.channel = channel
+
+    def publish(self, payload: str, db: Any = None) -> None:
+        self.client.publish(self.channel, payload)
+
+    def listen(self, on_connect: Callable[[], None], on_message: Callable[[str], None],
+               stop: threading.Event, poll_seconds: float) -> None:
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(self.channel)
+            on_connect()
+            while not stop.is_set():
+                message = pubsub.get_message(timeout=poll_seconds)
+                if message is not None:
+                    data = message["data"]
+                    on_message(data.decode() if isinstance(data, bytes) else data)
+        finally:
+            pubsub.close()
+
+
+class InvalidationBus:
+    """Subscribers per entity plus an optional transport and its listener thread."""
+
+    def __init__(self, poll_seconds: float = 1.0, retry_seconds: float = 2.0) -> None:
+        self.origin = uuid.uuid4().hex
+        self.poll_seconds = poll_seconds
+        self.retry_seconds = retry_seconds
+        self.transport: Any = None
+        self._handlers: dict[str, list[tuple[ChangeHandler, Optional[Callable[[], None]]]]] = defaultdict(list)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, entity: str, on_change: ChangeHandler, on_resync: Optional[Callable[[], None]] = None) -> None:
+        """Handle other workers' events for `entity`; `on_resync` runs after each (re)connect."""
+        self._handlers[entity].append((on_change, on_resync))
+
+    def publish(self, events: Iterable[ChangeEvent], db: Any = None) -> None:
+        """Send committed changes to the other workers (no-op without a transport).
+
+        `db` is the writer's session; Postgres sends the NOTIFY on it.
+        """
+        if self.transport is None:
+            return
+        events = list(events)
+        if not events:
+            return
+        try:
+            self.transport.publish(self._encode(events), db)
+        except Exception:
+            # The write is committed; other workers catch up at their TTL or next resync
+            logger.warning("Publishing %d invalidation event(s) failed", len(events), exc_info=True)
+            return
+        for event in events:
+            INVALIDATION_PUBLISHED.inc(event.entity)
+
+    def start(self, transport: Any) -> None:
+        self.transport = transport
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(transport,), name="invalidation-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_seconds + 1)
+        self._thread = None
+        self.transport = None
+
+    def _run(self, transport: Any) -> None:
+        while not self._stop.is_set():
+            try:
+                transport.listen(self._resync, self._receive, self._stop, self.poll_seconds)
+            except Exception:
+                logger.warning("Invalidation listener disconnected; reconnecting in %ss", self.retry_seconds,
+                               exc_info=True)
+            self._stop.wait(self.retry_seconds)
+
+    def _resync(self) -> None:
+        for handlers in list(self._handlers.values()):
+            for _, on_resync in handlers:
+                if on_resync is not None:
+                    self._call(on_resync)
+        INVALIDATION_RESYNCS.inc()
+
+    def _receive(self, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed invalidation payload: %.200s", payload)
+            return
+        if message.get("origin") == self.origin:
+            return
+        latency = max(time.time() - message.get("sent_at", time.time()), 0.0)
+        by_entity: dict[str, list[ChangeEvent]] = defaultdict(list)
+        for entity, entity_id, version in message.get("events", []):
+            by_entity[entity].append(ChangeEvent(entity, entity_id, version))
+        for entity, events in by_entity.items():
+            for on_change, _ in self._handlers.get(entity, ()):
+                self._call(on_change, events)
+            INVALIDATION_RECEIVED.inc(entity, amount=len(events))
+            INVALIDATION_LATENCY.observe(latency, entity)
+
+    def _encode(self, events: list[ChangeEvent]) -> str:
+        message = {"origin": self.origin, "sent_at": time.time(), "events": [list(event) for event in events]}
+        payload = json.dumps(message, separators=(",", ":"))
+        if len(payload) > _MAX_PAYLOAD:
+            version = max(event.version for event in events)
+            message["events"] = [[entity, None, version] for entity in sorted({event.entity for event in events})]
+            payload = json.dumps(message, separators=(",", ":"))
+        return payload
+
+    @staticmethod
+    def _call(fn: Callable[..., None], *args: Any) -> None:
+        try:
+            fn(*args)
+        except Exception:
+            logger.exception("Invalidation handler %s failed", getattr(fn, "__qualname__", fn))
+
+
+bus = InvalidationBus()
+
+
+def publish_change(
+    db: Any, entity: str, ids: Optional[Collection[int | str]], version: Optional[float] = None
+) -> None:
+    """Publish that `ids` of `entity` (None: all of them) changed, after the writer's commit."""
+    version = time.time() if version is None else version
+    if ids is None:
+        bus.publish([ChangeEvent(entity, None, version)], db)
+    else:
+        bus.publish((ChangeEvent(entity, entity_id, version) for entity_id in ids), db)
+
+
+def build_transport(bind: Engine) -> Any:
+    """Transport from Settings: INVALIDATION_BUS=auto picks redis (REDIS_URL), then postgres."""
+    settings = get_settings()
+    kind = settings.INVALIDATION_BUS
+    if kind == "auto":
+        kind = "redis" if settings.REDIS_URL else "postgres" if bind.dialect.name == "postgresql" else "none"
+    if kind == "redis":
+        if not settings.REDIS_URL:
+            raise ValueError("REDIS_URL must be set when INVALIDATION_BUS is 'redis'")
+        import redis  # optional dependency, only needed for the redis transport
+
+        return RedisTransport(redis.Redis.from_url(settings.REDIS_URL), settings.INVALIDATION_CHANNEL)
+    if kind == "postgres":
+        return PostgresTransport(bind, settings.INVALIDATION_CHANNEL)
+    return None
+
+
+def start_invalidation_bus(bind: Engine) -> Optional[InvalidationBus]:
+    """Start the listener when a transport is configured (called from the app lifespan)."""
+    transport = build_transport(bind)
+    if transport is None:
+        return None
+    bus.start(transport)
+    return bus
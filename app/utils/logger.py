@@ -1,9 +1,128 @@
-"""Centralized logging configuration."""
+"""Centralized logging configuration.
+
+With LOG_ASYNC (default) loggers only enqueue records; a single QueueListener
+thread formats and writes them, so a slow stdout never blocks the event loop.
+A full queue drops the record (counted in log_records_dropped_total) instead of
+waiting. LOG_FORMAT=json emits one JSON object per line.
+"""
+import atexit
+import json
 import logging
+import queue
+import random
 import sys
-from typing import Any
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
 
 from app.core.config import get_settings
+from app.utils.metrics import REGISTRY
+
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    "log_records_dropped_total", "Log records not written, by reason.", ("reason",)
+)
+
+# Request ID of the request being served; attached to every record logged while serving it
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed via `extra=` and is a structured field
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+def _fields(record: logging.LogRecord) -> dict[str, Any]:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+# Access-log fields already spelled out in the text message
+_IN_MESSAGE = frozenset({"method", "path", "status"})
+
+
+class TextFormatter(logging.Formatter):
+    """`time | level | logger | message key=value ...` lines."""
+
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s | %(levelname)s | %(name)s | %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = {key: value for key, value in _fields(record).items() if key not in _IN_MESSAGE}
+        if record.request_id:
+            fields["request_id"] = record.request_id
+        return line + "".join(f" {key}={value}" for key, value in fields.items())
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, structured fields at the top level."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.request_id:
+            payload["request_id"] = record.request_id
+        payload.update(_fields(record))
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request ID in the calling thread, before the queue hand-off."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Enqueue without blocking or formatting; drop and count when the queue is full."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in this process, so the record needs no pickling-safe
+        # preparation; formatting is left to the listener thread.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc("queue_full")
+
+
+def _formatter() -> logging.Formatter:
+    return JsonFormatter() if get_settings().LOG_FORMAT == "json" else TextFormatter()
+
+
+@lru_cache
+def _handler() -> logging.Handler:
+    """Handler shared by all app loggers: queue front-end, or a direct stream handler."""
+    settings = get_settings()
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(_formatter())
+    if not settings.LOG_ASYNC:
+        stream.addFilter(RequestIdFilter())
+        return stream
+    handler = DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    handler.addFilter(RequestIdFilter())
+    listener = QueueListener(handler.queue, stream, respect_handler_level=True)
+    listener.start()
+    handler.listener = listener
+    atexit.register(stop_logging)
+    return handler
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread (app shutdown / exit)."""
+    if _handler.cache_info().currsize == 0:
+        return
+    listener = getattr(_handler(), "listener", None)
+    if listener is not None and listener._thread is not None:
+        listener.stop()
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -12,24 +131,24 @@ def get_logger(name: str) -> logging.Logger:
     if logger.handlers:
         return logger
     logger.setLevel(logging.DEBUG if get_settings().DEBUG else logging.INFO)
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(
-        logging.Formatter(
-            "%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-        )
-    )
-    logger.addHandler(handler)
+    logger.addHandler(_handler())
     return logger
 
 
 def log_request(method: str, path: str, status_code: int, **extra: Any) -> None:
-    """Log HTTP request (for middleware)."""
+    """Log HTTP request (for middleware); extra fields become structured fields.
+
+    Successful requests are sampled at LOG_SAMPLE_RATE; 4xx/5xx are always logged.
+    """
+    rate = get_settings().LOG_SAMPLE_RATE
+    if status_code < 400 and rate < 1.0 and random.random() >= rate:
+        LOG_RECORDS_DROPPED.inc("sampled")
+        return
     logger = get_logger("http")
     logger.info(
         "%s %s %s",
         method,
         path,
         status_code,
-        extra=extra,
+        extra={"method": method, "path": path, "status": status_code, **extra},
     )
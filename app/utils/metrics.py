@@ -0,0 +1,294 @@
+"""Low-overhead Prometheus-style metrics.
+
+Hot-path updates go to a per-thread shard (plain dict, no lock); shards are
+only summed when /metrics is scraped. With METRICS_MULTIPROC_DIR set, every
+worker process periodically writes its snapshot there and a scrape of any
+worker merges all of them (counters/histograms summed, gauges of dead
+workers dropped).
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any, Optional
+
+from app.core.config import get_settings
+
+LabelValues = tuple[str, ...]
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric:
+    def __init__(self, registry: "Registry", name: str, help: str, kind: str, labels: tuple[str, ...]) -> None:
+        self._registry = registry
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labels = labels
+
+
+class Counter(_Metric):
+    """Monotonic counter."""
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        shard = self._registry._shard()
+        key = (self.name, labels)
+        shard[key] = shard.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Up/down gauge (e.g. in-flight requests); shards are summed."""
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        shard = self._registry._shard()
+        key = (self.name, labels)
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; stores per-bucket counts plus sum and count."""
+
+    def __init__(self, *args: Any, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        super().__init__(*args)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._registry._shard()
+        key = (self.name, labels)
+        counts = shard.get(key)
+        if counts is None:
+            # len(buckets) finite buckets + "+Inf", then sum, then count
+            counts = shard[key] = [0.0] * (len(self.buckets) + 3)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+
+class Registry:
+    """Holds metric definitions and per-thread value shards."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._callbacks: dict[str, Callable[[], Iterable[tuple[LabelValues, float]]]] = {}
+        self._shards: list[dict] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.values
+        except AttributeError:
+            values: dict = {}
+            with self._lock:
+                self._shards.append(values)
+            self._local.values = values
+            return values
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(self, name, help, "counter", labels))
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(self, name, help, "gauge", labels))
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, help, "histogram", labels, buckets=buckets))
+
+    def gauge_callback(
+        self, name: str, help: str, labels: tuple[str, ...], fn: Callable[[], Iterable[tuple[LabelValues, float]]]
+    ) -> None:
+        """Gauge whose samples are computed at scrape time (e.g. DB pool checkouts)."""
+        self._register(_Metric(self, name, help, "gauge", labels))
+        self._callbacks[name] = fn
+
+    def collect(self) -> dict[tuple[str, LabelValues], Any]:
+        """Merge all shards plus callback gauges of this process."""
+        merged: dict[tuple[str, LabelValues], Any] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, value in list(shard.items()):
+                _merge(merged, key, value)
+        for name, fn in list(self._callbacks.items()):
+            try:
+                for labels, value in fn():
+                    merged[(name, tuple(labels))] = float(value)
+            except Exception:
+                continue
+        return merged
+
+    def render(self, samples: dict[tuple[str, LabelValues], Any]) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        by_name: dict[str, list[tuple[LabelValues, Any]]] = {}
+        for (name, labels), value in samples.items():
+            by_name.setdefault(name, []).append((labels, value))
+        lines: list[str] = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for labels, value in sorted(by_name.get(name, []), key=lambda item: item[0]):
+                pairs = list(zip(metric.labels, labels))
+                if isinstance(metric, Histogram):
+                    cumulative = 0.0
+                    for bound, count in zip((*metric.buckets, float("inf")), value):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{name}_bucket{_labels(pairs + [('le', le)])} {_num(cumulative)}")
+                    lines.append(f"{name}_sum{_labels(pairs)} {_num(value[-2])}")
+                    lines.append(f"{name}_count{_labels(pairs)} {_num(value[-1])}")
+                else:
+                    lines.append(f"{name}{_labels(pairs)} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+    # ----- Multi-process aggregation -----
+    def write_snapshot(self, directory: str) -> None:
+        """Atomically write this process's samples to `directory/<pid>.json`."""
+        pid = os.getpid()
+        payload = {
+            "pid": pid,
+            "samples": [[name, list(labels), value] for (name, labels), value in self.collect().items()],
+        }
+        path = Path(directory) / f"{pid}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(payload))
+        os.replace(tmp, path)
+
+    def collect_multiprocess(self, directory: str) -> dict[tuple[str, LabelValues], Any]:
+        """Merge snapshots of every worker; gauges only from live workers."""
+        self.write_snapshot(directory)
+        merged: dict[tuple[str, LabelValues], Any] = {}
+        for path in Path(directory).glob("*.json"):
+            try:
+                payload = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(payload["pid"])
+            for name, labels, value in payload["samples"]:
+                metric = self._metrics.get(name)
+                if metric is None or (metric.kind == "gauge" and not alive):
+                    continue
+                _merge(merged, (name, tuple(labels)), value)
+        return merged
+
+    def exposition(self) -> str:
+        """Text for /metrics: this process, or all workers in multi-process mode."""
+        directory = get_settings().METRICS_MULTIPROC_DIR
+        samples = self.collect_multiprocess(directory) if directory else self.collect()
+        return self.render(samples)
+
+
+def _merge(merged: dict, key: tuple[str, LabelValues], value: Any) -> None:
+    if isinstance(value, list):
+        current = merged.get(key)
+        merged[key] = list(value) if current is None else [a + b for a, b in zip(current, value)]
+    else:
+        merged[key] = merged.get(key, 0.0) + value
+
+
+def _labels(pairs: list[tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    escaped = (
+        f'{k}="' + str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') + '"'
+        for k, v in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _num(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests by route template.", ("method", "route", "status"))
+HTTP_ERRORS = REGISTRY.counter("http_request_errors_total", "HTTP requests that ended in a 5xx.", ("method", "route"))
+HTTP_LATENCY = REGISTRY.histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests currently being served.")
+
+
+def route_template(scope: dict) -> str:
+    """Full route template of a matched request, e.g. /api/v1/products/{product_id}.
+
+    Templates keep label cardinality bounded. Included routers only carry their
+    own path, so the literal prefix is recovered from the concrete URL path.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    path = scope.get("path", "")
+    regex = getattr(route, "path_regex", None)
+    if regex is None or regex.match(path):
+        return template
+    start = path.find("/", 1)
+    while start != -1:
+        if regex.match(path[start:]):
+            return path[:start] + template
+        start = path.find("/", start + 1)
+    return template
+
+
+def observe_request(method: str, route: str, status_code: int, duration: float) -> None:
+    """Record one finished HTTP request."""
+    HTTP_REQUESTS.inc(method, route, str(status_code))
+    HTTP_LATENCY.observe(duration, method, route)
+    if status_code >= 500:
+        HTTP_ERRORS.inc(method, route)
+
+
+class SnapshotFlusher:
+    """Background thread writing this worker's snapshot for multi-process scrapes."""
+
+    def __init__(self, directory: str, interval: float) -> None:
+        self.directory = directory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="metrics-flusher", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                REGISTRY.write_snapshot(self.directory)
+            except OSError:
+                pass
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+        REGISTRY.write_snapshot(self.directory)
+
+
+def start_flusher() -> Optional[SnapshotFlusher]:
+    """Start the snapshot thread when METRICS_MULTIPROC_DIR is configured."""
+    settings = get_settings()
+    if not settings.METRICS_MULTIPROC_DIR:
+        return None
+    flusher = SnapshotFlusher(settings.METRICS_MULTIPROC_DIR, settings.METRICS_FLUSH_SECONDS)
+    flusher.start()
+    return flusher
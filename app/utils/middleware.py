@@ -0,0 +1,198 @@
+"""Pure ASGI middleware: request context (ID, timing, metrics, SQL stats, access log) and compression.
+
+Unlike @app.middleware("http") (BaseHTTPMiddleware), these wrap `send` directly:
+no extra task or memory stream per request, and streaming responses pass
+through chunk by chunk.
+"""
+import time
+import uuid
+from collections.abc import Iterable
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.database import profiling
+from app.utils.logger import log_request, request_id_var
+from app.utils.metrics import HTTP_IN_FLIGHT, observe_request, route_template
+
+try:  # optional dependency: br encoding is offered only when brotli is installed
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+class RequestContextMiddleware:
+    """Request ID, latency metrics per route template, Server-Timing and the access log line."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.sql_profiling = get_settings().SQL_PROFILING
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        request_id = Headers(scope=scope).get("x-request-id") or uuid.uuid4().hex
+        request_token = request_id_var.set(request_id)
+        stats, stats_token = profiling.start_request()
+        status_code = 500
+
+        async def send_with_context(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", request_id)
+                if self.sql_profiling:
+                    headers.append("Server-Timing", profiling.server_timing(stats, time.perf_counter() - start))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_context)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            duration = time.perf_counter() - start
+            method, path = scope["method"], scope["path"]
+            profiling.finish_request(stats_token, stats, method, path)
+            observe_request(method, route_template(scope), status_code, duration)
+            log_request(
+                method,
+                path,
+                status_code,
+                duration_ms=round(duration * 1000, 1),
+                db_queries=stats.count,
+                db_ms=round(stats.milliseconds, 1),
+            )
+            request_id_var.reset(request_token)
+
+
+class BrotliResponder:
+    """br counterpart of Starlette's GZipResponder (same buffering/streaming rules).
+
+    Self-contained: Starlette's IdentityResponder base only exists in recent releases.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int, exclude_content_types: Iterable[str] = ()) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.quality = quality
+        self.exclude_content_types = frozenset(exclude_content_types)
+        self.send: Optional[Send] = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+        self._compressor = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Held back until the first body chunk decides the headers
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] == 206
+                or not self.exclude_content_types.isdisjoint({media_type, media_type.partition("/")[0] + "/*"})
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+        if self.passthrough or message_type != "http.response.body":
+            if not self.passthrough and not self.started:  # e.g. pathsend: nothing to compress
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self.started:
+            self.started = True
+            if len(body) < self.minimum_size and not more_body:
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            headers["Content-Encoding"] = "br"
+            message["body"] = self._compress(body, more_body)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(message["body"]))
+            await self.send(self.initial_message)
+            await self.send(message)
+            return
+        message["body"] = self._compress(body, more_body)
+        await self.send(message)
+
+    def _compress(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=self.quality)
+        if more_body:
+            return self._compressor.process(body) + self._compressor.flush()
+        return self._compressor.process(body) + self._compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """gzip, or br when the client accepts it and brotli is installed; bodies below minimum_size stay plain.
+
+    Compressed responses get a weak ETag: their bytes differ from the identity body
+    the strong validator names. A 304 echoes the weak form when the client sent it.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int, compresslevel: int, brotli_quality: Optional[int]) -> None:
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.brotli_quality = brotli_quality if brotli is not None else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await super().__call__(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        accepted = _accepted_encodings(request_headers.get("accept-encoding", ""))
+        if_none_match = request_headers.get("if-none-match", "")
+
+        async def send_with_weak_etag(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    if message["status"] == 304:
+                        weaken = "W/" + etag in if_none_match
+                    else:
+                        weaken = headers.get("content-encoding", "identity") != "identity"
+                    if weaken:
+                        headers["ETag"] = "W/" + etag
+            await send(message)
+
+        if self.brotli_quality is not None and "br" in accepted:
+            responder = BrotliResponder(
+                self.app,
+                self.minimum_size,
+                self.brotli_quality,
+                exclude_content_types=getattr(self, "exclude_content_types", ("text/event-stream",)),
+            )
+            await responder(scope, receive, send_with_weak_etag)
+            return
+        await super().__call__(scope, receive, send_with_weak_etag)
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    """Codings in an Accept-Encoding header, minus those refused with q=0."""
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip().removeprefix("q=")
+        if coding and q not in ("0", "0.0", "0.00", "0.000"):
+            accepted.add(coding.strip().lower())
+    return accepted
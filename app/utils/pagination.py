@@ -0,0 +1,95 @@
+"""Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token holding the sort key of the last row
+of the previous page. The next page is fetched with ``WHERE (key) > (cursor)``
+so the database seeks straight into the index instead of scanning and
+discarding ``OFFSET`` rows.
+"""
+import base64
+import json
+from collections.abc import Sequence
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any
+
+from sqlalchemy import DateTime, Float, Integer, Numeric, tuple_
+from sqlalchemy.orm import Query
+
+from app.utils.exceptions import BadRequestException
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    """Encode the sort key of the last row into an opaque cursor."""
+    raw = json.dumps({"o": sort, "v": list(values)}, default=_json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, size: int) -> list[Any]:
+    """Decode a cursor produced by encode_cursor for `sort`. Raises 400 if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = data["v"]
+    except (ValueError, KeyError, TypeError):
+        raise BadRequestException("Invalid cursor")
+    if data.get("o") != sort or not isinstance(values, list) or len(values) != size:
+        raise BadRequestException("Cursor does not match sort")
+    return values
+
+
+def decode_cursor_values(cursor: str, sort: str, keys: Sequence[Any]) -> list[Any]:
+    """Decode a cursor into sort-key values of the keys' Python types (400 if invalid)."""
+    return [_coerce(key, v) for key, v in zip(keys, decode_cursor(cursor, sort, len(keys)))]
+
+
+def paginate_keyset(
+    query: Query,
+    sort: str,
+    keys: Sequence[Any],
+    cursor: str | None,
+    limit: int,
+    descending: bool = False,
+) -> tuple[list[Any], str | None]:
+    """Return one page of entities (or column tuples) after `cursor` and the next cursor (None if last).
+
+    `keys` are the sort columns/expressions, unique together (end with the id);
+    they are compared as a row value so the database can seek an index on them.
+    """
+    if cursor:
+        values = decode_cursor_values(cursor, sort, keys)
+        row, after = tuple_(*keys), tuple_(*values)
+        query = query.filter(row < after if descending else row > after)
+    order = [key.desc() if descending else key.asc() for key in keys]
+    # One entity per row, or a tuple of the selected columns for column queries
+    width = len(query.column_descriptions)
+    rows = query.add_columns(*keys).order_by(*order).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort, rows[-1][width:])
+    items = [row[0] for row in rows] if width == 1 else [tuple(row[:width]) for row in rows]
+    return items, next_cursor
+
+
+def _coerce(key: Any, value: Any) -> Any:
+    """Convert a JSON cursor value back to the key's Python type."""
+    try:
+        if isinstance(key.type, DateTime):
+            return datetime.fromisoformat(value)
+        if isinstance(key.type, Float):
+            return float(value)
+        if isinstance(key.type, Numeric):
+            return Decimal(value)
+        if isinstance(key.type, Integer) and isinstance(value, int):
+            return value
+    except (TypeError, ValueError, InvalidOperation):
+        pass
+    raise BadRequestException("Invalid cursor")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Unsupported cursor value: {value!r}")
@@ -0,0 +1,111 @@
+"""Sliding-window rate limiting for expensive endpoints (login, register).
+
+Each limit keeps one counter per fixed window and estimates the sliding count as
+`previous * (1 - elapsed / window) + current`: two counters per key, O(1) per
+hit, and no burst of 2x the limit at window boundaries. Counters live in-process
+(MemoryRateLimitStore) or in Redis (RedisRateLimitStore, shared by all workers).
+"""
+import math
+import threading
+import time
+from typing import Any, Optional
+
+from app.utils.cache import TTLCache
+
+
+class MemoryRateLimitStore:
+    """Window counters in a bounded in-process LRU (per worker)."""
+
+    def __init__(self, max_entries: int = 100_000) -> None:
+        self._counts = TTLCache(max_entries, ttl_seconds=0)
+        self._lock = threading.Lock()
+
+    def incr(self, key: str, ttl_seconds: float) -> int:
+        with self._lock:
+            count = self._counts.get(key, 0) + 1
+            self._counts.set(key, count, ttl_seconds=ttl_seconds)
+            return count
+
+    def get(self, key: str) -> int:
+        return self._counts.get(key, 0)
+
+    def clear(self) -> None:
+        self._counts.clear()
+
+
+class RedisRateLimitStore:
+    """Window counters in Redis (redis-py API: incr/expire/get), shared by every worker and instance."""
+
+    def __init__(self, client: Any, prefix: str = "ratelimit:") -> None:
+        self._client = client
+        self._prefix = prefix
+
+    def incr(self, key: str, ttl_seconds: float) -> int:
+        count = int(self._client.incr(self._prefix + key))
+        if count == 1:
+            self._client.expire(self._prefix + key, math.ceil(ttl_seconds))
+        return count
+
+    def get(self, key: str) -> int:
+        return int(self._client.get(self._prefix + key) or 0)
+
+    def clear(self) -> None:
+        keys = list(self._client.scan_iter(match=self._prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+
+
+class SlidingWindowLimiter:
+    """Counts hits per key; `hit` returns 0 when allowed, else seconds until the next hit would be."""
+
+    def __init__(self, store: Any) -> None:
+        self.store = store
+
+    def hit(self, key: str, limit: int, window_seconds: float, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        window = int(now // window_seconds)
+        elapsed = now - window * window_seconds
+        # Rejected hits count too: a client hammering past the limit stays limited
+        current = self.store.incr(f"{key}:{window}", ttl_seconds=2 * window_seconds)
+        previous = self.store.get(f"{key}:{window - 1}")
+        if previous * (1 - elapsed / window_seconds) + current <= limit:
+            return 0.0
+        return _retry_after(previous, current, limit, window_seconds, elapsed)
+
+    def check(self, key: str, limit: int, window_seconds: float, now: Optional[float] = None) -> float:
+        """Like `hit` without counting: for limits on outcomes, recorded later with `hit`."""
+        now = time.time() if now is None else now
+        window = int(now // window_seconds)
+        elapsed = now - window * window_seconds
+        current = self.store.get(f"{key}:{window}")
+        previous = self.store.get(f"{key}:{window - 1}")
+        if previous * (1 - elapsed / window_seconds) + current + 1 <= limit:
+            return 0.0
+        return _retry_after(previous, current, limit, window_seconds, elapsed)
+
+    def clear(self) -> None:
+        self.store.clear()
+
+
+def _retry_after(previous: int, current: int, limit: int, window_seconds: float, elapsed: float) -> float:
+    """Seconds until `previous * (1 - t / window) + current + 1 <= limit` holds again."""
+    if current < limit and previous:
+        # The previous window's weight decays enough within this window
+        at = window_seconds * (1 - (limit - 1 - current) / previous)
+        return max(at - elapsed, 0.0)
+    # Wait for the next window, where this window's count becomes the decaying one
+    at = window_seconds * max(0.0, 1 - (limit - 1) / current) if limit > 0 else window_seconds
+    return window_seconds - elapsed + at
+
+
+def build_limiter(backend: str, redis_url: Optional[str]) -> Optional[SlidingWindowLimiter]:
+    """Build a limiter from settings: 'memory', 'redis' or 'none' (returns None)."""
+    if backend == "memory":
+        return SlidingWindowLimiter(MemoryRateLimitStore())
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("REDIS_URL must be set when RATE_LIMIT_BACKEND is 'redis'")
+        import redis  # optional dependency, only needed for the redis backend
+
+        return SlidingWindowLimiter(RedisRateLimitStore(redis.Redis.from_url(redis_url)))
+    return None
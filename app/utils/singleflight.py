@@ -0,0 +1,108 @@
+"""Single-flight: concurrent calls with the same key share one execution.
+
+The first caller for a key runs the function; callers arriving while it runs
+wait and get the same result (or exception). Nothing is cached afterwards: the
+next call after completion runs again. Results are shared between callers, so
+treat them as read-only.
+
+SingleFlight coordinates threads (threadpool service code); AsyncSingleFlight
+coordinates coroutines on one event loop.
+"""
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar
+
+from app.utils.metrics import REGISTRY
+
+T = TypeVar("T")
+
+SINGLEFLIGHT_CALLS = REGISTRY.counter("singleflight_calls_total", "Single-flight executions (leaders).", ("flight",))
+SINGLEFLIGHT_COALESCED = REGISTRY.counter(
+    "singleflight_coalesced_total", "Calls that waited for another caller's in-flight result.", ("flight",)
+)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Thread-level single-flight.
+
+    Calls made on an event loop thread (e.g. sync code under AsyncSession.run_sync)
+    run uncoalesced: blocking there would stall the loop the leader depends on.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        if _on_event_loop():
+            return fn()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            SINGLEFLIGHT_COALESCED.inc(self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        SINGLEFLIGHT_CALLS.inc(self.name)
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """Coroutine-level single-flight.
+
+    The shared work runs as its own task, so a caller that is cancelled (client
+    disconnect) does not cancel it for the others.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            SINGLEFLIGHT_COALESCED.inc(self.name)
+        else:
+            SINGLEFLIGHT_CALLS.inc(self.name)
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller was cancelled
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
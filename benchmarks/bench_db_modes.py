@@ -0,0 +1,84 @@
+"""Compare requests/sec of the sync (threadpool) and async (AsyncEngine) DB paths.
+
+Each mode runs in a fresh interpreter because the engine is chosen at import
+time from DATABASE_ASYNC. Requests go through httpx's in-process ASGI
+transport, so the numbers measure the app (routing, threadpool, DB), not TCP.
+
+    python benchmarks/bench_db_modes.py --concurrency 200 --requests 5000
+    DATABASE_URL=postgresql://... python benchmarks/bench_db_modes.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+async def _run_mode(requests: int, concurrency: int, products: int) -> dict:
+    import httpx
+
+    from app.database.connection import engine
+    from app.database.models import Base, Product
+    from app.main import app
+    from sqlalchemy.orm import Session
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all([Product(name=f"Product {i}", description="bench", price=i) for i in range(products)])
+        db.commit()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for i in range(requests):
+            queue.put_nowait(i % products + 1)
+        errors = 0
+
+        async def worker() -> None:
+            nonlocal errors
+            while not queue.empty():
+                product_id = queue.get_nowait()
+                r = await client.get(f"/api/v1/products/{product_id}")
+                errors += r.status_code != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {"requests": requests, "errors": errors, "seconds": round(elapsed, 3), "rps": round(requests / elapsed, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--child", choices=["sync", "async"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, str(ROOT))
+        print(json.dumps(asyncio.run(_run_mode(args.requests, args.concurrency, args.products))))
+        return
+
+    results = {}
+    for mode in ("sync", "async"):
+        env = dict(os.environ, DATABASE_ASYNC=str(mode == "async").lower())
+        env.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", mode, "--requests", str(args.requests),
+             "--concurrency", str(args.concurrency), "--products", str(args.products)],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+        )
+        results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{mode:>5}: {results[mode]['rps']:>8} req/s  ({results[mode]['errors']} errors)")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
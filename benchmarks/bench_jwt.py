@@ -0,0 +1,79 @@
+"""Micro-benchmark of the access-token decode path.
+
+Compares an uncached `jwt.decode` (what every request paid before) with the
+cached `decode_access_token`, for HS256 and, when cryptography is installed,
+EdDSA and RS256 with preloaded keys.
+
+    python benchmarks/bench_jwt.py --rounds 20000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+def _per_call_us(fn, rounds: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return round((time.perf_counter() - start) / rounds * 1e6, 2)
+
+
+def _write_keys(directory: Path, algorithm: str) -> tuple[str, str]:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+    private = ed25519.Ed25519PrivateKey.generate() if algorithm == "EdDSA" else rsa.generate_private_key(65537, 2048)
+    private_path, public_path = directory / f"{algorithm}.pem", directory / f"{algorithm}.pub"
+    private_path.write_bytes(private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ))
+    public_path.write_bytes(private.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ))
+    return str(private_path), str(public_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    import jwt
+
+    from app.core import jwt_handler
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    algorithms = ["HS256"]
+    try:
+        import cryptography  # noqa: F401
+        algorithms += ["EdDSA", "RS256"]
+    except ImportError:
+        pass
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for algorithm in algorithms:
+            settings.JWT_ALGORITHM = algorithm
+            if algorithm != "HS256":
+                settings.JWT_PRIVATE_KEY_FILE, settings.JWT_PUBLIC_KEY_FILE = _write_keys(Path(tmp), algorithm)
+            jwt_handler.reset_jwt_state()
+            token = jwt_handler.create_access_token(1, {"role": "admin", "email": "a@example.com"})
+            key = jwt_handler._config().verification_key
+            results[algorithm] = {
+                "uncached_us": _per_call_us(lambda: jwt.decode(token, key, algorithms=[algorithm]), args.rounds),
+                "cached_us": _per_call_us(lambda: jwt_handler.decode_access_token(token), args.rounds),
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
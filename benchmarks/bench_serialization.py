@@ -0,0 +1,103 @@
+"""Cost of producing one 100-item product page as JSON: old path vs pre-encoded path.
+
+    before:   ORM rows -> ProductResponse.model_validate per row -> response_model
+              validation again -> jsonable_encoder -> json.dumps
+    after:    column tuples -> one TypeAdapter(list[ProductRow]).dump_json call
+    snapshot: slice of the in-memory catalog snapshot (CATALOG_SNAPSHOT), no query
+
+Both paths are measured with and without the query (in-memory SQLite), so the
+serialization share and the end-to-end page cost are visible.
+
+    python benchmarks/bench_serialization.py --items 100 --rounds 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+def _timeit(fn, rounds: int) -> float:
+    fn()  # warm-up (schema build, statement cache)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import Session
+
+    from app.database.models import Base, Product
+    from app.database.schemas import ProductResponse
+    from app.services.catalog_snapshot import CatalogSnapshot
+    from app.services.product_service import _ROW_COLUMNS, _row, _rows_adapter
+
+    response_adapter = TypeAdapter(list[ProductResponse])
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    now = datetime.now(timezone.utc)
+    with Session(engine) as db:
+        db.add_all([
+            Product(name=f"Product {i}", description="A reasonably sized description " * 3,
+                    price=Decimal(i) + Decimal("0.99"), created_at=now, updated_at=now)
+            for i in range(args.items)
+        ])
+        db.commit()
+    db = Session(engine)
+    orm_rows = db.scalars(select(Product).order_by(Product.id)).all()
+    column_rows = db.execute(select(*_ROW_COLUMNS).order_by(Product.id)).all()
+
+    def encode_before(products) -> bytes:
+        items = [ProductResponse.model_validate(p) for p in products]
+        validated = response_adapter.validate_python(items)
+        return json.dumps(jsonable_encoder(validated)).encode()
+
+    def encode_after(rows) -> bytes:
+        return _rows_adapter.dump_json([_row(values) for values in rows])
+
+    def query_before() -> bytes:
+        db.expunge_all()
+        return encode_before(db.scalars(select(Product).order_by(Product.id).limit(args.items)).all())
+
+    def query_after() -> bytes:
+        return encode_after(db.execute(select(*_ROW_COLUMNS).order_by(Product.id).limit(args.items)).all())
+
+    snapshot = CatalogSnapshot.build(_row(values) for values in column_rows)
+
+    def snapshot_page() -> bytes:
+        return snapshot.list_json(0, args.items, None, None, None, "id")
+
+    assert json.loads(encode_before(orm_rows)) == json.loads(encode_after(column_rows))
+    assert snapshot_page() == encode_after(column_rows)
+    results = {
+        "items": args.items,
+        "serialize_before_us": round(_timeit(lambda: encode_before(orm_rows), args.rounds), 1),
+        "serialize_after_us": round(_timeit(lambda: encode_after(column_rows), args.rounds), 1),
+        "query_and_serialize_before_us": round(_timeit(query_before, args.rounds // 4 or 1), 1),
+        "query_and_serialize_after_us": round(_timeit(query_after, args.rounds // 4 or 1), 1),
+        "snapshot_page_us": round(_timeit(snapshot_page, args.rounds), 1),
+    }
+    results["serialize_speedup"] = round(results["serialize_before_us"] / results["serialize_after_us"], 1)
+    results["page_speedup"] = round(
+        results["query_and_serialize_before_us"] / results["query_and_serialize_after_us"], 1
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Thundering herd on one product: DB queries and latency with and without read coalescing.
+
+Each round fires --concurrency simultaneous GET /products/{id} for the same
+product with the product cache cold, the way a hot item behaves right after
+it expires or at startup. Without coalescing every request runs its own query;
+with single-flight the herd shares one.
+
+    python benchmarks/bench_singleflight.py --concurrency 200 --rounds 20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+
+
+async def _herd(client, concurrency: int, rounds: int, clear_cache) -> dict:
+    latencies = []
+    for _ in range(rounds):
+        clear_cache()
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.get("/api/v1/products/1") for _ in range(concurrency)))
+        latencies.append(time.perf_counter() - start)
+        assert all(r.status_code == 200 for r in responses)
+    return {"round_ms_median": round(sorted(latencies)[len(latencies) // 2] * 1000, 1)}
+
+
+async def _run(concurrency: int, rounds: int) -> dict:
+    import httpx
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    from app.core.config import get_settings
+    from app.database.connection import engine
+    from app.database.models import Base, Product
+    from app.main import app
+    from app.services.product_service import clear_product_cache
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(Product(name="Hot product", description="bench", price=1))
+        db.commit()
+
+    queries = 0
+
+    def count(conn, cursor, statement, *args) -> None:
+        nonlocal queries
+        if "FROM products" in statement:
+            queries += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    settings = get_settings()
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for coalescing in (False, True):
+            settings.PRODUCT_READ_COALESCING = coalescing
+            queries = 0
+            stats = await _herd(client, concurrency, rounds, clear_product_cache)
+            results["coalesced" if coalescing else "uncoalesced"] = {
+                "requests": concurrency * rounds,
+                "db_queries": queries,
+                **stats,
+            }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    logging.getLogger("http").disabled = True
+    print(json.dumps(asyncio.run(_run(args.concurrency, args.rounds)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Load-test / benchmark suite for the API hot paths.
+
+Seeds N users and products, then measures throughput and p50/p95/p99
+latency for /health, login, GET /products, GET /products/{id} and admin
+writes. Runs in-process through httpx's ASGI transport (default) or
+against a running server with --url. Results are written as JSON; with
+--baseline the run fails (exit 1) when a scenario regresses by more than
+--threshold.
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --baseline bench.json --threshold 0.2
+    uvicorn app.main:app --workers 4 &  python -m benchmarks.suite --url http://127.0.0.1:8000
+
+Seeding writes straight to DATABASE_URL, so with --url point it at the
+server's database (or pass --no-seed for an already seeded one).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+# The login scenario measures password hashing, not 429s from the auth rate limits
+os.environ.setdefault("RATE_LIMIT_BACKEND", "none")
+
+import httpx  # noqa: E402
+
+BENCH_PASSWORD = "bench-password"
+ADMIN_EMAIL = "admin@bench.example.com"
+SCENARIOS = ("health", "login", "list_products", "get_product", "admin_write")
+
+
+def seed(users: int, products: int) -> None:
+    """Recreate the schema and insert users (one shared bcrypt hash) and products."""
+    from sqlalchemy.orm import Session
+
+    from app.core.security import hash_password
+    from app.database.connection import engine
+    from app.database.models import Base, Product, User, UserRole
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    password_hash = hash_password(BENCH_PASSWORD)
+    with Session(engine) as db:
+        db.add(User(name="Bench Admin", email=ADMIN_EMAIL, password_hash=password_hash, role=UserRole.admin))
+        db.add_all(
+            User(name=f"User {i}", email=f"user{i}@bench.example.com", password_hash=password_hash)
+            for i in range(users)
+        )
+        db.add_all(
+            Product(name=f"Product {i}", description=f"Benchmark product {i}", price=(i % 1000) + 0.99)
+            for i in range(products)
+        )
+        db.commit()
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+async def measure(requests: int, concurrency: int, call: Callable[[int], Awaitable[httpx.Response]]) -> dict[str, Any]:
+    """Run `requests` calls over `concurrency` workers and summarize latency/throughput."""
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await call(i)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3)  # noqa: E731
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(statistics.fmean(latencies)) if latencies else 0.0,
+    }
+
+
+async def run_suite(args: argparse.Namespace) -> dict[str, Any]:
+    """Run the selected scenarios and return the results document."""
+    if args.url:
+        transport = None
+        base_url = args.url.rstrip("/")
+    else:
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results: dict[str, Any] = {}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+        r = await client.post("/api/v1/auth/login", json={"email": ADMIN_EMAIL, "password": BENCH_PASSWORD})
+        r.raise_for_status()
+        admin = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        rng = random.Random(args.seed)
+
+        calls: dict[str, tuple[int, Callable[[int], Awaitable[httpx.Response]]]] = {
+            "health": (args.requests, lambda i: client.get("/health")),
+            "login": (args.login_requests, lambda i: client.post(
+                "/api/v1/auth/login",
+                json={"email": f"user{rng.randrange(args.users)}@bench.example.com", "password": BENCH_PASSWORD},
+            )),
+            "list_products": (args.requests, lambda i: client.get(
+                "/api/v1/products", params={"skip": rng.randrange(max(args.products - 20, 1)), "limit": 20}
+            )),
+            "get_product": (args.requests, lambda i: client.get(f"/api/v1/products/{rng.randrange(args.products) + 1}")),
+            "admin_write": (args.write_requests, lambda i: client.put(
+                f"/api/v1/products/{rng.randrange(args.products) + 1}", json={"price": rng.randrange(1, 1000)}, headers=admin
+            )),
+        }
+        for name in args.scenarios:
+            requests, call = calls[name]
+            await call(0)  # warm-up (imports, pools, caches)
+            results[name] = await measure(requests, args.concurrency, call)
+            print(
+                f"{name:>14}: {results[name]['rps']:>9} req/s  p50 {results[name]['p50_ms']:>8} ms  "
+                f"p95 {results[name]['p95_ms']:>8} ms  p99 {results[name]['p99_ms']:>8} ms  errors {results[name]['errors']}"
+            )
+    return {
+        "meta": {
+            "target": args.url or "in-process",
+            "users": args.users,
+            "products": args.products,
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "scenarios": results,
+    }
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """Return a message per scenario whose p95 grew or throughput fell by more than `threshold`."""
+    regressions = []
+    for name, base in baseline.get("scenarios", {}).items():
+        now = current["scenarios"].get(name)
+        if now is None:
+            continue
+        if base["p95_ms"] and now["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {base['p95_ms']} -> {now['p95_ms']} ms")
+        if base["rps"] and now["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {base['rps']} -> {now['rps']} req/s")
+        if now["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} -> {now['errors']}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per read scenario")
+    parser.add_argument("--login-requests", type=int, default=100, help="Requests for the bcrypt-bound login scenario")
+    parser.add_argument("--write-requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--scenarios", type=lambda s: s.split(","), default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=1234, help="RNG seed for request mix")
+    parser.add_argument("--no-seed", action="store_true", help="Do not reset and seed the database")
+    parser.add_argument("--keep-logs", action="store_true", help="Keep per-request access logging enabled")
+    parser.add_argument("--output", type=Path, help="Write results JSON here")
+    parser.add_argument("--baseline", type=Path, help="Compare against a previous results JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    if not args.keep_logs:
+        from app.utils.logger import get_logger
+
+        get_logger("http").setLevel(logging.WARNING)
+    if not args.no_seed:
+        seed(args.users, args.products)
+    results = asyncio.run(run_suite(args))
+    if not args.url:
+        from app.core.security import get_password_pool
+
+        get_password_pool().shutdown()
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 """Pytest fixtures: test client, db session, test user."""
 import os
+import queue
 import sys
 from pathlib import Path
 
@@ -52,8 +53,16 @@ def db() -> Generator[Session, None, None]:
 @pytest.fixture
 def client(db: Session) -> Generator[TestClient, None, None]:
     """Test client with overridden get_db."""
+    from app.api.deps import clear_rate_limits
+    from app.core.jwt_handler import reset_jwt_state
     from app.database.connection import get_db
+    from app.services.product_service import clear_product_cache
+    from app.services.user_service import clear_auth_cache
     app.dependency_overrides[get_db] = override_get_db
+    clear_auth_cache()
+    clear_product_cache()
+    clear_rate_limits()
+    reset_jwt_state()
     Base.metadata.create_all(bind=engine)
     with TestClient(app) as c:
         yield c
@@ -61,6 +70,116 @@ def client(db: Session) -> Generator[TestClient, None, None]:
     Base.metadata.drop_all(bind=engine)
 
 
+class FakeRedis:
+    """In-memory stand-in for the redis-py client methods the app uses."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, bytes] = {}
+        self.ttls: dict[str, int] = {}
+        self.subscribers: list["FakePubSub"] = []
+
+    def get(self, key: str) -> bytes | None:
+        return self.data.get(key)
+
+    def mget(self, keys: list[str]) -> list[bytes | None]:
+        return [self.data.get(k) for k in keys]
+
+    def set(self, key: str, value: bytes | str, ex: int | None = None) -> None:
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        if ex is not None:
+            self.ttls[key] = ex
+
+    def delete(self, *keys: str) -> int:
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    def incr(self, key: str) -> int:
+        value = int(self.data.get(key, b"0")) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+    def expire(self, key: str, seconds: int) -> bool:
+        if key in self.data:
+            self.ttls[key] = seconds
+        return key in self.data
+
+    def scan_iter(self, match: str = "*"):
+        prefix = match.rstrip("*")
+        return [k for k in list(self.data) if k.startswith(prefix)]
+
+    def info(self, section: str = "") -> dict:
+        return {"evicted_keys": 0}
+
+    def publish(self, channel: str, message: str) -> int:
+        receivers = [sub for sub in list(self.subscribers) if channel in sub.channels]
+        for sub in receivers:
+            sub.queue.put({"type": "message", "channel": channel.encode(), "data": message.encode()})
+        return len(receivers)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> "FakePubSub":
+        return FakePubSub(self)
+
+
+class FakePubSub:
+    """Subscriber side of FakeRedis pub/sub (messages only, no subscribe confirmations)."""
+
+    def __init__(self, redis: FakeRedis) -> None:
+        self.redis = redis
+        self.channels: set[str] = set()
+        self.queue: queue.Queue = queue.Queue()
+
+    def subscribe(self, *channels: str) -> None:
+        self.channels.update(channels)
+        self.redis.subscribers.append(self)
+
+    def get_message(self, timeout: float = 0.0) -> dict | None:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        if self in self.redis.subscribers:
+            self.redis.subscribers.remove(self)
+
+
+@pytest.fixture
+def fake_redis() -> FakeRedis:
+    """A fresh FakeRedis client."""
+    return FakeRedis()
+
+
+@pytest.fixture
+def stateless_auth() -> Generator[None, None, None]:
+    """Enable AUTH_STATELESS for one test."""
+    from app.core.config import get_settings
+    settings = get_settings()
+    settings.AUTH_STATELESS = True
+    try:
+        yield
+    finally:
+        settings.AUTH_STATELESS = False
+
+
+@pytest.fixture
+def query_budget():
+    """Context manager failing the test if the block runs more than `max_queries` SQL statements.
+
+    Usage: `with query_budget(4): client.put(...)`
+    """
+    from contextlib import contextmanager
+    from app.database.profiling import capture_queries
+
+    @contextmanager
+    def budget(max_queries: int):
+        with capture_queries() as stats:
+            yield stats
+        assert stats.count <= max_queries, (
+            f"ran {stats.count} queries, budget is {max_queries}:\n" + "\n".join(stats.statements)
+        )
+
+    return budget
+
+
 @pytest.fixture
 def test_user(db: Session) -> User:
     """Create a test user (role=user)."""
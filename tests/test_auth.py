@@ -62,3 +62,306 @@ def test_rbac_admin_can_list_users(client: TestClient, admin_token: str) -> None
     r = client.get("/api/v1/users", headers={"Authorization": f"Bearer {admin_token}"})
     assert r.status_code == 200
     assert isinstance(r.json(), list)
+
+
+def test_list_users_keyset(client: TestClient, admin_token: str, test_user) -> None:
+    """Admin can page users with a cursor."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    r = client.get("/api/v1/users", params={"cursor": "", "limit": 1}, headers=headers)
+    assert r.status_code == 200
+    page = r.json()
+    assert len(page["items"]) == 1 and page["next_cursor"]
+    r = client.get("/api/v1/users", params={"cursor": page["next_cursor"], "limit": 1}, headers=headers)
+    assert r.json()["items"][0]["id"] != page["items"][0]["id"]
+
+
+@pytest.mark.asyncio
+async def test_password_pool_rejects_when_saturated() -> None:
+    """Calls beyond workers + queue fail fast with 503 instead of queuing."""
+    import asyncio
+    import time
+    from app.core.security import PasswordHasherPool
+    from app.utils.exceptions import ServiceUnavailableException
+    pool = PasswordHasherPool(workers=0, queue_size=0)
+    slow = asyncio.ensure_future(pool.run(time.sleep, 0.2))
+    await asyncio.sleep(0.05)
+    with pytest.raises(ServiceUnavailableException) as exc:
+        await pool.run(time.sleep, 0)
+    assert exc.value.headers["Retry-After"]
+    await slow
+    stats = pool.stats()
+    assert stats["rejected_total"] == 1 and stats["hash_count"] == 1
+    assert stats["hash_seconds_max"] >= 0.2
+
+
+def test_stateless_admin_write_skips_user_lookup(client: TestClient, admin_token: str, test_admin, db, stateless_auth) -> None:
+    """Stateless mode trusts verified claims: the admin row is never read."""
+    db.delete(test_admin)
+    db.commit()
+    r = client.post(
+        "/api/v1/products",
+        json={"name": "P", "price": 1},
+        headers={"Authorization": f"Bearer {admin_token}"},
+    )
+    assert r.status_code == 201
+
+
+def test_stateless_role_change_invalidates_old_token(
+    client: TestClient, admin_token: str, test_user, user_token: str, stateless_auth
+) -> None:
+    """Promoting a user is honoured for tokens issued before the change."""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    assert client.get("/api/v1/users", headers=headers).status_code == 403
+    r = client.put(
+        f"/api/v1/users/{test_user.id}",
+        json={"role": "admin"},
+        headers={"Authorization": f"Bearer {admin_token}"},
+    )
+    assert r.status_code == 200
+    assert client.get("/api/v1/users", headers=headers).status_code == 200
+
+
+def test_change_markers_survive_more_users_than_the_cache_holds(client: TestClient) -> None:
+    """A change marker is never evicted early, however many users change after it."""
+    import time
+    from app.core.config import get_settings
+    from app.services import user_service
+    issued_at = time.time() - 1
+    for user_id in range(1, get_settings().AUTH_CACHE_MAX_ENTRIES + 2):
+        user_service.invalidate_user(user_id)
+    assert user_service.changed_since(1, issued_at)
+    assert not user_service.changed_since(1, time.time() + 1)
+
+
+def test_token_verification_is_cached_and_revocable(client: TestClient, admin_token: str, monkeypatch) -> None:
+    """Repeat requests reuse verified claims; a revoked jti is rejected even when cached."""
+    import jwt
+    from app.core import jwt_handler
+    calls = []
+    real_decode = jwt.decode
+    monkeypatch.setattr(jwt, "decode", lambda *a, **kw: calls.append(1) or real_decode(*a, **kw))
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    assert client.get("/api/v1/users", headers=headers).status_code == 200
+    assert client.get("/api/v1/users", headers=headers).status_code == 200
+    assert len(calls) == 1
+    claims = jwt_handler.decode_access_token(admin_token)
+    assert claims["jti"]
+    jwt_handler.revoke_token(claims)
+    assert client.get("/api/v1/users", headers=headers).status_code == 401
+
+
+def test_eddsa_tokens_verify_with_public_key_only(tmp_path) -> None:
+    """Asymmetric mode: tokens signed with the private key verify with the preloaded public key."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+    from app.core import jwt_handler
+    from app.core.config import get_settings
+    private = Ed25519PrivateKey.generate()
+    (tmp_path / "jwt.pem").write_bytes(private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ))
+    (tmp_path / "jwt.pub").write_bytes(private.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ))
+    settings = get_settings()
+    saved = settings.JWT_ALGORITHM, settings.JWT_PRIVATE_KEY_FILE, settings.JWT_PUBLIC_KEY_FILE
+    settings.JWT_ALGORITHM = "EdDSA"
+    settings.JWT_PRIVATE_KEY_FILE, settings.JWT_PUBLIC_KEY_FILE = str(tmp_path / "jwt.pem"), str(tmp_path / "jwt.pub")
+    jwt_handler.reset_jwt_state()
+    try:
+        token = jwt_handler.create_access_token(7)
+        assert jwt_handler.decode_access_token(token)["sub"] == "7"
+        settings.JWT_PRIVATE_KEY_FILE = None  # verify-only service
+        jwt_handler.reset_jwt_state()
+        assert jwt_handler.decode_access_token(token)["sub"] == "7"
+        assert jwt_handler.decode_access_token(token[:-4] + "AAAA") is None
+    finally:
+        settings.JWT_ALGORITHM, settings.JWT_PRIVATE_KEY_FILE, settings.JWT_PUBLIC_KEY_FILE = saved
+        jwt_handler.reset_jwt_state()
+
+
+def test_token_denylist_keeps_every_revocation_until_exp() -> None:
+    """The denylist never evicts a live revocation, however many there are."""
+    import time
+    from app.core import jwt_handler
+    exp = time.time() + 600
+    try:
+        jwt_handler.revoke_token({"jti": "first", "exp": exp})
+        for i in range(150_000):
+            jwt_handler.revoke_token({"jti": f"t{i}", "exp": exp})
+        assert jwt_handler._is_revoked({"jti": "first"})
+    finally:
+        jwt_handler.reset_jwt_state()
+
+
+def test_refresh_rotates_and_detects_reuse(client: TestClient, test_user, monkeypatch) -> None:
+    """Refresh issues a new pair without bcrypt; replaying a spent token revokes the family."""
+    from app.core import security
+    login = client.post("/api/v1/auth/login", json={"email": "user@test.com", "password": "password123"}).json()
+    first = login["refresh_token"]
+    assert login["expires_in"] > 0
+    monkeypatch.setattr(security.bcrypt, "checkpw", lambda *a: pytest.fail("refresh must not hash"))
+    r = client.post("/api/v1/auth/refresh", json={"refresh_token": first})
+    assert r.status_code == 200
+    second = r.json()["refresh_token"]
+    assert second != first
+    # The new access token authenticates (403: valid user, not an admin)
+    assert client.get("/api/v1/users", headers={"Authorization": f"Bearer {r.json()['access_token']}"}).status_code == 403
+    # Replay of the spent token: rejected, and the live successor is revoked too
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": first}).status_code == 401
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": second}).status_code == 401
+
+
+def test_logout_revokes_refresh_and_access_token(client: TestClient, test_user) -> None:
+    """Logout spends the refresh token family and denies the access token's jti."""
+    tokens = client.post("/api/v1/auth/login", json={"email": "user@test.com", "password": "password123"}).json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    r = client.post("/api/v1/auth/logout", json={"refresh_token": tokens["refresh_token"]}, headers=headers)
+    assert r.status_code == 204
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+    assert client.put("/api/v1/users/1", json={"name": "x"}, headers=headers).status_code == 401
+
+
+def test_bus_resync_rechecks_tokens_of_deleted_users(client: TestClient, admin_token: str, db, stateless_auth) -> None:
+    """A user deleted while the bus was down has no row to re-mark; resync still sends old tokens to the DB."""
+    from app.database.models import User
+    from app.services import user_service
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    db.query(User).filter(User.email == "admin@test.com").delete()
+    db.commit()  # as if on another worker, with the event lost
+    assert client.get("/api/v1/users", headers=headers).status_code == 200  # stale claims
+    user_service._resync_auth_cache()
+    assert client.get("/api/v1/users", headers=headers).status_code != 200
+
+
+def test_logout_on_another_worker_revokes_access_token(client: TestClient, admin_token: str, fake_redis) -> None:
+    """A logout published by another worker denies the access token here too."""
+    import time
+    from app.core.jwt_handler import decode_access_token
+    from app.utils.invalidation import ChangeEvent, InvalidationBus, RedisTransport, bus
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    assert client.get("/api/v1/users", headers=headers).status_code == 200
+    other_worker = InvalidationBus(poll_seconds=0.01)
+    bus.poll_seconds = 0.01
+    bus.start(RedisTransport(fake_redis, "test_invalidation"))
+    other_worker.start(RedisTransport(fake_redis, "test_invalidation"))
+    try:
+        deadline = time.monotonic() + 5
+        while len(fake_redis.subscribers) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        other_worker.publish([ChangeEvent("access_token", decode_access_token(admin_token)["jti"], time.time())])
+        status = 200
+        while status == 200 and time.monotonic() < deadline:
+            time.sleep(0.01)
+            status = client.get("/api/v1/users", headers=headers).status_code
+        assert status == 401
+    finally:
+        bus.stop()
+        bus.poll_seconds = 1.0
+        other_worker.stop()
+
+
+def test_login_rehashes_outdated_cost_and_scheme(client: TestClient, db) -> None:
+    """Hashes with another cost or scheme still verify and are upgraded on login."""
+    from app.core.config import get_settings
+    from app.core.security import HashPolicy, hash_password, needs_rehash
+    from app.database.models import User, UserRole
+    user = User(name="Old", email="old@test.com", password_hash=hash_password("pw-123456", HashPolicy(bcrypt_rounds=4)),
+                role=UserRole.user)
+    db.add(user)
+    db.commit()
+    settings = get_settings()
+    saved = settings.PASSWORD_SCHEME, settings.BCRYPT_ROUNDS
+    try:
+        settings.BCRYPT_ROUNDS = 5
+        assert client.post("/api/v1/auth/login", json={"email": "old@test.com", "password": "pw-123456"}).status_code == 200
+        db.refresh(user)
+        assert user.password_hash.startswith("$2b$05$")
+        settings.PASSWORD_SCHEME = "argon2id"
+        assert client.post("/api/v1/auth/login", json={"email": "old@test.com", "password": "pw-123456"}).status_code == 200
+        db.refresh(user)
+        assert user.password_hash.startswith("$argon2id$") and not needs_rehash(user.password_hash)
+        assert client.post("/api/v1/auth/login", json={"email": "old@test.com", "password": "wrong"}).status_code == 401
+        assert client.post("/api/v1/auth/login", json={"email": "old@test.com", "password": "pw-123456"}).status_code == 200
+    finally:
+        settings.PASSWORD_SCHEME, settings.BCRYPT_ROUNDS = saved
+
+
+def test_login_rate_limited_per_account_before_hashing(client: TestClient, test_user, monkeypatch) -> None:
+    """Past the failed-login limit, login answers 429 with Retry-After and skips password verification."""
+    from app.api import deps
+    from app.services import auth_service
+    calls = []
+    real_verify = auth_service.verify_password_async
+
+    async def counting_verify(plain: str, hashed: str) -> bool:
+        calls.append(plain)
+        return await real_verify(plain, hashed)
+
+    monkeypatch.setattr(auth_service, "verify_password_async", counting_verify)
+    body = {"email": "user@test.com", "password": "wrong"}
+    statuses = [client.post("/api/v1/auth/login", json=body).status_code for _ in range(6)]
+    assert statuses == [401] * 5 + [429]
+    assert len(calls) == 5
+    response = client.post("/api/v1/auth/login", json={"email": "USER@test.com", "password": "password123"})
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 120
+    # Another account from the same client is still allowed
+    assert client.post("/api/v1/auth/login", json={"email": "other@test.com", "password": "x"}).status_code == 401
+    # The owner, from another client, is not locked out; successful logins do not count
+    monkeypatch.setattr(deps, "_client_ip", lambda request: "203.0.113.9")
+    good = {"email": "user@test.com", "password": "password123"}
+    assert [client.post("/api/v1/auth/login", json=good).status_code for _ in range(6)] == [200] * 6
+
+
+def test_login_failures_from_many_ips_hit_the_per_email_limit(client: TestClient, test_user, monkeypatch) -> None:
+    """Guessing one account's password from rotating IPs is still limited per account."""
+    from itertools import count
+    from app.api import deps
+    from app.core.config import get_settings
+    monkeypatch.setattr(get_settings(), "RATE_LIMIT_LOGIN_PER_EMAIL", 8)
+    ips = (f"198.51.100.{n}" for n in count(1))
+    monkeypatch.setattr(deps, "_client_ip", lambda request: next(ips))
+    body = {"email": "user@test.com", "password": "wrong"}
+    statuses = [client.post("/api/v1/auth/login", json=body).status_code for _ in range(9)]
+    assert statuses == [401] * 8 + [429]
+    assert client.post("/api/v1/auth/login", json={"email": "other@test.com", "password": "x"}).status_code == 401
+
+
+def test_sliding_window_limiter_memory_and_redis(fake_redis) -> None:
+    """Both stores count a sliding window and report when the next hit will be allowed."""
+    from app.utils.rate_limit import MemoryRateLimitStore, RedisRateLimitStore, SlidingWindowLimiter
+    for store in (MemoryRateLimitStore(), RedisRateLimitStore(fake_redis)):
+        limiter = SlidingWindowLimiter(store)
+        assert [limiter.hit("ip:1", 2, 60, now=600) for _ in range(2)] == [0, 0]
+        assert limiter.hit("ip:1", 2, 60, now=610) == 90  # 50s to the next window + 40s for 3 hits to weigh 1
+        assert limiter.hit("ip:1", 2, 60, now=690) > 0  # the 3 previous hits still weigh 1.5
+        assert limiter.hit("ip:2", 2, 60, now=690) == 0
+        assert limiter.check("ip:3", 1, 60, now=600) == 0 and limiter.check("ip:3", 1, 60, now=600) == 0
+        limiter.hit("ip:3", 1, 60, now=600)
+        assert limiter.check("ip:3", 1, 60, now=600) == 120  # until that hit has fully decayed
+    assert any(k.startswith("ratelimit:ip:1:") for k in fake_redis.data)
+
+
+def test_purge_deletes_expired_keys_and_dead_refresh_tokens(client: TestClient, test_user, db) -> None:
+    """Expired rows and logged-out families go; rotated tokens of live sessions stay for reuse detection."""
+    from datetime import datetime, timedelta, timezone
+    from app.database.models import IdempotencyKey, RefreshToken
+    from app.services.purge import purge
+    login = {"email": "user@test.com", "password": "password123"}
+    live = client.post("/api/v1/auth/login", json=login).json()
+    rotated = client.post("/api/v1/auth/refresh", json={"refresh_token": live["refresh_token"]}).json()
+    logged_out = client.post("/api/v1/auth/login", json=login).json()
+    client.post("/api/v1/auth/logout", json={"refresh_token": logged_out["refresh_token"]})
+    past = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.add_all([
+        RefreshToken(user_id=test_user.id, token_hash="0" * 64, family_id="expired", expires_at=past),
+        IdempotencyKey(user_id=test_user.id, key="old", fingerprint="f", expires_at=past),
+        IdempotencyKey(user_id=test_user.id, key="new", fingerprint="f", expires_at=past + timedelta(hours=1)),
+    ])
+    db.commit()
+    assert purge(db) == {"idempotency_keys": 1, "refresh_tokens": 2}
+    assert db.query(RefreshToken).count() == 2 and db.query(IdempotencyKey).count() == 1
+    # Replaying the spent token is still detected and revokes its live successor
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": live["refresh_token"]}).status_code == 401
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": rotated["refresh_token"]}).status_code == 401
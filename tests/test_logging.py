@@ -0,0 +1,41 @@
+"""Tests: queued structured logging, request IDs, drop counting."""
+import json
+import logging
+import queue
+
+from fastapi.testclient import TestClient
+
+
+def test_request_id_is_echoed_and_logged(client: TestClient) -> None:
+    """A client-supplied X-Request-ID is returned and attached to the access log record."""
+    from app.utils.logger import JsonFormatter
+    records: list[logging.LogRecord] = []
+    capture = logging.Handler()
+    capture.emit = records.append
+    logging.getLogger("http").addHandler(capture)
+    try:
+        r = client.get("/health", headers={"X-Request-ID": "req-123"})
+    finally:
+        logging.getLogger("http").removeHandler(capture)
+    assert r.headers["X-Request-ID"] == "req-123"
+    line = json.loads(JsonFormatter().format(records[-1]))
+    assert line["request_id"] == "req-123"
+    assert line["message"] == "GET /health 200"
+    assert line["status"] == 200
+    assert "duration_ms" in line and "db_queries" in line
+
+
+def test_full_queue_drops_and_counts() -> None:
+    """Records beyond the queue size are dropped without blocking, and counted."""
+    from app.utils.logger import DroppingQueueHandler
+    from app.utils.metrics import REGISTRY
+    key = ("log_records_dropped_total", ("queue_full",))
+    before = REGISTRY.collect().get(key, 0.0)
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+    logger = logging.getLogger("test.dropping")
+    logger.propagate = False
+    logger.addHandler(handler)
+    for i in range(5):
+        logger.warning("record %d", i)
+    assert handler.queue.qsize() == 2
+    assert REGISTRY.collect()[key] - before == 3
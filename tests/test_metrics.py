@@ -0,0 +1,31 @@
+"""Tests: /metrics exposition and multi-process aggregation."""
+from fastapi.testclient import TestClient
+
+
+def test_metrics_endpoint_reports_route_templates(client: TestClient) -> None:
+    """Requests are counted per route template, with a latency histogram."""
+    client.get("/api/v1/products/12345")
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    assert 'http_requests_total{method="GET",route="/api/v1/products/{product_id}",status="404"}' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/v1/products/{product_id}",le="+Inf"}' in body
+    assert "# TYPE db_pool_checked_out gauge" in body
+    assert "# TYPE password_hash_seconds histogram" in body
+
+
+def test_multiprocess_snapshots_are_summed(tmp_path) -> None:
+    """Counters from other workers' snapshot files are added to this worker's."""
+    import json
+    from app.utils.metrics import Registry
+    registry = Registry()
+    hits = registry.counter("hits_total", "Hits.", ("route",))
+    hits.inc("/a", amount=2)
+    (tmp_path / "999999999.json").write_text(json.dumps({
+        "pid": 999999999,
+        "samples": [["hits_total", ["/a"], 3.0]],
+    }))
+    samples = registry.collect_multiprocess(str(tmp_path))
+    assert samples[("hits_total", ("/a",))] == 5.0
+    assert 'hits_total{route="/a"} 5' in registry.render(samples)
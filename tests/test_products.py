@@ -81,3 +81,805 @@ def test_delete_product_admin(client: TestClient, admin_token: str, db) -> None:
     assert r.status_code == 204
     r2 = client.get(f"/api/v1/products/{pid}")
     assert r2.status_code == 404
+
+
+def test_list_products_keyset_pagination(client: TestClient, db) -> None:
+    """Cursor mode walks every product exactly once and ends with next_cursor=None."""
+    from app.database.models import Product
+    from decimal import Decimal
+    db.add_all([Product(name=f"P{i}", price=Decimal("1.00")) for i in range(5)])
+    db.commit()
+    seen, cursor = [], ""
+    while cursor is not None:
+        r = client.get("/api/v1/products", params={"cursor": cursor, "limit": 2})
+        assert r.status_code == 200
+        page = r.json()
+        seen += [p["name"] for p in page["items"]]
+        cursor = page["next_cursor"]
+    assert seen == [f"P{i}" for i in range(5)]
+
+
+def test_list_products_keyset_by_created_at(client: TestClient, db) -> None:
+    """(created_at, id) cursor breaks ties on id."""
+    from app.database.models import Product
+    from datetime import datetime, timezone
+    from decimal import Decimal
+    ts = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    db.add_all([Product(name=f"P{i}", price=Decimal("1.00"), created_at=ts) for i in range(3)])
+    db.commit()
+    r = client.get("/api/v1/products", params={"cursor": "", "limit": 2, "sort": "created_at"})
+    page = r.json()
+    assert [p["name"] for p in page["items"]] == ["P0", "P1"]
+    r = client.get("/api/v1/products", params={"cursor": page["next_cursor"], "limit": 2, "sort": "created_at"})
+    assert [p["name"] for p in r.json()["items"]] == ["P2"]
+    assert r.json()["next_cursor"] is None
+
+
+def test_list_products_invalid_cursor(client: TestClient) -> None:
+    """Garbage or mismatched cursors return 400."""
+    assert client.get("/api/v1/products", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_services_run_on_async_session(db) -> None:
+    """run_db executes the same service code on an AsyncSession (DATABASE_ASYNC path)."""
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.database.connection import run_db, to_async_url
+    from app.database.schemas import ProductCreate
+    from app.services.product_service import create_product, list_products
+    import os
+    async_engine = create_async_engine(to_async_url(os.environ["DATABASE_URL"]))
+    try:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            created = await run_db(session, create_product, ProductCreate(name="Async", price="3.50"))
+            listed = await run_db(session, list_products, skip=0, limit=10)
+    finally:
+        await async_engine.dispose()
+    assert [p.id for p in listed] == [created.id]
+
+
+@pytest.mark.asyncio
+async def test_run_db_in_thread_swaps_async_session(db) -> None:
+    """Long work (imports) runs in the threadpool on a sync session, not on the loop via run_sync."""
+    import threading
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import Session
+    from app.database.connection import run_db_in_thread, to_async_url
+    import os
+    seen = []
+
+    def work(session):
+        seen.append((type(session), threading.get_ident()))
+        return 42
+
+    async_engine = create_async_engine(to_async_url(os.environ["DATABASE_URL"]))
+    try:
+        async with AsyncSession(async_engine) as session:
+            assert await run_db_in_thread(session, work) == 42
+    finally:
+        await async_engine.dispose()
+    assert issubclass(seen[0][0], Session) and seen[0][1] != threading.get_ident()
+
+
+def test_to_async_url() -> None:
+    """Sync URLs map to the async drivers."""
+    from app.database.connection import to_async_url
+    assert to_async_url("postgresql://u:p@h/db?sslmode=require") == "postgresql+asyncpg://u:p@h/db?ssl=require"
+    assert to_async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+
+
+def test_product_reads_are_cached_and_invalidated(client: TestClient, admin_token: str, db) -> None:
+    """Second read is served from cache; an admin update invalidates it."""
+    from app.database.models import Product
+    from app.services.product_service import product_cache_stats
+    from decimal import Decimal
+    product = Product(name="Cached", price=Decimal("1.00"))
+    db.add(product)
+    db.commit()
+    db.refresh(product)
+    before = product_cache_stats()
+    client.get(f"/api/v1/products/{product.id}")
+    client.get(f"/api/v1/products/{product.id}")
+    after = product_cache_stats()
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 1
+    client.put(
+        f"/api/v1/products/{product.id}",
+        json={"name": "Renamed"},
+        headers={"Authorization": f"Bearer {admin_token}"},
+    )
+    assert client.get(f"/api/v1/products/{product.id}").json()["name"] == "Renamed"
+    assert [p["name"] for p in client.get("/api/v1/products").json()] == ["Renamed"]
+
+
+def test_item_read_racing_a_write_is_not_recached(db, monkeypatch) -> None:
+    """A row loaded before a write commits is not served from cache after the write's invalidation."""
+    from decimal import Decimal
+    from app.database.models import Product
+    from app.database.schemas import ProductResponse
+    from app.services import product_service
+    product_service.clear_product_cache()
+    product = Product(name="Old", price=Decimal("1.00"))
+    db.add(product)
+    db.commit()
+    real_fetch = product_service.get_product_by_id
+
+    def fetch_then_concurrent_write(session, product_id):
+        loaded = ProductResponse.model_validate(real_fetch(session, product_id))
+        product.name = "New"
+        db.commit()
+        product_service._invalidate(product_id)
+        return loaded
+
+    monkeypatch.setattr(product_service, "get_product_by_id", fetch_then_concurrent_write)
+    assert product_service.get_product(db, product.id).name == "Old"
+    monkeypatch.setattr(product_service, "get_product_by_id", real_fetch)
+    assert product_service.get_product(db, product.id).name == "New"
+
+
+def test_product_cache_redis_backend(client: TestClient, admin_token: str, fake_redis, monkeypatch) -> None:
+    """The Redis backend round-trips products as JSON and invalidates list pages on writes."""
+    from app.services import product_service
+    from app.utils.cache import RedisBackend
+    backend = RedisBackend(fake_redis, ttl_seconds=60, prefix="t:")
+    monkeypatch.setattr(product_service, "get_product_cache", lambda: backend)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    assert client.get("/api/v1/products").json() == []
+    created = client.post("/api/v1/products", json={"name": "R", "price": 2}, headers=headers).json()
+    assert [p["id"] for p in client.get("/api/v1/products").json()] == [created["id"]]
+    assert client.get(f"/api/v1/products/{created['id']}").json()["name"] == "R"
+    assert any(k.startswith("t:products:item:") for k in fake_redis.data)
+    assert client.get(f"/api/v1/products/{created['id']}").status_code == 200
+    assert backend.stats()["hits"] >= 1
+
+
+def test_cache_counters_expire_and_survive_clear(fake_redis, monkeypatch) -> None:
+    """Counters are bounded but never restart below a value whose entries may still be cached."""
+    from app.utils import cache
+    redis_backend = cache.RedisBackend(fake_redis, ttl_seconds=60, prefix="t:")
+    first = redis_backend.incr("products:item-version:1")
+    assert redis_backend.incr("products:item-version:1") == first + 1
+    assert fake_redis.ttls["t:counter:products:item-version:1"] >= 60
+    redis_backend.set("products:item:1", b"x")
+    redis_backend.clear()
+    assert redis_backend.get("products:item:1") is None
+    assert redis_backend.counter("products:item-version:1") == first + 1
+    # An expired counter starts past its old value
+    fake_redis.delete("t:counter:products:item-version:1")
+    assert redis_backend.incr("products:item-version:1") > first + 1
+
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    memory_backend = cache.MemoryBackend(max_entries=2, ttl_seconds=60)
+    old = memory_backend.incr("a")
+    memory_backend.incr("b")
+    memory_backend.incr("c")  # over the cap: "a" goes, and missing counters move past it
+    assert len(memory_backend._counters) == 2
+    assert memory_backend.counter("a") > old and memory_backend.counter("a") == memory_backend.counter("z")
+    now[0] += 61
+    memory_backend.incr("d")  # "b" and "c" were idle for an entry TTL
+    assert list(memory_backend._counters) == ["d"]
+    memory_backend.set("k", 1)
+    memory_backend.clear()
+    assert memory_backend.get("k") is None and "d" in memory_backend._counters
+
+
+def test_get_product_conditional_requests(client: TestClient, db) -> None:
+    """Product reads carry ETag/Last-Modified and answer matching validators with 304."""
+    from app.database.models import Product
+    from decimal import Decimal
+    product = Product(name="Etag", price=Decimal("1.00"))
+    db.add(product)
+    db.commit()
+    db.refresh(product)
+    r = client.get(f"/api/v1/products/{product.id}")
+    etag, last_modified = r.headers["etag"], r.headers["last-modified"]
+    r = client.get(f"/api/v1/products/{product.id}", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b"" and r.headers["etag"] == etag
+    r = client.get(f"/api/v1/products/{product.id}", headers={"If-Modified-Since": last_modified})
+    assert r.status_code == 304
+    r = client.get(f"/api/v1/products/{product.id}", headers={"If-None-Match": '"stale"'})
+    assert r.status_code == 200
+    # "-0000" parses to a naive datetime; it is still UTC, not a 500
+    future = {"If-Modified-Since": "Sat, 01 Jan 2099 00:00:00 -0000"}
+    assert client.get(f"/api/v1/products/{product.id}", headers=future).status_code == 304
+    assert client.get("/api/v1/products", headers=future).status_code == 304
+
+
+def test_list_products_etag_changes_on_write(client: TestClient, admin_token: str) -> None:
+    """An unchanged list page is a 304; any write changes the list validator."""
+    etag = client.get("/api/v1/products").headers["etag"]
+    assert client.get("/api/v1/products", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/v1/products?limit=5", headers={"If-None-Match": etag}).status_code == 200
+    client.post(
+        "/api/v1/products",
+        json={"name": "New", "price": 1},
+        headers={"Authorization": f"Bearer {admin_token}"},
+    )
+    assert client.get("/api/v1/products", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_bulk_create_update_delete(client: TestClient, admin_token: str) -> None:
+    """Bulk endpoints apply valid items in one go and report invalid ones by index."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    r = client.post(
+        "/api/v1/products/bulk",
+        json=[{"name": "A", "price": 1}, {"name": "", "price": 2}, {"name": "C", "price": 3}],
+        headers=headers,
+    )
+    assert r.status_code == 200
+    body = r.json()
+    assert [p["name"] for p in body["items"]] == ["A", "C"]
+    assert [e["index"] for e in body["errors"]] == [1]
+    a, c = (p["id"] for p in body["items"])
+
+    r = client.patch(
+        "/api/v1/products/bulk",
+        json=[
+            {"id": a, "name": "A2"}, {"id": 999999, "name": "X"}, {"id": c, "price": -1}, {"id": c, "name": None},
+        ],
+        headers=headers,
+    )
+    body = r.json()
+    assert [p["name"] for p in body["items"]] == ["A2"]
+    assert sorted(e["index"] for e in body["errors"]) == [1, 2, 3]
+    assert client.get(f"/api/v1/products/{a}").json()["name"] == "A2"
+
+    # Non-integer ids are reported per item, not a 500
+    r = client.patch("/api/v1/products/bulk", json=[{"id": "abc", "name": "x"}], headers=headers)
+    assert r.status_code == 200 and r.json()["errors"][0]["index"] == 0 and r.json()["errors"][0]["id"] is None
+    r = client.post("/api/v1/products/bulk", json=[{"id": "x1", "name": ""}], headers=headers)
+    assert r.status_code == 200 and r.json()["items"] == [] and r.json()["errors"][0]["id"] is None
+
+    r = client.request("DELETE", "/api/v1/products/bulk", json={"ids": [a, c, 999999]}, headers=headers)
+    assert r.json()["deleted"] == [a, c]
+    assert r.json()["errors"][0]["id"] == 999999
+    assert client.get("/api/v1/products").json() == []
+
+
+def test_bulk_rejects_oversized_batch(client: TestClient, admin_token: str, monkeypatch) -> None:
+    """Batches above BULK_MAX_ITEMS get 413."""
+    from app.core.config import get_settings
+    monkeypatch.setattr(get_settings(), "BULK_MAX_ITEMS", 2)
+    r = client.post(
+        "/api/v1/products/bulk",
+        json=[{"name": "P", "price": 1}] * 3,
+        headers={"Authorization": f"Bearer {admin_token}"},
+    )
+    assert r.status_code == 413
+
+
+def test_bulk_requires_admin(client: TestClient, user_token: str) -> None:
+    """Bulk writes are admin only."""
+    r = client.post("/api/v1/products/bulk", json=[], headers={"Authorization": f"Bearer {user_token}"})
+    assert r.status_code == 403
+
+
+def test_export_products_ndjson_and_csv(client: TestClient, admin_token: str, db) -> None:
+    """Export streams every product as NDJSON or CSV."""
+    import csv
+    import json
+    from app.database.models import Product
+    from decimal import Decimal
+    db.add_all([Product(name=f"E{i}", description="d", price=Decimal("2.50")) for i in range(3)])
+    db.commit()
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    r = client.get("/api/v1/products/export", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["name"] for row in rows] == ["E0", "E1", "E2"]
+    assert rows[0]["price"] == "2.50"
+    r = client.get("/api/v1/products/export", params={"format": "csv"}, headers=headers)
+    table = list(csv.reader(r.text.splitlines()))
+    assert table[0][:2] == ["id", "name"] and len(table) == 4
+
+
+def test_import_products_csv_with_upsert(client: TestClient, admin_token: str, db) -> None:
+    """CSV import inserts new rows, upserts on name and reports rejected rows."""
+    from app.database.models import Product
+    from decimal import Decimal
+    db.add(Product(name="Existing", price=Decimal("1.00")))
+    db.commit()
+    body = "name,description,price\nExisting,updated,9.99\nNew,,2.00\nBad,,-1\n"
+    r = client.post(
+        "/api/v1/products/import",
+        params={"upsert": "true"},
+        files={"file": ("products.csv", body, "text/csv")},
+        headers={"Authorization": f"Bearer {admin_token}"},
+    )
+    assert r.status_code == 200
+    summary = r.json()
+    assert (summary["rows"], summary["inserted"], summary["updated"], summary["rejected"]) == (3, 1, 1, 1)
+    assert summary["errors"][0]["index"] == 3
+    by_name = {p["name"]: p for p in client.get("/api/v1/products").json()}
+    assert by_name["Existing"]["description"] == "updated"
+    assert "New" in by_name
+
+
+def test_import_products_ndjson_in_chunks(client: TestClient, admin_token: str, monkeypatch) -> None:
+    """NDJSON import spans several chunks; malformed lines are rejected, not fatal."""
+    import json
+    from app.core.config import get_settings
+    monkeypatch.setattr(get_settings(), "IMPORT_CHUNK_SIZE", 2)
+    lines = [json.dumps({"name": f"N{i}", "price": i}) for i in range(5)] + ["{oops"]
+    r = client.post(
+        "/api/v1/products/import",
+        files={"file": ("products.ndjson", "\n".join(lines), "application/x-ndjson")},
+        headers={"Authorization": f"Bearer {admin_token}"},
+    )
+    summary = r.json()
+    assert (summary["inserted"], summary["rejected"]) == (5, 1)
+    assert len(client.get("/api/v1/products").json()) == 5
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_import_products_rejects_undecodable_line_after_first_chunk(
+    client: TestClient, admin_token: str, monkeypatch, fmt: str
+) -> None:
+    """A bad byte past a committed chunk rejects that line only; later rows still import."""
+    import json
+    from app.core.config import get_settings
+    monkeypatch.setattr(get_settings(), "IMPORT_CHUNK_SIZE", 2)
+    if fmt == "csv":
+        lines = [b"name,price"] + [f"C{i},{i}".encode() for i in range(1, 6)]
+    else:
+        lines = [json.dumps({"name": f"C{i}", "price": i}).encode() for i in range(1, 6)]
+    lines.insert(len(lines) - 2, b"\xff\xfe broken")
+    r = client.post(
+        "/api/v1/products/import",
+        files={"file": (f"products.{fmt}", b"\n".join(lines), "application/octet-stream")},
+        headers={"Authorization": f"Bearer {admin_token}"},
+    )
+    assert r.status_code == 200
+    summary = r.json()
+    assert (summary["rows"], summary["inserted"], summary["rejected"]) == (6, 5, 1)
+    assert summary["errors"][0]["index"] == 4 and "UTF-8" in summary["errors"][0]["detail"]
+    assert len(client.get("/api/v1/products").json()) == 5
+
+
+def test_list_products_search_and_price_filter(client: TestClient, db) -> None:
+    """q matches name/description (SQLite fallback); price range and sort apply together."""
+    from app.database.models import Product
+    from decimal import Decimal
+    db.add_all([
+        Product(name="Red Shoe", description="leather", price=Decimal("50.00")),
+        Product(name="Blue Shoe", description=None, price=Decimal("30.00")),
+        Product(name="Hat", description="red wool", price=Decimal("20.00")),
+        Product(name="Scarf", description="blue", price=Decimal("10.00")),
+    ])
+    db.commit()
+    names = lambda r: [p["name"] for p in r.json()]  # noqa: E731
+    assert names(client.get("/api/v1/products", params={"q": "red", "sort": "price"})) == ["Hat", "Red Shoe"]
+    assert names(client.get("/api/v1/products", params={"min_price": 15, "max_price": 40, "sort": "-price"})) == ["Blue Shoe", "Hat"]
+    assert names(client.get("/api/v1/products", params={"q": "shoe", "max_price": 40})) == ["Blue Shoe"]
+    assert client.get("/api/v1/products", params={"sort": "relevance"}).status_code == 400
+
+
+def test_list_products_keyset_by_price_descending(client: TestClient, db) -> None:
+    """Keyset pagination works with sort=-price (ties broken on id)."""
+    from app.database.models import Product
+    from decimal import Decimal
+    db.add_all([Product(name=f"P{i}", price=Decimal(p)) for i, p in enumerate(["5.00", "7.50", "5.00", "9.99"])])
+    db.commit()
+    seen, cursor = [], ""
+    while cursor is not None:
+        page = client.get("/api/v1/products", params={"cursor": cursor, "limit": 3, "sort": "-price"}).json()
+        seen += [p["name"] for p in page["items"]]
+        cursor = page["next_cursor"]
+    assert seen == ["P3", "P1", "P2", "P0"]
+
+
+def test_admin_update_query_budget(client: TestClient, admin_token: str, db, query_budget) -> None:
+    """Admin update stays within its query budget and reports it in Server-Timing."""
+    from app.database.models import Product
+    from decimal import Decimal
+    product = Product(name="Budget", description="D", price=Decimal("10.00"))
+    db.add(product)
+    db.commit()
+    product_id = product.id
+    # user lookup, product select, UPDATE, refresh select
+    with query_budget(4) as stats:
+        r = client.put(
+            f"/api/v1/products/{product_id}",
+            json={"name": "Budgeted"},
+            headers={"Authorization": f"Bearer {admin_token}"},
+        )
+    assert r.status_code == 200
+    assert f'desc="{stats.count} queries"' in r.headers["Server-Timing"]
+
+
+def test_sql_debug_flags_repeated_statements(db, caplog) -> None:
+    """SQL_DEBUG warns when one request runs the same statement repeatedly."""
+    import logging
+    from app.core.config import get_settings
+    from app.database import profiling
+    from app.database.models import Product
+    from decimal import Decimal
+    for i in range(3):
+        db.add(Product(name=f"N{i}", description="D", price=Decimal("1.00")))
+    db.commit()
+    ids = [p.id for p in db.query(Product).all()]
+    db.expire_all()
+    settings = get_settings()
+    settings.SQL_DEBUG, settings.SQL_REPEAT_THRESHOLD = True, 3
+    try:
+        stats, token = profiling.start_request()
+        for product_id in ids:
+            db.get(Product, product_id)
+        with caplog.at_level(logging.WARNING, logger="sql"):
+            profiling.finish_request(token, stats, "GET", "/loop")
+    finally:
+        settings.SQL_DEBUG, settings.SQL_REPEAT_THRESHOLD = False, 5
+    assert stats.count == 3
+    assert "Possible N+1 in GET /loop: statement ran 3 times" in caplog.text
+
+
+def test_read_routes_use_replica(tmp_path) -> None:
+    """With DATABASE_READ_URL set, product reads hit the replica while writes stay on the primary."""
+    import json
+    import os
+    import subprocess
+    import sys
+    from pathlib import Path
+    script = """
+import json
+from fastapi.testclient import TestClient
+from app.database.connection import SessionLocal, ReadSessionLocal, engine, read_engine, pool_stats
+from app.database.models import Base, Product
+from app.main import app
+Base.metadata.create_all(engine)
+Base.metadata.create_all(read_engine)
+with SessionLocal() as db:
+    db.add(Product(name="primary-only", price=1))
+    db.commit()
+with ReadSessionLocal() as db:
+    db.add(Product(name="replica-only", price=2))
+    db.commit()
+client = TestClient(app)
+names = [p["name"] for p in client.get("/api/v1/products").json()]
+print(json.dumps({"names": names, "engines": sorted(pool_stats())}))
+"""
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'primary.db'}",
+        "DATABASE_READ_URL": f"sqlite:///{tmp_path / 'replica.db'}",
+        "PRODUCT_CACHE_BACKEND": "none",
+        "LOG_ASYNC": "false",
+    }
+    out = subprocess.run(
+        [sys.executable, "-c", script], env=env, cwd=Path(__file__).resolve().parents[1],
+        capture_output=True, text=True, check=True,
+    ).stdout.strip().splitlines()[-1]
+    result = json.loads(out)
+    assert result["names"] == ["replica-only"]
+    assert result["engines"] == ["primary", "replica"]
+
+
+def test_pre_encoded_list_matches_response_model(client: TestClient, db) -> None:
+    """The column-row JSON path encodes products exactly like ProductResponse does."""
+    import json
+    from app.database.models import Product
+    from app.database.schemas import ProductResponse
+    from decimal import Decimal
+    db.add_all([
+        Product(name="A", description=None, price=Decimal("1.50")),
+        Product(name="B", description='with "quotes"', price=Decimal("20.00")),
+    ])
+    db.commit()
+    expected = [
+        json.loads(ProductResponse.model_validate(p).model_dump_json())
+        for p in db.query(Product).order_by(Product.id)
+    ]
+    r = client.get("/api/v1/products")
+    assert r.headers["content-type"] == "application/json"
+    assert r.json() == expected
+    page = client.get("/api/v1/products", params={"cursor": "", "limit": 1}).json()
+    assert page["items"] == expected[:1] and page["next_cursor"]
+
+
+def test_large_pages_are_compressed(client: TestClient, db) -> None:
+    """Catalog pages above the size threshold are gzip/br encoded; tiny bodies are not."""
+    from app.database.models import Product
+    from decimal import Decimal
+    db.add_all([Product(name=f"P{i}", description="catalog item " * 5, price=Decimal("9.99")) for i in range(50)])
+    db.commit()
+    gz = client.get("/api/v1/products", params={"limit": 50}, headers={"Accept-Encoding": "gzip"})
+    assert gz.headers["content-encoding"] == "gzip"
+    assert int(gz.headers["content-length"]) < len(gz.content) / 4
+    assert len(gz.json()) == 50
+    br = client.get("/api/v1/products", params={"limit": 50}, headers={"Accept-Encoding": "gzip, br"})
+    assert br.headers["content-encoding"] == "br"
+    assert br.json() == gz.json()
+    refused = client.get("/api/v1/products", params={"limit": 50}, headers={"Accept-Encoding": "gzip, br;q=0"})
+    assert refused.headers["content-encoding"] == "gzip"
+    # Encoded bodies differ byte for byte from the identity one: their ETag is weak, and still revalidates
+    plain = client.get("/api/v1/products", params={"limit": 50}, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and not plain.headers["etag"].startswith("W/")
+    assert gz.headers["etag"] == br.headers["etag"] == "W/" + plain.headers["etag"]
+    revalidated = client.get(
+        "/api/v1/products", params={"limit": 50}, headers={"Accept-Encoding": "gzip", "If-None-Match": gz.headers["etag"]}
+    )
+    assert revalidated.status_code == 304 and revalidated.headers["etag"] == gz.headers["etag"]
+    small = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert small.headers["X-Request-ID"]
+
+
+def test_idempotency_key_replays_writes(client: TestClient, admin_token: str, db, monkeypatch) -> None:
+    """Retries with the same Idempotency-Key replay the stored response without calling the service."""
+    from app.database.models import Product
+    headers = {"Authorization": f"Bearer {admin_token}", "Idempotency-Key": "create-1"}
+    first = client.post("/api/v1/products", json={"name": "Once", "price": 5}, headers=headers)
+    monkeypatch.setattr("app.api.v1.routes_products.create_product", lambda *a: pytest.fail("write ran twice"))
+    retry = client.post("/api/v1/products", json={"name": "Once", "price": 5}, headers=headers)
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json() and retry.headers["Idempotent-Replayed"] == "true"
+    assert db.query(Product).count() == 1
+    # Same key, different payload
+    other = client.post("/api/v1/products", json={"name": "Twice", "price": 5}, headers=headers)
+    assert other.status_code == 422
+
+    product_id = first.json()["id"]
+    delete_headers = {**headers, "Idempotency-Key": "delete-1"}
+    assert client.delete(f"/api/v1/products/{product_id}", headers=delete_headers).status_code == 204
+    assert client.delete(f"/api/v1/products/{product_id}", headers=delete_headers).status_code == 204
+    # A failed write releases its key, so the retry runs again
+    missing_headers = {**headers, "Idempotency-Key": "update-1"}
+    for _ in range(2):
+        assert client.put("/api/v1/products/999", json={"name": "x"}, headers=missing_headers).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_concurrent_duplicates_run_once(client: TestClient, admin_token: str, db, monkeypatch) -> None:
+    """A duplicate arriving while the first request runs waits for its response."""
+    import asyncio
+    import time
+    import httpx
+    from app.database.models import Product
+    from app.main import app
+    from app.services.product_service import create_product
+
+    def slow_create(*args):
+        time.sleep(0.2)
+        return create_product(*args)
+
+    monkeypatch.setattr("app.api.v1.routes_products.create_product", slow_create)
+    headers = {"Authorization": f"Bearer {admin_token}", "Idempotency-Key": "concurrent-1"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        responses = await asyncio.gather(*(
+            ac.post("/api/v1/products", json={"name": "Once", "price": 5}, headers=headers) for _ in range(3)
+        ))
+    assert [r.status_code for r in responses] == [201] * 3
+    assert len({r.json()["id"] for r in responses}) == 1
+    assert db.query(Product).count() == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_product_reads_share_one_fetch(client: TestClient, db, monkeypatch) -> None:
+    """A thundering herd on one uncached product runs a single fetch; every request gets the product."""
+    import asyncio
+    import time
+    import httpx
+    from decimal import Decimal
+    from app.database.models import Product
+    from app.main import app
+    from app.services import product_service
+    product = Product(name="Hot", price=Decimal("1.00"))
+    db.add(product)
+    db.commit()
+    fetches = []
+    real_fetch = product_service.get_product_by_id
+
+    def slow_fetch(session, product_id):
+        fetches.append(product_id)
+        time.sleep(0.1)
+        return real_fetch(session, product_id)
+
+    monkeypatch.setattr(product_service, "get_product_by_id", slow_fetch)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as ac:
+        responses = await asyncio.gather(*(ac.get(f"/api/v1/products/{product.id}") for _ in range(50)))
+        assert {r.status_code for r in responses} == {200}
+        assert {r.json()["name"] for r in responses} == {"Hot"}
+        assert fetches == [product.id]
+        # Missing ids share the 404 as well
+        fetches.clear()
+        missing = await asyncio.gather(*(ac.get("/api/v1/products/999") for _ in range(10)))
+        assert {r.status_code for r in missing} == {404} and fetches == [999]
+
+
+@pytest.mark.asyncio
+async def test_shared_read_outlives_leader_session(db) -> None:
+    """The shared fetch uses its own session: the leader's request (and session) may end first."""
+    import asyncio
+    import time
+    from sqlalchemy.orm import Session
+    from app.database.models import Product
+    from app.services.product_service import read_shared
+    sessions = []
+
+    def slow_count(session):
+        sessions.append(session)
+        time.sleep(0.1)
+        return session.query(Product).count()
+
+    leader = Session(db.get_bind())
+    first = asyncio.ensure_future(read_shared(leader, slow_count))
+    await asyncio.sleep(0.02)
+    second = asyncio.ensure_future(read_shared(Session(db.get_bind()), slow_count))
+    await asyncio.sleep(0)
+    first.cancel()  # the leader's client disconnected
+    leader.close()
+    assert await second == 0
+    assert len(sessions) == 1 and sessions[0] is not leader
+
+
+def test_singleflight_threads_share_result_and_error() -> None:
+    """Threads calling with the same key while one runs get its result (or exception)."""
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from app.utils.singleflight import SingleFlight
+    flight = SingleFlight("test")
+    calls = []
+    lock = threading.Lock()
+
+    def load(value):
+        with lock:
+            calls.append(value)
+        time.sleep(0.1)
+        if value == "boom":
+            raise ValueError(value)
+        return value
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: flight.do("k", lambda: load("v")), range(8)))
+        errors = list(pool.map(lambda _: _raises(lambda: flight.do("e", lambda: load("boom"))), range(8)))
+    assert results == ["v"] * 8 and errors == [ValueError] * 8
+    assert sorted(calls) == ["boom", "v"]
+    assert flight.do("k", lambda: "again") == "again"  # nothing is kept after the flight lands
+
+
+def _raises(fn) -> type | None:
+    try:
+        fn()
+    except Exception as exc:
+        return type(exc)
+    return None
+
+
+def test_catalog_snapshot_serves_identical_pages_without_queries(client: TestClient, admin_token: str, db, query_budget) -> None:
+    """Snapshot pages match the DB path byte for byte, cost no queries, and follow writes."""
+    from decimal import Decimal
+    from app.core.config import get_settings
+    from app.database.models import Product
+    from app.services import catalog_snapshot
+    db.add_all([Product(name=f"P{i}", description="d" if i % 2 else None, price=Decimal(f"{i % 4}.50")) for i in range(9)])
+    db.commit()
+    queries = [
+        "", "?sort=price&limit=4", "?sort=-price&min_price=1&max_price=2.5", "?sort=created_at&skip=3&limit=2",
+        "?cursor=&sort=-price&limit=4", "?cursor=&sort=price&min_price=1&limit=2", "?skip=20",
+    ]
+
+    def fetch(query: str) -> list[tuple[bytes, str]]:
+        pages, url = [], "/api/v1/products" + query
+        while url:
+            response = client.get(url)
+            pages.append((response.content, response.headers["ETag"]))
+            body = response.json()
+            cursor = body.get("next_cursor") if isinstance(body, dict) else None
+            url = None if cursor is None else "/api/v1/products" + query.replace("cursor=", f"cursor={cursor}", 1)
+        return pages
+
+    expected = {query: fetch(query) for query in queries}
+    settings = get_settings()
+    settings.CATALOG_SNAPSHOT = True
+    try:
+        catalog_snapshot.load_catalog(db)
+        with query_budget(0):
+            assert {query: fetch(query) for query in queries} == expected
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        created = client.post("/api/v1/products", json={"name": "New", "price": 0.1}, headers=headers).json()
+        client.put("/api/v1/products/1", json={"price": 9}, headers=headers)
+        client.delete("/api/v1/products/2", headers=headers)
+        with query_budget(0):
+            by_price = [p["id"] for p in client.get("/api/v1/products?sort=price&limit=100").json()]
+        assert by_price[0] == created["id"] and by_price[-1] == 1 and 2 not in by_price
+        assert client.get("/api/v1/products?q=P3").json()[0]["name"] == "P3"  # search still hits the DB
+    finally:
+        settings.CATALOG_SNAPSHOT = False
+        catalog_snapshot.clear_catalog()
+
+
+def test_invalidation_bus_delivers_to_other_workers_and_resyncs(fake_redis) -> None:
+    """Events reach the other worker's handlers (not the sender's); every connect resyncs."""
+    import time
+    from app.utils.invalidation import ChangeEvent, InvalidationBus, RedisTransport
+    from app.utils.metrics import REGISTRY
+    received: dict[str, list] = {"a": [], "b": []}
+    resyncs: list[str] = []
+    workers = {name: InvalidationBus(poll_seconds=0.01) for name in received}
+    for name, worker in workers.items():
+        worker.subscribe("widget", received[name].extend, lambda name=name: resyncs.append(name))
+        worker.start(RedisTransport(fake_redis, "test_invalidation"))
+
+    def wait_for(condition) -> None:
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    try:
+        wait_for(lambda: len(resyncs) == 2)
+        assert sorted(resyncs) == ["a", "b"]
+        latency_key = ("invalidation_propagation_seconds", ("widget",))
+        before = REGISTRY.collect().get(latency_key, [0])[-1]  # histogram samples end with the count
+        workers["a"].publish([ChangeEvent("widget", 7, 1.0), ChangeEvent("gadget", 1, 1.0)])
+        wait_for(lambda: received["b"])
+        assert received == {"a": [], "b": [ChangeEvent("widget", 7, 1.0)]}
+        assert REGISTRY.collect()[latency_key][-1] == before + 1
+        # Too large for a NOTIFY payload: collapses to "every widget changed"
+        workers["a"].publish(ChangeEvent("widget", i, 2.0) for i in range(2000))
+        wait_for(lambda: len(received["b"]) > 1)
+        assert received["b"][1:] == [ChangeEvent("widget", None, 2.0)]
+    finally:
+        for worker in workers.values():
+            worker.stop()
+
+
+def test_other_workers_product_writes_invalidate_memory_cache(client: TestClient, db, fake_redis) -> None:
+    """A write published by another worker drops this worker's cached copy of the product."""
+    import time
+    from decimal import Decimal
+    from app.database.models import Product
+    from app.utils.invalidation import ChangeEvent, InvalidationBus, RedisTransport, bus
+    from app.utils.metrics import REGISTRY
+
+    def resyncs() -> float:
+        return REGISTRY.collect().get(("invalidation_resyncs_total", ()), 0.0)
+
+    product = Product(name="Before", price=Decimal("1.00"))
+    db.add(product)
+    db.commit()
+    db.refresh(product)
+    resynced = resyncs() + 2
+    other_worker = InvalidationBus(poll_seconds=0.01)
+    bus.poll_seconds = 0.01
+    bus.start(RedisTransport(fake_redis, "test_invalidation"))
+    other_worker.start(RedisTransport(fake_redis, "test_invalidation"))
+    try:
+        deadline = time.monotonic() + 5
+        while resyncs() < resynced and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert client.get(f"/api/v1/products/{product.id}").json()["name"] == "Before"
+        product.name = "After"
+        db.commit()
+        assert client.get(f"/api/v1/products/{product.id}").json()["name"] == "Before"  # still cached
+        other_worker.publish([ChangeEvent("product", product.id, time.time())])
+        name = "Before"
+        while name == "Before" and time.monotonic() < deadline:
+            time.sleep(0.01)
+            name = client.get(f"/api/v1/products/{product.id}").json()["name"]
+        assert name == "After"
+    finally:
+        bus.stop()
+        bus.poll_seconds = 1.0
+        other_worker.stop()
+
+
+def test_catalog_snapshot_warns_without_invalidation_bus(db, caplog) -> None:
+    """Without a bus other workers' writes never reach the snapshot; startup says so."""
+    import logging
+    from app.core.config import get_settings
+    from app.services import catalog_snapshot
+    settings = get_settings()
+    settings.CATALOG_SNAPSHOT = True
+    try:
+        with caplog.at_level(logging.WARNING):
+            catalog_snapshot.start_catalog(db.get_bind())
+        assert "without an invalidation bus" in caplog.text
+        assert catalog_snapshot.get_catalog() is not None
+    finally:
+        settings.CATALOG_SNAPSHOT = False
+        catalog_snapshot.clear_catalog()
+        catalog_snapshot._bind = None